@@ -7,8 +7,10 @@ from uuid import UUID
 from pydantic import BaseModel, field_validator, EmailStr
 from sqlmodel import Session, select
 
-from models import Person, NotebookEntry, Tag, PersonTag
+from models import Person, NotebookEntry, NotebookEntryRead, Tag, PersonTag
 from ai.client import GeminiClient
+from services.name_matching import match_names
+from services.notebook import append_to_notebook, get_or_create_notebook_entry, read_entries
 from ai.prompts import (
     INTENT_DETECTION_PROMPT,
     ENTITY_EXTRACTION_PROMPT,
@@ -235,66 +237,24 @@ class PersonManager:
             NotebookEntry for today
         """
         today = datetime.utcnow().date().isoformat()
-
-        statement = select(NotebookEntry).where(
-            NotebookEntry.person_id == person_id,
-            NotebookEntry.entry_date == today
-        )
-        entry = self.session.exec(statement).first()
-
-        if not entry:
-            entry = NotebookEntry(
-                person_id=person_id,
-                user_id=user_id,
-                entry_date=today,
-                content=""
-            )
-            self.session.add(entry)
-            self.session.commit()
-            self.session.refresh(entry)
-
+        entry = get_or_create_notebook_entry(self.session, person_id, user_id, today)
+        self.session.commit()
         return entry
 
     def find_by_name(self, name: str, user_id: UUID) -> List[Person]:
         """
-        Find people by name using simple case-insensitive matching.
+        Find people by name using indexed fuzzy (trigram) matching.
 
         Args:
             name: Name to search for
             user_id: User ID to scope the search
 
         Returns:
-            List of Person objects, sorted by match quality:
-            1. Exact match (case-insensitive)
-            2. Starts with the search term
-            3. Contains the search term
+            List of Person objects, best match first (exact case-insensitive
+            matches, then by trigram similarity)
         """
-        # Get all people for this user
-        statement = select(Person).where(Person.user_id == user_id)
-        existing_people = self.session.exec(statement).all()
-
-        if not existing_people:
-            return []
-
-        name_lower = name.lower().strip()
-
-        # Categorize matches
-        exact_matches = []
-        starts_with_matches = []
-        contains_matches = []
-
-        for person in existing_people:
-            person_name_lower = person.name.lower()
-
-            if person_name_lower == name_lower:
-                exact_matches.append(person)
-            elif person_name_lower.startswith(name_lower):
-                starts_with_matches.append(person)
-            elif name_lower in person_name_lower:
-                contains_matches.append(person)
-
-        # Return matches in priority order
-        return exact_matches + starts_with_matches + contains_matches
+        matches = match_names(self.session, [name], user_id)
+        return [person for person, _ in matches[name]]
 
     def create_person(
         self,
@@ -356,18 +316,10 @@ class PersonManager:
         if not person:
             raise ValueError(f"Person with id {existing_id} not found")
 
-        # Get or create today's entry and append new attributes
+        # Append new attributes to today's entry (created if needed)
         if extraction.attributes:
-            entry = self.get_or_create_today_entry(existing_id, person.user_id)
-
-            # Append new attributes
-            if entry.content:
-                entry.content = f"{entry.content}\n{extraction.attributes}"
-            else:
-                entry.content = extraction.attributes
-
-            entry.updated_at = datetime.utcnow()
-            self.session.add(entry)
+            today = datetime.utcnow().date().isoformat()
+            append_to_notebook(self.session, existing_id, person.user_id, today, extraction.attributes)
 
         # Update phone if provided and not already set
         if extraction.phone_number and not person.phone_number:
@@ -381,7 +333,7 @@ class PersonManager:
 
     def match_person(self, name: str, user_id: UUID) -> PersonMatchResult:
         """
-        Match extracted name to existing people using case-insensitive search.
+        Match extracted name to existing people using fuzzy name matching.
 
         Returns all matches so frontend can handle disambiguation when needed.
 
@@ -392,32 +344,39 @@ class PersonManager:
         Returns:
             PersonMatchResult with all matches, or empty if none found
         """
-        people = self.find_by_name(name, user_id)
+        return self.match_people([name], user_id)[0]
 
-        if not people:
-            # No matches found
-            return PersonMatchResult(
-                extracted_name=name,
-                matches=[],
-                is_ambiguous=False
-            )
+    def match_people(self, names: List[str], user_id: UUID) -> List[PersonMatchResult]:
+        """
+        Match a batch of extracted names to existing people in one query.
 
-        # Convert to PersonMatch objects
-        matches = []
-        for person in people:
-            # Use 1.0 for exact match, 0.8 for partial matches
-            similarity = 1.0 if person.name.lower() == name.lower() else 0.8
-            matches.append(PersonMatch(
-                person_id=person.id,
-                person_name=person.name,
-                similarity=similarity
+        Args:
+            names: Names to match
+            user_id: User ID to scope the search
+
+        Returns:
+            One PersonMatchResult per name, in input order, with similarity
+            scores between 0 and 1 (1.0 for exact matches)
+        """
+        matches = match_names(self.session, names, user_id)
+
+        results = []
+        for name in names:
+            person_matches = [
+                PersonMatch(
+                    person_id=person.id,
+                    person_name=person.name,
+                    similarity=score
+                )
+                for person, score in matches[name]
+            ]
+            results.append(PersonMatchResult(
+                extracted_name=name,
+                matches=person_matches,
+                is_ambiguous=len(person_matches) > 1
             ))
 
-        return PersonMatchResult(
-            extracted_name=name,
-            matches=matches,
-            is_ambiguous=len(matches) > 1
-        )
+        return results
 
     def assign_tags(
         self,
@@ -485,7 +444,7 @@ class PersonManager:
         person_id: UUID,
         content: str,
         date: str  # ISO format
-    ) -> NotebookEntry:
+    ) -> NotebookEntryRead:
         """
         Add journal entry for a person on a specific date.
 
@@ -495,35 +454,14 @@ class PersonManager:
             date: Date in ISO format (YYYY-MM-DD)
 
         Returns:
-            NotebookEntry object
+            The day's entry with all of its content
         """
-        # Get or create entry for date
-        statement = select(NotebookEntry).where(
-            NotebookEntry.person_id == person_id,
-            NotebookEntry.entry_date == date
-        )
-        entry = self.session.exec(statement).first()
-
         person = self.session.get(Person, person_id)
         if not person:
             raise ValueError(f"Person with id {person_id} not found")
 
-        if not entry:
-            entry = NotebookEntry(
-                person_id=person_id,
-                user_id=person.user_id,
-                entry_date=date,
-                content=content
-            )
-        else:
-            # Append to existing entry
-            if entry.content:
-                entry.content = f"{entry.content}\n{content}"
-            else:
-                entry.content = content
-
-        entry.updated_at = datetime.utcnow()
-        self.session.add(entry)
+        # Append to the day's entry, creating it if needed
+        entry = append_to_notebook(self.session, person_id, person.user_id, date, content)
 
         # Update last_contact_date if entry is for today
         if date == datetime.utcnow().date().isoformat():
@@ -531,9 +469,8 @@ class PersonManager:
             self.session.add(person)
 
         self.session.commit()
-        self.session.refresh(entry)
 
-        return entry
+        return read_entries(self.session, [entry])[0]
 
 
 def parse_relative_date(date_str: Optional[str]) -> str:
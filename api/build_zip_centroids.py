@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Build the offline ZIP centroid dataset used for zip-only geocoding.
+
+Reads the US Census Gazetteer ZCTA file (public domain; tab-separated with
+GEOID, INTPTLAT and INTPTLONG columns, plain or zipped) and writes the
+sorted binary file that services/zip_centroids.py memory-maps.
+
+--download fetches one pinned Gazetteer release and verifies it against
+GAZETTEER_SHA256 (the Dockerfile passes it through as a build arg). A missing
+checksum or a mismatch fails the build rather than shipping an unverified or
+different dataset. With --optional a failed download (e.g. no network at
+build time) only prints a warning; the app then sends zip-only addresses to
+the online geocoder.
+
+Usage:
+    python build_zip_centroids.py --download [--optional]
+    python build_zip_centroids.py 2023_Gaz_zcta_national.zip [--output data/zip_centroids.bin]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import urllib.request
+import zipfile
+
+from services.zip_centroids import ZIP_CENTROIDS_PATH, write_zip_centroids
+
+GAZETTEER_URL = (
+    "https://www2.census.gov/geo/docs/maps-data/data/gazetteer/"
+    "2023_Gazetteer/2023_Gaz_zcta_national.zip"
+)
+
+# Expected SHA-256 of the file at GAZETTEER_URL (hex); required by --download
+GAZETTEER_SHA256 = os.getenv("GAZETTEER_SHA256", "").strip()
+
+
+def verify_checksum(path: str, expected: str) -> None:
+    """
+    Raises:
+        ValueError: If the file's SHA-256 is not the expected one
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    if digest.hexdigest() != expected.strip().lower():
+        raise ValueError(f"Checksum mismatch for {path}: expected {expected}, got {digest.hexdigest()}")
+
+
+def read_gazetteer(path: str):
+    """Yield (zip, latitude, longitude) rows from a Gazetteer ZCTA file"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            name = next(n for n in archive.namelist() if n.endswith(".txt"))
+            with archive.open(name) as f:
+                yield from _read_rows(io.TextIOWrapper(f, encoding="utf-8"))
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from _read_rows(f)
+
+
+def _read_rows(f):
+    reader = csv.reader(f, delimiter="\t")
+    # The Gazetteer header has trailing whitespace on the last column name
+    header = [column.strip() for column in next(reader)]
+    zip_index = header.index("GEOID")
+    lat_index = header.index("INTPTLAT")
+    lng_index = header.index("INTPTLONG")
+    for row in reader:
+        yield row[zip_index].strip(), float(row[lat_index]), float(row[lng_index])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline ZIP centroid dataset")
+    parser.add_argument("source", nargs="?", help="Gazetteer ZCTA file (.txt or .zip)")
+    parser.add_argument("--download", action="store_true", help="Download the Gazetteer file from census.gov")
+    parser.add_argument("--optional", action="store_true", help="Exit cleanly if the download fails")
+    parser.add_argument("--output", default=ZIP_CENTROIDS_PATH, help="Output file path")
+    args = parser.parse_args()
+
+    if not args.source and not args.download:
+        parser.error("give a Gazetteer file or --download")
+
+    if args.download and not GAZETTEER_SHA256:
+        parser.error("--download requires GAZETTEER_SHA256, the SHA-256 of the pinned Gazetteer release")
+
+    source = args.source
+    if args.download:
+        fd, source = tempfile.mkstemp(suffix=".zip")
+        os.close(fd)
+        print(f"Downloading {GAZETTEER_URL}...")
+        try:
+            urllib.request.urlretrieve(GAZETTEER_URL, source)
+        except OSError as e:
+            os.remove(source)
+            if not args.optional:
+                raise
+            print(f"WARNING: could not download the Gazetteer file ({e}); no ZIP centroids written")
+            return
+
+    try:
+        if args.download:
+            verify_checksum(source, GAZETTEER_SHA256)
+        count = write_zip_centroids(args.output, read_gazetteer(source))
+    finally:
+        if args.download:
+            os.remove(source)
+
+    print(f"Wrote {count} ZIP centroids to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the Nominatim search API, for tests and load tests.
+
+Answers GET /search?q=...&format=jsonv2 like Nominatim. Addresses listed in
+`results` get those coordinates (or no match, for None); any other address
+gets a stable pseudo-random point in the continental US, so load tests can
+geocode arbitrary data. Latency and failures can be injected to exercise
+timeouts and the circuit breaker.
+
+Usage:
+    python fake_geocoder.py [--port 8089] [--latency 0.2] [--error-rate 0.05]
+    NOMINATIM_URL=http://127.0.0.1:8089 NOMINATIM_MIN_INTERVAL=0 python run_fastapi.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from services.geocoding import normalize_address
+
+# Continental US: south, north, west, east
+US_BOUNDS = (25.0, 49.0, -124.0, -67.0)
+
+
+class FakeNominatimServer:
+    """
+    Threaded HTTP server imitating Nominatim's /search endpoint.
+
+    Args:
+        host, port: Address to listen on (port 0 picks a free port)
+        results: Address -> (latitude, longitude), or None for "not found"
+        latency: Seconds to wait before answering each request
+        error_rate: Fraction of requests answered with status 503
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        results: Optional[Dict[str, Optional[Tuple[float, float]]]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0
+    ):
+        self.results = {normalize_address(address): coords for address, coords in (results or {}).items()}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> "FakeNominatimServer":
+        """Serve from a background thread"""
+        self._thread = Thread(target=self.serve_forever, name="fake-nominatim", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeNominatimServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def lookup(self, address: str) -> Optional[Tuple[float, float]]:
+        key = normalize_address(address)
+        if key in self.results:
+            return self.results[key]
+        # Stable point derived from the address
+        rng = random.Random(hashlib.sha256(key.encode()).digest())
+        south, north, west, east = US_BOUNDS
+        return (round(rng.uniform(south, north), 6), round(rng.uniform(west, east), 6))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path != "/search" or "q" not in query:
+                    return self._send(400, {"error": "expected /search?q=..."})
+                if server.error_rate and random.random() < server.error_rate:
+                    return self._send(503, {"error": "Service Unavailable"})
+
+                coords = server.lookup(query["q"][0])
+                if coords is None:
+                    return self._send(200, [])
+                return self._send(200, [{
+                    "lat": str(coords[0]),
+                    "lon": str(coords[1]),
+                    "display_name": query["q"][0],
+                }])
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stand-in Nominatim server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail with 503")
+    args = parser.parse_args()
+
+    server = FakeNominatimServer(args.host, args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Fake Nominatim listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
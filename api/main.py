@@ -4,8 +4,12 @@ from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 
-from database import init_db
-from routers import people, history, associations, entries, auth, tags, health, sms, ai, notebook
+from database import init_db, SessionLocal
+from routers import people, history, associations, entries, auth, tags, health, sms, ai, notebook, export
+from services.geocode_queue import GeocodeWorker
+from services.health_snapshots import HealthSnapshotWorker
+from services.notebook import NotebookCompactionWorker
+from services.pagination import NEXT_CURSOR_HEADER
 
 load_dotenv()
 
@@ -15,7 +19,25 @@ API_PREFIX = "/api"
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    geocode_worker = None
+    if os.getenv("GEOCODE_WORKER_ENABLED", "true").lower() == "true":
+        geocode_worker = GeocodeWorker(SessionLocal)
+        geocode_worker.start()
+    snapshot_worker = None
+    if os.getenv("HEALTH_SNAPSHOT_WORKER_ENABLED", "true").lower() == "true":
+        snapshot_worker = HealthSnapshotWorker(SessionLocal)
+        snapshot_worker.start()
+    compaction_worker = None
+    if os.getenv("NOTEBOOK_COMPACTION_ENABLED", "true").lower() == "true":
+        compaction_worker = NotebookCompactionWorker(SessionLocal)
+        compaction_worker.start()
     yield
+    if geocode_worker:
+        await geocode_worker.stop()
+    if snapshot_worker:
+        await snapshot_worker.stop()
+    if compaction_worker:
+        await compaction_worker.stop()
 
 app = FastAPI(
     title="PeoplePerson API",
@@ -30,6 +52,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Health endpoints without prefix (for Cloud Run health checks)
@@ -44,4 +67,5 @@ app.include_router(associations.router, prefix=f"{API_PREFIX}/associations", tag
 app.include_router(entries.router, prefix=f"{API_PREFIX}/entries", tags=["entries"])
 app.include_router(sms.router, prefix=f"{API_PREFIX}", tags=["sms"])
 app.include_router(ai.router, prefix=f"{API_PREFIX}/ai", tags=["ai"])
-app.include_router(notebook.router, tags=["notebook"])
\ No newline at end of file
+app.include_router(notebook.router, tags=["notebook"])
+app.include_router(export.router, prefix=f"{API_PREFIX}/export", tags=["export"])
\ No newline at end of file
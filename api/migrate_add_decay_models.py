@@ -0,0 +1,65 @@
+"""
+Migration script to add per-person and per-tag health decay models.
+Adds decay_rate/decay_curve to people and tags, the resolved decay model and
+status transition times (warningAt, dormantAt) to people with their indexes,
+and computes the transition times for everyone.
+Run this once; afterwards services/health_schedule.py keeps them current.
+"""
+
+from sqlalchemy import text
+from sqlmodel import Session
+from database import engine
+from models import Person
+from services.health_schedule import rebuild_health_schedules
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add the decay columns and indexes, then compute every person's schedule"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            Person.__table__.c.decay_curve.type.create(connection, checkfirst=True)
+
+            for table in ["people", "tags"]:
+                logger.info(f"Adding decay columns to {table} table...")
+                connection.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS decay_rate DOUBLE PRECISION"
+                ))
+                connection.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS decay_curve decaycurve"
+                ))
+
+            logger.info("Adding resolved decay model and transition times to people table...")
+            connection.execute(text("""
+                ALTER TABLE people
+                    ADD COLUMN IF NOT EXISTS resolved_decay_rate DOUBLE PRECISION,
+                    ADD COLUMN IF NOT EXISTS resolved_decay_curve decaycurve,
+                    ADD COLUMN IF NOT EXISTS "warningAt" TIMESTAMP,
+                    ADD COLUMN IF NOT EXISTS "dormantAt" TIMESTAMP
+            """))
+            for column in ["warningAt", "dormantAt"]:
+                connection.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS "ix_people_userId_{column}"
+                    ON people ("userId", "{column}")
+                """))
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+    logger.info("Computing status transition times...")
+    with Session(engine) as db:
+        count = rebuild_health_schedules(db)
+    logger.info(f"Scheduled {count} people")
+
+
+if __name__ == "__main__":
+    logger.info("Starting decay model migration...")
+    migrate()
+    logger.info("Done!")
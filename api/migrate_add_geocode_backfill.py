@@ -0,0 +1,42 @@
+"""
+Migration script to add resumable geocoding backfills.
+Adds backfillId to geocodeJobs and creates the geocodeBackfills table that
+tracks each backfill's checkpoint and progress counters.
+"""
+
+from sqlalchemy import text
+from database import engine
+from models import GeocodeBackfill
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Create the backfill table and link geocoding jobs to it"""
+
+    logger.info("Creating geocodeBackfills table...")
+    GeocodeBackfill.__table__.create(engine, checkfirst=True)
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            logger.info("Adding backfillId column to geocodeJobs table...")
+            connection.execute(text(
+                'ALTER TABLE "geocodeJobs" ADD COLUMN IF NOT EXISTS "backfillId" UUID'
+            ))
+            connection.execute(text(
+                'CREATE INDEX IF NOT EXISTS "ix_geocodeJobs_backfillId" ON "geocodeJobs" ("backfillId")'
+            ))
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting geocode backfill migration...")
+    migrate()
+    logger.info("Done!")
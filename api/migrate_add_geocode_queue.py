@@ -0,0 +1,78 @@
+"""
+Migration script to add the background geocoding queue.
+Adds geocode_status to people and tags, creates the geocodeJobs table and
+queues every person/tag that has an address but no coordinates yet.
+Run this once; afterwards address changes are queued on write.
+"""
+
+from datetime import datetime
+from sqlalchemy import insert, or_, text, update
+from sqlmodel import Session, select, func
+from database import engine
+from models import GeocodeJob, Person, ProcessingStatus, Tag
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def migrate():
+    """Add geocode_status columns and the job table, then queue ungeocoded addresses"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            # Same enum type as entries.processing_status
+            for table in ["people", "tags"]:
+                logger.info(f"Adding geocode_status column to {table} table...")
+                connection.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS geocode_status processingstatus"
+                ))
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+    logger.info("Creating geocodeJobs table...")
+    GeocodeJob.__table__.create(engine, checkfirst=True)
+
+    # Core statements on named columns only: loading Person/Tag entities would
+    # select columns that later migrations add
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        for target_type, model in [("person", Person), ("tag", Tag)]:
+            queued = select(GeocodeJob.target_id).where(GeocodeJob.target_type == target_type)
+            ids = db.exec(
+                select(model.id).where(
+                    model.latitude.is_(None),
+                    model.id.not_in(queued),
+                    or_(*[
+                        func.coalesce(func.trim(column), "") != ""
+                        for column in [model.street_address, model.city, model.state, model.zip]
+                    ])
+                )
+            ).all()
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                db.exec(
+                    update(model)
+                    .where(model.id.in_(batch))
+                    .values(longitude=None, geocode_status=ProcessingStatus.PENDING)
+                    .execution_options(synchronize_session=False)
+                )
+                db.exec(insert(GeocodeJob).values([
+                    {"target_type": target_type, "target_id": target_id, "attempts": 0,
+                     "next_attempt_at": now, "enqueued_at": now}
+                    for target_id in batch
+                ]))
+                db.commit()
+            logger.info(f"Queued {len(ids)} {model.__tablename__} for geocoding")
+
+
+if __name__ == "__main__":
+    logger.info("Starting geocode queue migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,58 @@
+"""
+Migration script to add the geohash spatial index to people.
+Adds a geohash column with a (userId, geohash) B-tree index, replaces the
+(userId, resolved_lat) index and backfills the geohashes. Run this once;
+afterwards geohashes are kept up to date on write.
+
+Nothing queries tags by location, so the tag geohash column and index added
+by an earlier version of this script are dropped if present.
+"""
+
+from sqlalchemy import text
+from sqlmodel import Session
+from database import engine
+from services.location import rebuild_resolved_locations
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add geohash columns and indexes, then backfill them"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            logger.info("Adding geohash column and index to people table...")
+            connection.execute(text("ALTER TABLE people ADD COLUMN IF NOT EXISTS geohash VARCHAR"))
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS "ix_people_userId_geohash"
+                ON people ("userId", geohash)
+            """))
+
+            logger.info("Dropping unused tag geohash column and index...")
+            connection.execute(text('DROP INDEX IF EXISTS "ix_tags_userId_geohash"'))
+            connection.execute(text("ALTER TABLE tags DROP COLUMN IF EXISTS geohash"))
+
+            logger.info("Dropping superseded index on people (userId, resolved_lat)...")
+            connection.execute(text('DROP INDEX IF EXISTS "ix_people_userId_resolved_lat"'))
+
+            trans.commit()
+
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+    with Session(engine) as db:
+        logger.info("Backfilling people geohashes...")
+        count = rebuild_resolved_locations(db)
+        logger.info(f"Updated {count} people")
+
+
+if __name__ == "__main__":
+    logger.info("Starting geohash index migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,40 @@
+"""
+Migration script to add the (userId, last_contact_date) index on people.
+Health score filters and sorting compile to range scans on this index.
+Run this once.
+"""
+
+from sqlalchemy import text
+from database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add the health score index to the people table"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            logger.info("Creating index on people (userId, last_contact_date)...")
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS "ix_people_userId_last_contact_date"
+                ON people ("userId", last_contact_date)
+            """))
+
+            trans.commit()
+            logger.info("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting health score index migration...")
+    migrate()
+    logger.info("Done!")
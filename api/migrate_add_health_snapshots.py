@@ -0,0 +1,32 @@
+"""
+Migration script to add the daily health snapshot tables.
+Creates healthSnapshots (one row per user per day) and personHealthSnapshots
+(one row per person per status change), then records yesterday's snapshot.
+Run this once; afterwards the snapshot worker (or snapshot_health.py from
+cron) adds a day at a time. Earlier days cannot be reconstructed.
+"""
+
+from database import engine, SessionLocal
+from models import HealthSnapshot, PersonHealthSnapshot
+from services.health_snapshots import take_daily_snapshots
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Create the snapshot tables and take the first snapshot"""
+
+    for model in [HealthSnapshot, PersonHealthSnapshot]:
+        logger.info(f"Creating {model.__tablename__} table...")
+        model.__table__.create(engine, checkfirst=True)
+
+    taken = take_daily_snapshots(SessionLocal)
+    logger.info(f"Snapshotted {taken} users")
+
+
+if __name__ == "__main__":
+    logger.info("Starting health snapshot migration...")
+    migrate()
+    logger.info("Done!")
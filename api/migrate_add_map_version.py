@@ -0,0 +1,35 @@
+"""
+Migration script to add the per-user map version.
+Adds mapVersion to users; cached map-data payloads are keyed by it and it is
+bumped whenever something on the user's map changes.
+"""
+
+from sqlalchemy import text
+from database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add the mapVersion column to users"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            logger.info("Adding mapVersion column to users table...")
+            connection.execute(text(
+                'ALTER TABLE users ADD COLUMN IF NOT EXISTS "mapVersion" INTEGER NOT NULL DEFAULT 0'
+            ))
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting map version migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,64 @@
+"""
+Migration script to add the fuzzy name-matching index.
+Postgres: adds the generated people.name_normalized column, enables pg_trgm and
+creates a GIN trigram index on it.
+SQLite: creates personNameTrigrams and backfills it.
+Run this once; afterwards the index is kept up to date on write.
+"""
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+from database import engine
+from models import Person, PersonNameTrigram
+from services.name_matching import create_name_index, reindex_name_trigrams
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add the normalized name column and trigram index"""
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as connection:
+            trans = connection.begin()
+            try:
+                logger.info("Adding name_normalized column to people table...")
+                connection.execute(text("""
+                    ALTER TABLE people
+                    ADD COLUMN IF NOT EXISTS name_normalized VARCHAR
+                    GENERATED ALWAYS AS (lower(trim(name))) STORED
+                """))
+                connection.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_people_name_normalized
+                    ON people (name_normalized)
+                """))
+
+                logger.info("Creating pg_trgm index...")
+                create_name_index(connection)
+
+                trans.commit()
+                logger.info("Migration completed successfully!")
+            except Exception as e:
+                trans.rollback()
+                logger.error(f"Migration failed: {e}")
+                raise
+        return
+
+    logger.info("Creating personNameTrigrams table...")
+    PersonNameTrigram.__table__.create(engine, checkfirst=True)
+
+    with Session(engine) as db:
+        person_ids = db.exec(select(Person.id)).all()
+        connection = db.connection()
+        for start in range(0, len(person_ids), 500):
+            reindex_name_trigrams(connection, person_ids[start:start + 500])
+        db.commit()
+    logger.info(f"Indexed names for {len(person_ids)} people")
+
+
+if __name__ == "__main__":
+    logger.info("Starting name index migration...")
+    migrate()
+    logger.info("Done!")
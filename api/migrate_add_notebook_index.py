@@ -0,0 +1,40 @@
+"""
+Migration script to add the (personId, createdAt, id) index on notebookEntries.
+A person's notebook pages are keyset range scans on this index.
+Run this once.
+"""
+
+from sqlalchemy import text
+from database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add the pagination index to the notebookEntries table"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            logger.info('Creating index on notebookEntries ("personId", "createdAt", id)...')
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS "ix_notebookEntries_personId_createdAt_id"
+                ON "notebookEntries" ("personId", "createdAt", id)
+            """))
+
+            trans.commit()
+            logger.info("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting notebook index migration...")
+    migrate()
+    logger.info("Done!")
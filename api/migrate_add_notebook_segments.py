@@ -0,0 +1,26 @@
+"""
+Migration script to add segmented notebook storage.
+Creates the notebookSegments table. Existing entry content stays where it is
+and becomes the compacted part of each day; new appends are stored as
+segments (see services/notebook.py).
+Run this once.
+"""
+
+from database import engine
+from models import NotebookSegment
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Create the notebookSegments table"""
+    logger.info("Creating notebookSegments table...")
+    NotebookSegment.__table__.create(engine, checkfirst=True)
+
+
+if __name__ == "__main__":
+    logger.info("Starting notebook segments migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,41 @@
+"""
+Migration script to add the (userId, entry_date, createdAt, id) index on notebookEntries.
+The user-wide notebook timeline pages are keyset range scans on this index,
+read backwards for newest-first order.
+Run this once.
+"""
+
+from sqlalchemy import text
+from database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add the timeline index to the notebookEntries table"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            logger.info('Creating index on notebookEntries ("userId", entry_date, "createdAt", id)...')
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS "ix_notebookEntries_userId_entry_date"
+                ON "notebookEntries" ("userId", entry_date, "createdAt", id)
+            """))
+
+            trans.commit()
+            logger.info("Migration completed successfully!")
+
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting notebook timeline index migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,69 @@
+"""
+Migration script to add the unique (personId, entry_date) index on notebookEntries.
+Existing same-day duplicates are merged first: the earliest entry of the day
+keeps the content of all of them, in creation order, and the rest are deleted.
+Run this once; afterwards same-day writes append through services/notebook.py.
+"""
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+from database import engine
+from models import NotebookEntry
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def merge_duplicate_days(db: Session) -> int:
+    """Merge same-day entries into one per person and day; returns entries removed"""
+    duplicates = db.exec(
+        select(NotebookEntry.person_id, NotebookEntry.entry_date)
+        .group_by(NotebookEntry.person_id, NotebookEntry.entry_date)
+        .having(func.count() > 1)
+    ).all()
+
+    removed = 0
+    for person_id, entry_date in duplicates:
+        entries = db.exec(
+            select(NotebookEntry)
+            .where(NotebookEntry.person_id == person_id, NotebookEntry.entry_date == entry_date)
+            .order_by(NotebookEntry.created_at, NotebookEntry.id)
+        ).all()
+        kept, rest = entries[0], entries[1:]
+        kept.content = "\n".join(entry.content for entry in entries if entry.content)
+        kept.updated_at = max(entry.updated_at for entry in entries)
+        db.add(kept)
+        for entry in rest:
+            db.delete(entry)
+        removed += len(rest)
+        db.commit()
+    return removed
+
+
+def migrate():
+    """Merge duplicate days, then add the unique index"""
+
+    with Session(engine) as db:
+        removed = merge_duplicate_days(db)
+    logger.info(f"Merged away {removed} duplicate same-day entries")
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            logger.info('Creating unique index on notebookEntries ("personId", entry_date)...')
+            connection.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS "ix_notebookEntries_personId_entry_date"
+                ON "notebookEntries" ("personId", entry_date)
+            """))
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    logger.info("Starting notebook unique day migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,55 @@
+"""
+Migration script to store each person's resolved map location.
+Adds resolved_lat, resolved_lng and location_source to people, indexes them
+for the map view and backfills them from the location hierarchy.
+Run this once; afterwards locations are kept up to date on write.
+"""
+
+from sqlalchemy import text
+from sqlmodel import Session
+from database import engine
+from services.location import rebuild_resolved_locations
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Add the resolved location columns and index, then backfill them"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+
+        try:
+            logger.info("Adding resolved location columns to people table...")
+            connection.execute(text("""
+                ALTER TABLE people
+                ADD COLUMN IF NOT EXISTS resolved_lat FLOAT,
+                ADD COLUMN IF NOT EXISTS resolved_lng FLOAT,
+                ADD COLUMN IF NOT EXISTS location_source VARCHAR
+            """))
+
+            logger.info("Creating index on people (userId, resolved_lat)...")
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS "ix_people_userId_resolved_lat"
+                ON people ("userId", resolved_lat)
+            """))
+
+            trans.commit()
+
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+    logger.info("Backfilling resolved locations...")
+    with Session(engine) as db:
+        count = rebuild_resolved_locations(db)
+    logger.info(f"Resolved locations for {count} people")
+
+
+if __name__ == "__main__":
+    logger.info("Starting resolved location migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,45 @@
+"""
+Migration script to add the full-text search index.
+Creates the personSearch and notebookSearch tables with their tsvector/GIN
+(Postgres) or FTS5 (SQLite) indexes and backfills the search documents.
+Run this once; afterwards documents are kept up to date on write.
+"""
+
+from sqlmodel import Session
+from database import engine
+from models import PersonSearchDocument, NotebookSearchDocument
+from services.search import create_search_index, rebuild_search_index
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Create the search table and index, then backfill documents"""
+
+    logger.info("Creating personSearch and notebookSearch tables...")
+    PersonSearchDocument.__table__.create(engine, checkfirst=True)
+    NotebookSearchDocument.__table__.create(engine, checkfirst=True)
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            logger.info("Creating search index...")
+            create_search_index(connection)
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+    logger.info("Backfilling search documents...")
+    with Session(engine) as db:
+        count = rebuild_search_index(db)
+    logger.info(f"Indexed {count} people")
+
+
+if __name__ == "__main__":
+    logger.info("Starting search index migration...")
+    migrate()
+    logger.info("Done!")
@@ -0,0 +1,50 @@
+"""
+Migration script to index notebook text per entry.
+Drops the personSearch table (whose notes column held every notebook entry of
+the person) with its index, recreates it without notes next to the new
+notebookSearch table, and backfills both.
+Run this once; the tables only hold derived data, so nothing is lost.
+"""
+
+from sqlalchemy import text
+from sqlmodel import Session
+from database import engine
+from models import PersonSearchDocument, NotebookSearchDocument
+from services.search import rebuild_search_index
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Recreate the search tables and backfill documents"""
+
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            logger.info("Dropping personSearch table...")
+            if connection.dialect.name == "sqlite":
+                connection.execute(text('DROP TABLE IF EXISTS "personSearchFts"'))
+            connection.execute(text('DROP TABLE IF EXISTS "personSearch"'))
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+    # Creating the tables also creates their indexes
+    logger.info("Creating personSearch and notebookSearch tables...")
+    PersonSearchDocument.__table__.create(engine, checkfirst=True)
+    NotebookSearchDocument.__table__.create(engine, checkfirst=True)
+
+    logger.info("Backfilling search documents...")
+    with Session(engine) as db:
+        count = rebuild_search_index(db)
+    logger.info(f"Indexed {count} people")
+
+
+if __name__ == "__main__":
+    logger.info("Starting notebook search migration...")
+    migrate()
+    logger.info("Done!")
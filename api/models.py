@@ -1,9 +1,10 @@
 from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Optional, List
+from datetime import date, datetime
 from uuid import UUID, uuid4
 from enum import Enum
 from pydantic import field_validator
+from sqlalchemy import Column, Computed, Index, String
 
 
 class IntentChoices(str, Enum):
@@ -26,6 +27,16 @@ class ProcessingStatus(str, Enum):
     FAILED = "failed"
 
 
+class DecayCurve(str, Enum):
+    LINEAR = "linear"            # Loses decay_rate points per day
+    EXPONENTIAL = "exponential"  # Loses decay_rate percent of the remaining score per day
+
+
+# Accepted decay rates: slower ones put status transitions centuries out, faster ones are instant
+MIN_DECAY_RATE = 0.01
+MAX_DECAY_RATE = 100
+
+
 class UserBase(SQLModel):
     firebase_uid: str = Field(unique=True, index=True)
     name: Optional[str] = None
@@ -40,6 +51,8 @@ class User(UserBase, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "createdAt"})
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "updatedAt"})
+    # Bumped whenever the user's map could change; keys the cached map-data
+    map_version: int = Field(default=0, sa_column_kwargs={"name": "mapVersion"})
     
     people: List["Person"] = Relationship(back_populates="user", cascade_delete=True)
     tags: List["Tag"] = Relationship(back_populates="user", cascade_delete=True)
@@ -60,6 +73,10 @@ class PersonBase(SQLModel):
     phone_number: Optional[str] = None
     last_contact_date: datetime = Field(default_factory=datetime.utcnow)
 
+    # Health decay; None inherits from the person's tags, then the default
+    decay_rate: Optional[float] = Field(default=None, ge=MIN_DECAY_RATE, le=MAX_DECAY_RATE)
+    decay_curve: Optional[DecayCurve] = None
+
     # Location fields
     street_address: Optional[str] = None
     city: Optional[str] = None
@@ -70,11 +87,41 @@ class PersonBase(SQLModel):
 
 class Person(PersonBase, table=True):
     __tablename__ = "people"
+    __table_args__ = (
+        # Health score filters/sorts compile to range scans on last_contact_date
+        Index("ix_people_userId_last_contact_date", "userId", "last_contact_date"),
+        # Map/viewport queries are geohash prefix range scans on this index
+        Index("ix_people_userId_geohash", "userId", "geohash"),
+        # Status filters and reminders compare these precomputed transition times
+        Index("ix_people_userId_warningAt", "userId", "warningAt"),
+        Index("ix_people_userId_dormantAt", "userId", "dormantAt"),
+    )
     
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="users.id", sa_column_kwargs={"name": "userId"})
     created_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "createdAt"})
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "updatedAt"})
+
+    # None until an address is set; see services/geocode_queue.py
+    geocode_status: Optional[ProcessingStatus] = None
+
+    # Location picked by the location hierarchy; maintained by services/location.py
+    resolved_lat: Optional[float] = None
+    resolved_lng: Optional[float] = None
+    location_source: Optional[str] = None  # "personal", "tag:<name>" or "zip:<zip>"
+    geohash: Optional[str] = None  # Geohash of the resolved location
+
+    # Decay model in effect and when the status changes; maintained by services/health_schedule.py
+    resolved_decay_rate: Optional[float] = None
+    resolved_decay_curve: Optional[DecayCurve] = None
+    warning_at: Optional[datetime] = Field(default=None, sa_column_kwargs={"name": "warningAt"})
+    dormant_at: Optional[datetime] = Field(default=None, sa_column_kwargs={"name": "dormantAt"})
+
+    # Lowercased, trimmed name for fuzzy matching (pg_trgm GIN index on Postgres)
+    name_normalized: Optional[str] = Field(
+        default=None,
+        sa_column=Column("name_normalized", String, Computed("lower(trim(name))", persisted=True), index=True)
+    )
     
     user: User = Relationship(back_populates="people")
     history_entries: List["History"] = Relationship(back_populates="person", cascade_delete=True)
@@ -108,6 +155,10 @@ class TagBase(SQLModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
+    # Health decay inherited by tagged people that have none of their own
+    decay_rate: Optional[float] = Field(default=None, ge=MIN_DECAY_RATE, le=MAX_DECAY_RATE)
+    decay_curve: Optional[DecayCurve] = None
+
     @field_validator('name')
     @classmethod
     def validate_name(cls, v):
@@ -123,6 +174,7 @@ class Tag(TagBase, table=True):
     user_id: UUID = Field(foreign_key="users.id", sa_column_kwargs={"name": "userId"})
     created_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "createdAt"})
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "updatedAt"})
+    geocode_status: Optional[ProcessingStatus] = None
     
     user: User = Relationship(back_populates="tags")
     person_tags: List["PersonTag"] = Relationship(back_populates="tag", cascade_delete=True)
@@ -233,6 +285,8 @@ class PersonUpdate(SQLModel):
     email: Optional[str] = None
     phone_number: Optional[str] = None
     last_contact_date: Optional[datetime] = None
+    decay_rate: Optional[float] = Field(default=None, ge=MIN_DECAY_RATE, le=MAX_DECAY_RATE)
+    decay_curve: Optional[DecayCurve] = None
     street_address: Optional[str] = None
     city: Optional[str] = None
     state: Optional[str] = None
@@ -240,6 +294,10 @@ class PersonUpdate(SQLModel):
     longitude: Optional[float] = None
 
 
+class PersonBulkUpdate(PersonUpdate):
+    id: UUID
+
+
 class PersonRead(PersonBase):
     id: UUID
     user_id: UUID
@@ -247,6 +305,14 @@ class PersonRead(PersonBase):
     updated_at: datetime
     latest_notebook_entry_content: Optional[str] = None
     latest_notebook_entry_time: Optional[datetime] = None
+    geocode_status: Optional[ProcessingStatus] = None
+    resolved_lat: Optional[float] = None
+    resolved_lng: Optional[float] = None
+    location_source: Optional[str] = None
+    resolved_decay_rate: Optional[float] = None
+    resolved_decay_curve: Optional[DecayCurve] = None
+    warning_at: Optional[datetime] = None
+    dormant_at: Optional[datetime] = None
 
     # Computed health score fields
     health_score: int = 0
@@ -258,6 +324,14 @@ class PersonRead(PersonBase):
     tags: List["TagRead"] = []
 
 
+class PersonBulkResult(SQLModel):
+    index: int  # Position of the item in the request array
+    status: str  # "created", "updated" or "error"
+    person: Optional[PersonRead] = None
+    error: Optional[str] = None
+    geocode_queued: bool = False
+
+
 class TagCreate(TagBase):
     pass
 
@@ -273,6 +347,8 @@ class TagUpdate(SQLModel):
     zip: Optional[str] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
+    decay_rate: Optional[float] = Field(default=None, ge=MIN_DECAY_RATE, le=MAX_DECAY_RATE)
+    decay_curve: Optional[DecayCurve] = None
 
 
 class TagRead(TagBase):
@@ -280,6 +356,7 @@ class TagRead(TagBase):
     user_id: UUID
     created_at: datetime
     updated_at: datetime
+    geocode_status: Optional[ProcessingStatus] = None
 
 
 class HistoryCreate(HistoryBase):
@@ -355,6 +432,14 @@ class NotebookEntryBase(SQLModel):
 
 class NotebookEntry(NotebookEntryBase, table=True):
     __tablename__ = "notebookEntries"
+    __table_args__ = (
+        # A person's notebook, newest first, paginated on (createdAt, id)
+        Index("ix_notebookEntries_personId_createdAt_id", "personId", "createdAt", "id"),
+        # One entry per person per day; services/notebook.py appends with an upsert on it
+        Index("ix_notebookEntries_personId_entry_date", "personId", "entry_date", unique=True),
+        # The user-wide timeline, newest day first, paginated on (entry_date, createdAt, id)
+        Index("ix_notebookEntries_userId_entry_date", "userId", "entry_date", "createdAt", "id"),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     person_id: UUID = Field(foreign_key="people.id", sa_column_kwargs={"name": "personId"})
@@ -364,6 +449,136 @@ class NotebookEntry(NotebookEntryBase, table=True):
 
     person: "Person" = Relationship(back_populates="notebook_entries")
     user: "User" = Relationship(back_populates="notebook_entries")
+    segments: List["NotebookSegment"] = Relationship(back_populates="entry", cascade_delete=True)
+
+
+class NotebookSegment(SQLModel, table=True):
+    """
+    Text appended to a notebook entry, stored as its own immutable row so an
+    append is a small insert rather than a rewrite of the day's content.
+    The day's text is the entry's content followed by its segments in seq
+    order; services/notebook.py folds segments of quiet days into the entry.
+    """
+    __tablename__ = "notebookSegments"
+
+    entry_id: UUID = Field(foreign_key="notebookEntries.id", ondelete="CASCADE", primary_key=True, sa_column_kwargs={"name": "entryId"})
+    seq: int = Field(primary_key=True)
+    content: str
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "createdAt"})
+
+    entry: NotebookEntry = Relationship(back_populates="segments")
+
+
+class PersonNameTrigram(SQLModel, table=True):
+    """
+    Trigrams of each person's normalized name, used for fuzzy name matching on
+    SQLite where pg_trgm is not available. Maintained by services/name_matching.py.
+    """
+    __tablename__ = "personNameTrigrams"
+    __table_args__ = (Index("ix_personNameTrigrams_userId_trigram", "userId", "trigram"),)
+
+    person_id: UUID = Field(foreign_key="people.id", ondelete="CASCADE", primary_key=True, sa_column_kwargs={"name": "personId"})
+    trigram: str = Field(primary_key=True)
+    user_id: UUID = Field(foreign_key="users.id", sa_column_kwargs={"name": "userId"})
+    trigram_count: int  # Total trigrams in the person's name, for similarity scoring
+
+
+class GeocodeCache(SQLModel, table=True):
+    """
+    Persistent geocoding results keyed by normalized address.
+    A row with no coordinates records that the address could not be geocoded.
+    """
+    __tablename__ = "geocodeCache"
+
+    address_key: str = Field(primary_key=True)
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "createdAt"})
+    expires_at: datetime = Field(index=True, sa_column_kwargs={"name": "expiresAt"})
+
+
+class GeocodeJob(SQLModel, table=True):
+    """
+    Queued geocoding work for a person or tag whose address changed.
+    Drained by the background worker in services/geocode_queue.py.
+    """
+    __tablename__ = "geocodeJobs"
+
+    target_type: str = Field(primary_key=True)  # "person" or "tag"
+    target_id: UUID = Field(primary_key=True, sa_column_kwargs={"name": "targetId"})
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = None
+    # None once retries are exhausted
+    next_attempt_at: Optional[datetime] = Field(
+        default_factory=datetime.utcnow, index=True, sa_column_kwargs={"name": "nextAttemptAt"}
+    )
+    enqueued_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "enqueuedAt"})
+    # Set when the job was queued by a backfill, for its progress counters
+    backfill_id: Optional[UUID] = Field(default=None, index=True, sa_column_kwargs={"name": "backfillId"})
+
+
+class GeocodeBackfillBase(SQLModel):
+    status: ProcessingStatus = Field(default=ProcessingStatus.PENDING)
+    total: int = Field(default=0)  # People and tags missing coordinates when the backfill started
+    queued: int = Field(default=0)
+    succeeded: int = Field(default=0)
+    failed: int = Field(default=0)
+
+
+class GeocodeBackfill(GeocodeBackfillBase, table=True):
+    """
+    Geocodes every person and tag of a user that has an address but no
+    coordinates, feeding them to the geocoding queue in small batches.
+    The checkpoint is the last target queued, so a restart resumes there.
+    """
+    __tablename__ = "geocodeBackfills"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    user_id: UUID = Field(foreign_key="users.id", index=True, sa_column_kwargs={"name": "userId"})
+    checkpoint_type: Optional[str] = None  # "person", then "tag"; None before the first batch
+    checkpoint_id: Optional[UUID] = Field(default=None, sa_column_kwargs={"name": "checkpointId"})
+    all_queued: bool = Field(default=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "createdAt"})
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "updatedAt"})
+    completed_at: Optional[datetime] = Field(default=None, sa_column_kwargs={"name": "completedAt"})
+
+
+class GeocodeBackfillRead(GeocodeBackfillBase):
+    id: UUID
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+
+class PersonSearchDocument(SQLModel, table=True):
+    """
+    Denormalized search document per person (person fields and tag names).
+    Kept in sync on write by services/search.py; the full-text index itself is a
+    tsvector/GIN column on Postgres and an FTS5 table on SQLite.
+    """
+    __tablename__ = "personSearch"
+
+    person_id: UUID = Field(foreign_key="people.id", ondelete="CASCADE", primary_key=True, sa_column_kwargs={"name": "personId"})
+    user_id: UUID = Field(foreign_key="users.id", index=True, sa_column_kwargs={"name": "userId"})
+    name: str = ""
+    tags: str = ""
+    details: str = ""  # body, mnemonic, email, phone, city
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "updatedAt"})
+
+
+class NotebookSearchDocument(SQLModel, table=True):
+    """
+    Search document per piece of notebook text: an entry's content (seq 0) and
+    each of its segments (the segment's seq), so writing to one day never
+    rewrites the text of the others. Indexed like personSearch by services/search.py.
+    """
+    __tablename__ = "notebookSearch"
+
+    entry_id: UUID = Field(foreign_key="notebookEntries.id", ondelete="CASCADE", primary_key=True, sa_column_kwargs={"name": "entryId"})
+    seq: int = Field(primary_key=True)
+    person_id: UUID = Field(foreign_key="people.id", ondelete="CASCADE", sa_column_kwargs={"name": "personId"})
+    user_id: UUID = Field(foreign_key="users.id", index=True, sa_column_kwargs={"name": "userId"})
+    content: str = ""
 
 
 class NotebookEntryCreate(NotebookEntryBase):
@@ -379,4 +594,96 @@ class NotebookEntryRead(NotebookEntryBase):
     person_id: UUID
     user_id: UUID
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+
+class NotebookEntryListItem(NotebookEntryRead):
+    truncated: bool = False  # content is a preview; fetch the entry for all of it
+
+
+class NotebookTimelineItem(NotebookEntryListItem):
+    person_name: str
+
+
+class PersonSearchResult(SQLModel):
+    person: PersonRead
+    rank: float
+    snippet: str
+
+
+class PersonNearbyResult(SQLModel):
+    person: PersonRead
+    distance_km: float
+
+
+class HealthSnapshotBase(SQLModel):
+    total: int = Field(default=0)
+    healthy: int = Field(default=0)
+    warning: int = Field(default=0)
+    dormant: int = Field(default=0)
+    mean_score: Optional[float] = None
+    contacts_made: int = Field(default=0)  # People whose last contact fell on this day
+
+
+class HealthSnapshot(HealthSnapshotBase, table=True):
+    """
+    One user's relationship health at the end of a day, written by the nightly
+    job in services/health_snapshots.py. Trend charts read these rollups.
+    """
+    __tablename__ = "healthSnapshots"
+
+    # Primary key (userId, snapshot_date) serves the trend's date-range reads
+    user_id: UUID = Field(foreign_key="users.id", primary_key=True, sa_column_kwargs={"name": "userId"})
+    snapshot_date: date = Field(primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"name": "createdAt"})
+
+
+class HealthSnapshotRead(HealthSnapshotBase):
+    snapshot_date: date
+
+
+class PersonHealthSnapshotBase(SQLModel):
+    health_status: str
+    health_score: int
+
+
+class PersonHealthSnapshot(PersonHealthSnapshotBase, table=True):
+    """
+    A person's health at the end of a day, stored only on the days their status
+    changed: the status on any day is that of the latest row up to it.
+    """
+    __tablename__ = "personHealthSnapshots"
+    __table_args__ = (
+        Index("ix_personHealthSnapshots_userId_snapshot_date", "userId", "snapshot_date"),
+    )
+
+    person_id: UUID = Field(foreign_key="people.id", ondelete="CASCADE", primary_key=True, sa_column_kwargs={"name": "personId"})
+    snapshot_date: date = Field(primary_key=True)
+    user_id: UUID = Field(foreign_key="users.id", sa_column_kwargs={"name": "userId"})
+
+
+class PersonHealthSnapshotRead(PersonHealthSnapshotBase):
+    snapshot_date: date
+
+
+class HealthHistogramBin(SQLModel):
+    min_score: int
+    max_score: int
+    count: int
+
+
+class OverdueContact(SQLModel):
+    id: UUID
+    name: str
+    health_score: int
+    health_status: str
+    health_emoji: str
+    days_since_contact: int
+
+
+class HealthSummary(SQLModel):
+    total: int
+    status_counts: Dict[str, int]  # healthy / warning / dormant
+    mean_score: Optional[float] = None
+    histogram: List[HealthHistogramBin]
+    most_overdue: List[OverdueContact]  # Lowest scores first
\ No newline at end of file
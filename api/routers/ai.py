@@ -98,14 +98,17 @@ async def extract_people(
                     message="I didn't catch any tag assignments in that message. Try something like 'Add Jane to the Work tag.'"
                 )
 
-            # Match people names to existing people
+            # Match people names to existing people (one query for all names)
+            all_names = [name for assignment in assignments for name in assignment.people_names]
+            matches_by_name = {
+                match.extracted_name: match
+                for match in manager.match_people(all_names, user_id)
+            }
+
             matched_assignments = []
             for assignment in assignments:
                 logger.info(f"Tag assignment - people_names extracted: {assignment.people_names}")
-                matched_people = [
-                    manager.match_person(name, user_id)
-                    for name in assignment.people_names
-                ]
+                matched_people = [matches_by_name[name] for name in assignment.people_names]
                 for mp in matched_people:
                     logger.info(f"Match result for '{mp.extracted_name}': found {len(mp.matches)} matches, ambiguous={mp.is_ambiguous}")
                 matched_assignments.append(TagAssignmentMatch(
@@ -137,9 +140,10 @@ async def extract_people(
                 )
 
             # Match people and parse dates
+            matched_persons = manager.match_people([entry.person_name for entry in entries], user_id)
+
             matched_updates = []
-            for entry in entries:
-                matched_person = manager.match_person(entry.person_name, user_id)
+            for entry, matched_person in zip(entries, matched_persons):
                 parsed_date = parse_relative_date(entry.date)
 
                 matched_updates.append(MemoryUpdateMatch(
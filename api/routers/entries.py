@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
 from sqlmodel import Session, select
 from typing import List, Optional
 from uuid import UUID
@@ -6,6 +6,7 @@ from uuid import UUID
 from database import get_db
 from models import Entry, EntryCreate, EntryRead, EntryPerson, Person, ProcessingStatus
 from routers.auth import get_current_user_id
+from services.pagination import paginate
 
 router = APIRouter()
 
@@ -29,15 +30,18 @@ async def process_entry_with_ai(entry_id: UUID, user_id: UUID, db: Session):
 
 @router.get("/", response_model=List[EntryRead])
 async def get_entries(
+    response: Response,
     db: Session = Depends(get_db),
     user_id: UUID = Depends(get_current_user_id),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     skip: int = 0,
     limit: int = 100
 ):
     query = select(Entry).where(Entry.user_id == user_id)
-    query = query.offset(skip).limit(limit).order_by(Entry.created_at.desc())
-    entries = db.exec(query).all()
-    return entries
+    return paginate(
+        db, query, (Entry.created_at, Entry.id), response,
+        cursor=cursor, skip=skip, limit=limit, descending=True
+    )
 
 
 @router.post("/", response_model=EntryRead)
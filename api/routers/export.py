@@ -0,0 +1,133 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from typing import Dict, Iterator, List
+from uuid import UUID
+from datetime import datetime
+from collections import defaultdict
+import json
+
+from database import get_db
+from models import (
+    Person, Tag, PersonTag, NotebookEntry, Message, MessageRead,
+    History, HistoryRead, PersonAssociation, TagRead
+)
+from routers.auth import get_current_user_id
+from services.notebook import read_entries
+
+router = APIRouter()
+
+# People fetched per server-side cursor batch; related rows are loaded per batch
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_FORMAT_VERSION = 1
+
+
+def _group_by_person(rows) -> Dict[UUID, List[dict]]:
+    grouped = defaultdict(list)
+    for person_id, data in rows:
+        grouped[person_id].append(data)
+    return grouped
+
+
+def export_lines(db: Session, user_id: UUID) -> Iterator[str]:
+    """
+    Yield the user's address book as newline-delimited JSON.
+
+    The first line is an export header; every following line is one person with
+    their tags, notebook entries, messages, history and associations. People are
+    read with a server-side cursor in batches of EXPORT_BATCH_SIZE, so memory
+    stays flat regardless of account size.
+    """
+    try:
+        yield json.dumps({
+            "type": "export",
+            "version": EXPORT_FORMAT_VERSION,
+            "user_id": str(user_id),
+            "exported_at": datetime.utcnow().isoformat(),
+        }) + "\n"
+
+        people = db.exec(
+            select(Person)
+            .where(Person.user_id == user_id)
+            .order_by(Person.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+
+        for batch in people.partitions():
+            person_ids = [person.id for person in batch]
+
+            tags = _group_by_person(
+                (person_id, TagRead.model_validate(tag).model_dump(mode="json"))
+                for person_id, tag in db.exec(
+                    select(PersonTag.person_id, Tag)
+                    .join(Tag, Tag.id == PersonTag.tag_id)
+                    .where(PersonTag.person_id.in_(person_ids))
+                    .order_by(Tag.name)
+                ).all()
+            )
+            notebook_entries = _group_by_person(
+                (entry.person_id, entry.model_dump(mode="json"))
+                for entry in read_entries(db, db.exec(
+                    select(NotebookEntry)
+                    .where(NotebookEntry.person_id.in_(person_ids))
+                    .order_by(NotebookEntry.entry_date, NotebookEntry.created_at)
+                ).all())
+            )
+            messages = _group_by_person(
+                (message.person_id, MessageRead.model_validate(message).model_dump(mode="json"))
+                for message in db.exec(
+                    select(Message)
+                    .where(Message.person_id.in_(person_ids))
+                    .order_by(Message.sent_at)
+                ).all()
+            )
+            history = _group_by_person(
+                (entry.person_id, HistoryRead.model_validate(entry).model_dump(mode="json"))
+                for entry in db.exec(
+                    select(History)
+                    .where(History.person_id.in_(person_ids))
+                    .order_by(History.created_at)
+                ).all()
+            )
+            associations = _group_by_person(
+                (association.person_id, {
+                    "id": str(association.id),
+                    "associate_id": str(association.associate_id),
+                    "created_at": association.created_at.isoformat(),
+                })
+                for association in db.exec(
+                    select(PersonAssociation)
+                    .where(PersonAssociation.person_id.in_(person_ids))
+                ).all()
+            )
+
+            for person in batch:
+                record = person.model_dump(mode="json", exclude={"name_normalized"})
+                record["type"] = "person"
+                record["tags"] = tags.get(person.id, [])
+                record["notebook_entries"] = notebook_entries.get(person.id, [])
+                record["messages"] = messages.get(person.id, [])
+                record["history"] = history.get(person.id, [])
+                record["associations"] = associations.get(person.id, [])
+                yield json.dumps(record) + "\n"
+    finally:
+        db.close()
+
+
+@router.get("/")
+async def export_address_book(
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Stream the user's complete address book as NDJSON (application/x-ndjson).
+
+    Each line after the header is a person with tags, notebook entries,
+    messages, history and associations.
+    """
+    return StreamingResponse(
+        export_lines(db, user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="peopleperson-export.ndjson"'}
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select
 from typing import List, Optional
 from uuid import UUID
@@ -6,17 +6,20 @@ from uuid import UUID
 from database import get_db
 from models import History, HistoryCreate, HistoryRead, ChangeTypeChoices
 from routers.auth import get_current_user_id
+from services.pagination import paginate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[HistoryRead])
 async def get_history(
+    response: Response,
     db: Session = Depends(get_db),
     user_id: UUID = Depends(get_current_user_id),
     person_id: Optional[UUID] = Query(None),
     change_type: Optional[ChangeTypeChoices] = Query(None),
     field: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     skip: int = 0,
     limit: int = 100
 ):
@@ -29,9 +32,10 @@ async def get_history(
     if field:
         query = query.where(History.field == field)
     
-    query = query.offset(skip).limit(limit).order_by(History.created_at.desc())
-    history = db.exec(query).all()
-    return history
+    return paginate(
+        db, query, (History.created_at, History.id), response,
+        cursor=cursor, skip=skip, limit=limit, descending=True
+    )
 
 
 @router.post("/", response_model=HistoryRead)
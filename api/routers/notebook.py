@@ -1,36 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import Session, select, func
+from typing import List, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import date
 
 from database import get_db
-from models import NotebookEntry, NotebookEntryCreate, NotebookEntryUpdate, NotebookEntryRead, Person
+from models import NotebookEntry, NotebookEntryCreate, NotebookEntryUpdate, NotebookEntryRead, NotebookEntryListItem, NotebookTimelineItem, Person
 from routers.auth import get_current_user_id
+from services.notebook import append_to_notebook, materialize, read_entries, replace_notebook_content, segments_by_entry
+from services.pagination import paginate
 
 router = APIRouter()
 
 
-@router.get("/api/people/{person_id}/notebook", response_model=List[NotebookEntryRead])
+def _list_query(preview: Optional[int]):
+    """Entry columns for a listing, with content cut to preview + 1 characters in SQL"""
+    # One character more than the preview tells whether anything was cut
+    content = func.substr(NotebookEntry.content, 1, preview + 1) if preview else NotebookEntry.content
+    return select(
+        NotebookEntry.id,
+        NotebookEntry.person_id,
+        NotebookEntry.user_id,
+        NotebookEntry.entry_date,
+        content.label("content"),
+        NotebookEntry.created_at,
+        NotebookEntry.updated_at
+    )
+
+
+def _list_items(db: Session, rows, model, preview: Optional[int]) -> list:
+    """Build listing items from _list_query rows, adding (preview-cut) segments"""
+    segments = segments_by_entry(db, [row.id for row in rows], max_length=preview + 1 if preview else None)
+
+    items = []
+    for row in rows:
+        item = model.model_validate(row._mapping)
+        item.content = materialize(item.content, segments.get(item.id, []))
+        if preview and len(item.content) > preview:
+            item.content = item.content[:preview]
+            item.truncated = True
+        items.append(item)
+    return items
+
+
+@router.get("/api/people/{person_id}/notebook", response_model=List[NotebookEntryListItem])
 async def get_notebook_entries(
     person_id: UUID,
+    response: Response,
     db: Session = Depends(get_db),
-    user_id: UUID = Depends(get_current_user_id)
+    user_id: UUID = Depends(get_current_user_id),
+    preview: Optional[int] = Query(
+        None, ge=1, le=10000, description="Return only the first N characters of each entry's content"
+    ),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; all entries when omitted")
 ):
-    """Get all notebook entries for a person, ordered newest first"""
+    """
+    Get a person's notebook entries, ordered newest first.
+
+    Every entry is returned unless limit is given, in which case the next
+    page's cursor is in the X-Next-Cursor header.
+
+    With preview, content and appended segments are cut down in SQL so long
+    entries are never read out in full; entries that were cut are marked
+    truncated and can be fetched individually.
+    """
     # Verify person exists and belongs to user
     person = db.get(Person, person_id)
     if not person or person.user_id != user_id:
         raise HTTPException(status_code=404, detail="Person not found")
 
-    # Get entries ordered by creation time descending (newest first)
-    query = select(NotebookEntry).where(
+    query = _list_query(preview).where(
         NotebookEntry.person_id == person_id,
         NotebookEntry.user_id == user_id
-    ).order_by(NotebookEntry.created_at.desc())
+    )
+    rows = paginate(
+        db, query, (NotebookEntry.created_at, NotebookEntry.id), response,
+        cursor=cursor, limit=limit, descending=True
+    )
+    return _list_items(db, rows, NotebookEntryListItem, preview)
+
 
-    entries = db.exec(query).all()
-    return entries
+@router.get("/api/notebook/timeline", response_model=List[NotebookTimelineItem])
+async def get_notebook_timeline(
+    response: Response,
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id),
+    before: Optional[date] = Query(None, description="Only entries for days before this one (YYYY-MM-DD)"),
+    preview: Optional[int] = Query(
+        None, ge=1, le=10000, description="Return only the first N characters of each entry's content"
+    ),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Get a page of the user's notebook entries across all people, newest day first.
+
+    Each entry carries the person's name. Pages are ordered by
+    (entry_date, created_at, id) and served from the
+    (userId, entry_date, createdAt, id) index.
+    """
+    query = _list_query(preview).add_columns(Person.name.label("person_name")).join(
+        Person, Person.id == NotebookEntry.person_id
+    ).where(NotebookEntry.user_id == user_id)
+    if before:
+        query = query.where(NotebookEntry.entry_date < before.isoformat())
+
+    rows = paginate(
+        db, query, (NotebookEntry.entry_date, NotebookEntry.created_at, NotebookEntry.id), response,
+        cursor=cursor, limit=limit, descending=True
+    )
+    return _list_items(db, rows, NotebookTimelineItem, preview)
+
+
+@router.get("/api/people/{person_id}/notebook/{entry_id}", response_model=NotebookEntryRead)
+async def get_notebook_entry(
+    person_id: UUID,
+    entry_id: UUID,
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """Get a single notebook entry with its full content"""
+    db_entry = db.get(NotebookEntry, entry_id)
+
+    # Verify entry exists and belongs to the right person and user
+    if not db_entry or db_entry.person_id != person_id or db_entry.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Notebook entry not found")
+    return read_entries(db, [db_entry])[0]
 
 
 @router.post("/api/people/{person_id}/notebook", response_model=NotebookEntryRead)
@@ -40,24 +136,20 @@ async def create_notebook_entry(
     db: Session = Depends(get_db),
     user_id: UUID = Depends(get_current_user_id)
 ):
-    """Create a new notebook entry for a person"""
+    """
+    Add a notebook entry for a person.
+
+    A person has one entry per day: if the day already has one, the content
+    is appended to it on a new line.
+    """
     # Verify person exists and belongs to user
     person = db.get(Person, person_id)
     if not person or person.user_id != user_id:
         raise HTTPException(status_code=404, detail="Person not found")
 
-    # Create the entry
-    db_entry = NotebookEntry(
-        person_id=person_id,
-        user_id=user_id,
-        entry_date=entry.entry_date,
-        content=entry.content
-    )
-
-    db.add(db_entry)
+    db_entry = append_to_notebook(db, person_id, user_id, entry.entry_date, entry.content)
     db.commit()
-    db.refresh(db_entry)
-    return db_entry
+    return read_entries(db, [db_entry])[0]
 
 
 @router.put("/api/people/{person_id}/notebook/{entry_id}", response_model=NotebookEntryRead)
@@ -76,15 +168,13 @@ async def update_notebook_entry(
     if not db_entry or db_entry.person_id != person_id or db_entry.user_id != user_id:
         raise HTTPException(status_code=404, detail="Notebook entry not found")
 
-    # Update only the content field (date is immutable)
+    # Update only the content field (date is immutable); it replaces any appended segments
     if entry_update.content is not None:
-        db_entry.content = entry_update.content
-        db_entry.updated_at = datetime.utcnow()
+        replace_notebook_content(db, db_entry, entry_update.content)
 
-    db.add(db_entry)
     db.commit()
     db.refresh(db_entry)
-    return db_entry
+    return read_entries(db, [db_entry])[0]
 
 
 @router.delete("/api/people/{person_id}/notebook/{entry_id}")
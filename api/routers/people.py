@@ -1,101 +1,360 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
-from sqlmodel import Session, select, or_, func
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
+from sqlmodel import Session, select, func
+from typing import List, Literal, Optional, Tuple
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import json
 
 from database import get_db
-from models import Person, PersonCreate, PersonRead, PersonUpdate, History, HistoryCreate, Tag, TagRead, PersonTag, NotebookEntry
+from models import Person, PersonCreate, PersonRead, PersonUpdate, Tag, TagRead, PersonTag, PersonSearchResult, PersonBulkUpdate, PersonBulkResult, PersonNearbyResult, ProcessingStatus, GeocodeBackfill, GeocodeBackfillRead, HealthSummary, OverdueContact, HealthSnapshot, HealthSnapshotRead, PersonHealthSnapshot, PersonHealthSnapshotRead
 from routers.auth import get_current_user_id
-from services.health_score import calculate_health_score, get_health_status, get_health_emoji
-from services.location import get_person_coordinates
-from services.geocoding import geocode_address
+from services.health_score import calculate_health_score, calculate_health_scores, get_health_status, get_health_emoji, summarize_health_scores, STATUS_SCORE_RANGES, HealthStatus
+from services.health_schedule import (  # also registers the schedule events
+    days_until_below_expression, decay_models, score_conditions, score_expression, status_conditions
+)
+from services import location  # registers the events that keep resolved locations current
+from services.geocode_queue import enqueue_geocode, start_backfill
+from services import geohash
+from services.enrichment import enrich_people_with_health, enrich_person_with_health
+from services.nearby import nearby_people, nearby_results
+from services.map_clusters import MAX_ZOOM, bbox_conditions, cluster_points, parse_bbox
+from services import map_cache
+from services.pagination import paginate
+from services import search as search_index
 
 router = APIRouter()
 
+# Maximum number of people accepted by the bulk endpoints in one request
+MAX_BULK_ITEMS = 1000
 
-def enrich_person_with_health(person: Person, db: Session) -> PersonRead:
-    """
-    Enrich a Person object with computed health score fields and tags
-    """
-    # Calculate health score
-    health_score = calculate_health_score(person.last_contact_date)
-    health_status = get_health_status(health_score)
-    health_emoji = get_health_emoji(health_status)
-    days_since_contact = (datetime.utcnow() - person.last_contact_date).days
-
-    # Get latest notebook entry
-    latest_entry_query = select(NotebookEntry).where(
-        NotebookEntry.person_id == person.id
-    ).order_by(NotebookEntry.created_at.desc()).limit(1)
-    latest_entry = db.exec(latest_entry_query).first()
-
-    # Get tags for this person
-    tags_query = select(Tag).join(PersonTag).where(
-        PersonTag.person_id == person.id
-    )
-    tags = db.exec(tags_query).all()
+# Longest range, in days, served by the health trend endpoints
+MAX_TREND_DAYS = 731
+
+# Range served when the health trend endpoints get no dates
+DEFAULT_TREND_DAYS = 30
+
+ADDRESS_FIELDS = ['street_address', 'city', 'state', 'zip']
 
-    # Build PersonRead dict
-    person_dict = person.model_dump()
-    person_dict['health_score'] = health_score
-    person_dict['health_status'] = health_status
-    person_dict['health_emoji'] = health_emoji
-    person_dict['days_since_contact'] = days_since_contact
-    person_dict['tags'] = tags
 
-    if latest_entry:
-        person_dict['latest_notebook_entry_content'] = latest_entry.content
-        person_dict['latest_notebook_entry_time'] = latest_entry.created_at
+def trend_range(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """
+    Resolve and validate a health trend date range.
 
-    return PersonRead(**person_dict)
+    Defaults to the DEFAULT_TREND_DAYS days ending yesterday (UTC), the
+    latest day with a snapshot.
+    """
+    end = end or (datetime.utcnow().date() - timedelta(days=1))
+    start = start or (end - timedelta(days=DEFAULT_TREND_DAYS - 1))
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= MAX_TREND_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_TREND_DAYS} days")
+    return start, end
 
 
 @router.get("/", response_model=List[PersonRead])
 async def get_people(
+    response: Response,
     db: Session = Depends(get_db),
     user_id: UUID = Depends(get_current_user_id),
     search: Optional[str] = Query(None),
+    status: Optional[HealthStatus] = Query(None, description="Only people with this health status"),
+    min_score: Optional[int] = Query(None, ge=0, le=100, description="Minimum health score"),
+    max_score: Optional[int] = Query(None, ge=0, le=100, description="Maximum health score"),
+    order_by: Literal["name", "health", "-health"] = Query(
+        "name", description="'health' lists the most neglected first, '-health' the healthiest first"
+    ),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     skip: int = 0,
     limit: int = 100
 ):
     print(f"DEBUG: get_people endpoint reached with user_id: {user_id}")
-    query = select(Person).where(Person.user_id == user_id)
+    now = datetime.utcnow()
+    # Health order sorts on the score. On a single decay model that is last_contact_date
+    # order, read from the (userId, last_contact_date) index; only people on different
+    # models need the score computed in SQL under each one's model.
+    health_score = None
+    if order_by != "name" and len(decay_models(db, user_id)) > 1:
+        health_score = score_expression(db, now).label("health_score")
+    query = select(Person, health_score) if health_score is not None else select(Person)
+    query = query.where(Person.user_id == user_id)
+
+    if status:
+        # Compare the precomputed transition times
+        query = query.where(*status_conditions(status, now))
+    if min_score is not None or max_score is not None:
+        # Health score is monotonic in last_contact_date per decay model, so filter on indexed ranges
+        conditions = score_conditions(db, user_id, min_score=min_score, max_score=max_score, now=now)
+        if conditions is None:
+            return []
+        query = query.where(*conditions)
 
     if search:
-        # Search in person fields OR tag names
-        tag_subquery = select(PersonTag.person_id).join(Tag).where(
-            Tag.user_id == user_id,
-            Tag.name.contains(search)
+        # Full-text index over person fields, notebook entries and tag names
+        matches = search_index.matching_person_ids(db, user_id, search)
+        if matches is None:
+            return []
+        query = query.where(Person.id.in_(matches))
+
+    if order_by == "name":
+        people = paginate(db, query, (Person.name, Person.id), response, cursor=cursor, skip=skip, limit=limit)
+    elif health_score is None:
+        # Longest since contact first is lowest score first
+        people = paginate(
+            db, query, (Person.last_contact_date, Person.id), response,
+            cursor=cursor, skip=skip, limit=limit, descending=order_by == "-health"
+        )
+    else:
+        # Lowest score first; among equal scores, whoever became (or becomes) dormant earliest
+        rows = paginate(
+            db, query, (health_score, Person.dormant_at, Person.id), response,
+            cursor=cursor, skip=skip, limit=limit, descending=order_by == "-health"
         )
+        people = [person for person, _ in rows]
 
-        query = query.where(
-            or_(
-                Person.name.contains(search),
-                Person.body.contains(search),
-                Person.mnemonic.contains(search),
-                Person.id.in_(tag_subquery)
-            )
+    # Enrich the whole page with health scores and notebook entries
+    return enrich_people_with_health(people, db)
+
+
+@router.get("/search", response_model=List[PersonSearchResult])
+async def search_people(
+    query: str,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Ranked full-text search across person fields, notebook entries and tag names.
+    Every word must match (prefix match); results include a highlighted snippet.
+    """
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query parameter is required")
+
+    hits = search_index.search_people(db, user_id, query, limit=limit)
+    if not hits:
+        return []
+
+    people = db.exec(
+        select(Person).where(Person.id.in_([person_id for person_id, _, _ in hits]))
+    ).all()
+    enriched = {person.id: person for person in enrich_people_with_health(people, db)}
+
+    return [
+        PersonSearchResult(person=enriched[person_id], rank=rank, snippet=snippet)
+        for person_id, rank, snippet in hits
+        if person_id in enriched
+    ]
+
+
+@router.get("/nearby", response_model=List[PersonNearbyResult])
+async def get_nearby_people(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(25, gt=0, le=1000),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    People whose location (by the location hierarchy) is within radius_km
+    of a point, nearest first.
+    """
+    return nearby_results(db, nearby_people(db, user_id, lat, lng, radius_km, limit=limit))
+
+
+@router.get("/due", response_model=List[PersonRead])
+async def get_due_people(
+    k: int = Query(10, ge=1, le=100, description="Number of people to return"),
+    within_days: Optional[int] = Query(
+        None, ge=1, le=365, description="Only people whose score drops below threshold within this many days"
+    ),
+    threshold: int = Query(70, ge=1, le=100, description="Health score threshold used with within_days"),
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Who to contact next.
+
+    Without within_days: the k most neglected people (lowest score first).
+    With within_days: up to k people who are at or above threshold now but
+    fall below it within that many days, soonest first.
+
+    Thresholds at a status boundary are a top-k range scan of an index on
+    the precomputed transition times, and so is the most neglected list when
+    everyone is on one decay model (on the last contact index). Otherwise the
+    order is computed in SQL from each person's decay model, since neither
+    time orders people on different models by score.
+    """
+    now = datetime.utcnow()
+    query = select(Person).where(Person.user_id == user_id)
+
+    if within_days is None:
+        if len(decay_models(db, user_id)) > 1:
+            order = (score_expression(db, now), Person.dormant_at)
+        else:
+            order = (Person.last_contact_date,)
+    else:
+        later = now + timedelta(days=within_days)
+        transitions = {
+            STATUS_SCORE_RANGES["healthy"][0]: Person.warning_at,
+            STATUS_SCORE_RANGES["warning"][0]: Person.dormant_at,
+        }
+        if threshold in transitions:
+            # Status boundaries are stored: a range over the transition time
+            transition = transitions[threshold]
+            query = query.where(transition > now, transition <= later)
+            order = (transition,)
+        else:
+            still_above = score_conditions(db, user_id, min_score=threshold, now=now)
+            below_later = score_conditions(db, user_id, max_score=threshold - 1, now=later)
+            if still_above is None or below_later is None:
+                return []
+            query = query.where(*still_above, *below_later)
+            order = (days_until_below_expression(db, user_id, threshold, now),)
+
+    people = db.exec(query.order_by(*order, Person.id).limit(k)).all()
+    return enrich_people_with_health(people, db)
+
+
+@router.get("/health-summary", response_model=HealthSummary)
+async def get_health_summary(
+    overdue_limit: int = Query(5, ge=0, le=50, description="Number of most overdue contacts to include"),
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Aggregate relationship health for the dashboard.
+
+    Returns counts per status, a score histogram, the mean score and the
+    most overdue contacts. Scores are computed in one vectorized pass over
+    the last contact and decay model columns; no people are loaded.
+    """
+    now = datetime.utcnow()
+    rows = db.exec(
+        select(Person.last_contact_date, Person.resolved_decay_rate, Person.resolved_decay_curve)
+        .where(Person.user_id == user_id)
+    ).all()
+    last_contact_dates, decay_rates, decay_curves = zip(*rows) if rows else ((), (), ())
+    summary = summarize_health_scores(calculate_health_scores(last_contact_dates, now, decay_rates, decay_curves))
+
+    # Most overdue: lowest scores first. On one decay model that is a top-k read of the
+    # last contact index; across models they are scored in SQL under each one's model.
+    if len(set(zip(decay_rates, decay_curves))) > 1:
+        order = (score_expression(db, now), Person.dormant_at)
+    else:
+        order = (Person.last_contact_date,)
+    overdue = db.exec(
+        select(
+            Person.id, Person.name, Person.last_contact_date,
+            Person.resolved_decay_rate, Person.resolved_decay_curve
+        )
+        .where(Person.user_id == user_id)
+        .order_by(*order, Person.id)
+        .limit(overdue_limit)
+    ).all() if overdue_limit else []
+
+    most_overdue = []
+    for person_id, name, last_contact_date, decay_rate, decay_curve in overdue:
+        score = calculate_health_score(last_contact_date, now, decay_rate, decay_curve)
+        health_status = get_health_status(score)
+        most_overdue.append(OverdueContact(
+            id=person_id,
+            name=name,
+            health_score=score,
+            health_status=health_status,
+            health_emoji=get_health_emoji(health_status),
+            days_since_contact=(now - last_contact_date).days
+        ))
+
+    return HealthSummary(**summary, most_overdue=most_overdue)
+
+
+@router.get("/health-trend", response_model=List[HealthSnapshotRead])
+async def get_health_trend(
+    start: Optional[date] = Query(None, alias="from", description="First day (YYYY-MM-DD); defaults to 30 days before 'to'"),
+    end: Optional[date] = Query(None, alias="to", description="Last day (YYYY-MM-DD); defaults to yesterday"),
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Daily relationship health over a date range, oldest day first.
+
+    Reads the rollups written by the nightly snapshot job
+    (services/health_snapshots.py); days before the first snapshot, or not
+    yet snapshotted, are absent.
+    """
+    start, end = trend_range(start, end)
+    return db.exec(
+        select(HealthSnapshot)
+        .where(
+            HealthSnapshot.user_id == user_id,
+            HealthSnapshot.snapshot_date >= start,
+            HealthSnapshot.snapshot_date <= end
         )
+        .order_by(HealthSnapshot.snapshot_date)
+    ).all()
 
-    query = query.offset(skip).limit(limit).order_by(Person.name)
-    people = db.exec(query).all()
 
-    # Enrich each person with health scores and notebook entries
-    result = [enrich_person_with_health(person, db) for person in people]
-    return result
+@router.get("/{person_id}/health-history", response_model=List[PersonHealthSnapshotRead])
+async def get_person_health_history(
+    person_id: UUID,
+    start: Optional[date] = Query(None, alias="from", description="First day (YYYY-MM-DD); defaults to 30 days before 'to'"),
+    end: Optional[date] = Query(None, alias="to", description="Last day (YYYY-MM-DD); defaults to yesterday"),
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    A person's health status changes over a date range, oldest first.
+
+    Only days on which the status changed are stored, so the latest change
+    before 'from' is included too: it is the status the range starts in.
+    """
+    person = db.get(Person, person_id)
+    if not person or person.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Person not found")
+
+    start, end = trend_range(start, end)
+    starting = db.exec(
+        select(PersonHealthSnapshot)
+        .where(PersonHealthSnapshot.person_id == person_id, PersonHealthSnapshot.snapshot_date < start)
+        .order_by(PersonHealthSnapshot.snapshot_date.desc())
+        .limit(1)
+    ).all()
+    changes = db.exec(
+        select(PersonHealthSnapshot)
+        .where(
+            PersonHealthSnapshot.person_id == person_id,
+            PersonHealthSnapshot.snapshot_date >= start,
+            PersonHealthSnapshot.snapshot_date <= end
+        )
+        .order_by(PersonHealthSnapshot.snapshot_date)
+    ).all()
+    return starting + changes
 
 
 @router.get("/map-data")
 async def get_map_data(
+    request: Request,
     db: Session = Depends(get_db),
-    user_id: UUID = Depends(get_current_user_id)
+    user_id: UUID = Depends(get_current_user_id),
+    zoom: Optional[int] = Query(
+        None, ge=0, le=MAX_ZOOM, description="Map zoom level; when given, nearby people are clustered"
+    ),
+    bbox: Optional[str] = Query(None, description="Viewport as 'west,south,east,north' in degrees")
 ) -> List[dict]:
     """
-    Get all people with coordinates for map display.
+    Get people with coordinates for map display.
+
+    Without zoom, every located person in the bbox (or everywhere) is returned
+    as a point. With zoom, people close together at that zoom level are merged
+    into clusters, and only street-level zooms return every person.
+
+    Responses are cached until something on the user's map changes and carry
+    an ETag; a matching If-None-Match gets 304 Not Modified.
 
     Returns:
-        List of people with location data
+        List of people with location data, or of map markers when zoom is given
 
     Example response:
         [
@@ -114,26 +373,59 @@ async def get_map_data(
                 "location_source": "tag:Climbing Gym",
             }
         ]
-    """
-    people = db.exec(
-        select(Person).where(Person.user_id == user_id)
-    ).all()
-
-    map_data = []
-    for person in people:
-        coords = get_person_coordinates(db, person)
-        if coords:
-            latitude, longitude, location_source = coords
 
-            map_data.append({
-                "id": str(person.id),
-                "name": person.name,
-                "latitude": latitude,
-                "longitude": longitude,
-                "location_source": location_source,
-            })
-
-    return map_data
+    Example response with zoom:
+        [
+            {"type": "cluster", "count": 42, "latitude": 37.77, "longitude": -122.42,
+             "names": ["Alice", "Bob", "Carol"]},
+            {"type": "point", "id": "uuid", "name": "Dana", "latitude": 40.71,
+             "longitude": -74.0, "location_source": "zip:10001"}
+        ]
+    """
+    viewport = parse_bbox(bbox)
+
+    # Read the version before the people: a write landing in between can only
+    # make the cached payload newer than its key, never older
+    key = map_cache.cache_key(user_id, map_cache.get_map_version(db, user_id), zoom, viewport)
+    etag = map_cache.etag_for(key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    payload = map_cache.get_payload(key)
+    if payload is None:
+        payload = json.dumps(_map_markers(db, user_id, zoom, viewport)).encode()
+        map_cache.store_payload(key, payload)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+def _map_markers(db: Session, user_id: UUID, zoom: Optional[int], viewport) -> List[dict]:
+    """Build the map-data payload from stored locations"""
+    # Locations are resolved on write, so this reads the (userId, geohash) index
+    query = select(
+        Person.id, Person.name, Person.resolved_lat, Person.resolved_lng, Person.location_source
+    ).where(Person.user_id == user_id, Person.geohash.isnot(None))
+    if viewport:
+        # Range scans over the geohash cells covering the viewport, then trim to the exact box
+        cells = geohash.cover(viewport)
+        if cells:
+            query = query.where(geohash.prefix_conditions(Person.geohash, cells))
+        query = query.where(*bbox_conditions(Person.resolved_lat, Person.resolved_lng, viewport))
+
+    if zoom is not None:
+        return cluster_points(db.exec(query.order_by(Person.name)).all(), zoom)
+
+    return [
+        {
+            "id": str(person_id),
+            "name": name,
+            "latitude": latitude,
+            "longitude": longitude,
+            "location_source": location_source,
+        }
+        for person_id, name, latitude, longitude, location_source in db.exec(query).all()
+    ]
 
 
 @router.post("/", response_model=PersonRead)
@@ -144,11 +436,184 @@ async def create_person(
 ):
     db_person = Person(**person.model_dump(), user_id=user_id)
     db.add(db_person)
+    if _needs_geocode(db_person):
+        enqueue_geocode(db, [db_person])
     db.commit()
     db.refresh(db_person)
     return enrich_person_with_health(db_person, db)
 
 
+def _needs_geocode(person: Person) -> bool:
+    """A new person has an address but no coordinates"""
+    return (
+        any([person.street_address, person.city, person.state, person.zip])
+        and person.latitude is None
+    )
+
+
+def _address_changed(person_data: dict) -> bool:
+    """An update touches the address without setting coordinates explicitly"""
+    return (
+        any(key in person_data for key in ADDRESS_FIELDS)
+        and not ("latitude" in person_data and "longitude" in person_data)
+    )
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+@router.post("/bulk", response_model=List[PersonBulkResult])
+async def bulk_create_people(
+    items: List[dict],
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Create many people in one transaction (e.g. a phone contact import).
+
+    Each item is validated as a PersonCreate; invalid items are reported in
+    the per-item results and the valid ones are still created. Addresses are
+    queued for background geocoding.
+    """
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} people per request")
+
+    results: List[PersonBulkResult] = []
+    created: List[tuple] = []
+    for index, item in enumerate(items):
+        try:
+            person = PersonCreate.model_validate(item)
+        except ValidationError as e:
+            results.append(PersonBulkResult(index=index, status="error", error=_validation_message(e)))
+            continue
+        created.append((index, Person(**person.model_dump(), user_id=user_id)))
+
+    # One flush: the ORM batches these into multi-row INSERTs
+    db.add_all([person for _, person in created])
+    enqueue_geocode(db, [person for _, person in created if _needs_geocode(person)])
+    # Read before the commit expires the instances, or each read would refresh its row
+    created_ids = [person.id for _, person in created]
+    db.commit()
+
+    # Reload the committed rows in one query instead of one refresh per person
+    if created_ids:
+        db.exec(select(Person).where(Person.id.in_(created_ids))).all()
+
+    enriched = enrich_people_with_health([person for _, person in created], db)
+    for (index, person), person_read in zip(created, enriched):
+        results.append(PersonBulkResult(
+            index=index,
+            status="created",
+            person=person_read,
+            geocode_queued=person.geocode_status == ProcessingStatus.PENDING
+        ))
+
+    return sorted(results, key=lambda result: result.index)
+
+
+@router.patch("/bulk", response_model=List[PersonBulkResult])
+async def bulk_update_people(
+    items: List[dict],
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Update many people in one transaction.
+
+    Each item is a PersonUpdate plus the person's id. Unknown ids and invalid
+    items are reported in the per-item results; the rest are written together.
+    Address changes are queued for background geocoding.
+    """
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} people per request")
+
+    results: List[PersonBulkResult] = []
+    updates: List[tuple] = []
+    for index, item in enumerate(items):
+        try:
+            updates.append((index, PersonBulkUpdate.model_validate(item)))
+        except ValidationError as e:
+            results.append(PersonBulkResult(index=index, status="error", error=_validation_message(e)))
+
+    # Load every target in one query
+    people = {
+        person.id: person
+        for person in db.exec(
+            select(Person).where(
+                Person.user_id == user_id,
+                Person.id.in_([update.id for _, update in updates])
+            )
+        ).all()
+    } if updates else {}
+
+    updated: List[tuple] = []
+    geocode_people = []
+    for index, update in updates:
+        person = people.get(update.id)
+        if not person:
+            results.append(PersonBulkResult(index=index, status="error", error="Person not found"))
+            continue
+
+        person_data = update.model_dump(exclude_unset=True, exclude={"id"})
+        for key, value in person_data.items():
+            setattr(person, key, value)
+
+        needs_geocode = _address_changed(person_data)
+        if needs_geocode:
+            geocode_people.append(person)
+        db.add(person)
+        updated.append((index, person, needs_geocode))
+
+    enqueue_geocode(db, geocode_people)
+
+    # One flush: the ORM batches same-shaped UPDATEs into executemany
+    updated_ids = [person.id for _, person, _ in updated]
+    db.commit()
+
+    # Reload the committed rows in one query instead of one refresh per person
+    if updated_ids:
+        db.exec(select(Person).where(Person.id.in_(updated_ids))).all()
+
+    enriched = enrich_people_with_health([person for _, person, _ in updated], db)
+    for (index, _, needs_geocode), person_read in zip(updated, enriched):
+        results.append(PersonBulkResult(
+            index=index, status="updated", person=person_read, geocode_queued=needs_geocode
+        ))
+
+    return sorted(results, key=lambda result: result.index)
+
+
+@router.post("/geocode-all", response_model=GeocodeBackfillRead)
+async def start_geocode_backfill(
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """
+    Geocode every person and tag that has an address but no coordinates.
+
+    Runs in the background through the rate-limited geocoding queue; poll
+    GET /geocode-all/{backfill_id} for progress. If a backfill is already
+    running, that one is returned instead of starting another.
+    """
+    return start_backfill(db, user_id)
+
+
+@router.get("/geocode-all/{backfill_id}", response_model=GeocodeBackfillRead)
+async def get_geocode_backfill(
+    backfill_id: UUID,
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """Progress of a geocoding backfill"""
+    backfill = db.get(GeocodeBackfill, backfill_id)
+    if not backfill or backfill.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Backfill not found")
+    return backfill
+
+
 @router.get("/{person_id}", response_model=PersonRead)
 async def get_person(
     person_id: UUID,
@@ -176,21 +641,9 @@ async def update_person(
     for key, value in person_data.items():
         setattr(person, key, value)
 
-    # If address changed, re-geocode
-    address_fields = ['street_address', 'city', 'state', 'zip']
-    if any(key in person_data for key in address_fields):
-        coords = geocode_address(
-            street_address=person.street_address,
-            city=person.city,
-            state=person.state,
-            zip_code=person.zip
-        )
-        if coords:
-            person.latitude, person.longitude = coords
-        else:
-            # Clear coords if geocoding fails
-            person.latitude = None
-            person.longitude = None
+    # If address changed, re-geocode in the background
+    if _address_changed(person_data):
+        enqueue_geocode(db, [person])
 
     db.add(person)
     db.commit()
@@ -231,7 +684,9 @@ async def mark_as_contacted(
     db.refresh(person)
 
     # Calculate new health score
-    health_score = calculate_health_score(person.last_contact_date)
+    health_score = calculate_health_score(
+        person.last_contact_date, decay_rate=person.resolved_decay_rate, decay_curve=person.resolved_decay_curve
+    )
 
     return {
         "message": "Contact logged",
@@ -240,27 +695,6 @@ async def mark_as_contacted(
     }
 
 
-@router.get("/search", response_model=List[PersonRead])
-async def search_people(
-    query: str,
-    db: Session = Depends(get_db),
-    user_id: UUID = Depends(get_current_user_id)
-):
-    if not query:
-        raise HTTPException(status_code=400, detail="Query parameter is required")
-
-    statement = select(Person).where(
-        Person.user_id == user_id,
-        or_(
-            Person.name.contains(query),
-            Person.body.contains(query),
-            Person.mnemonic.contains(query)
-        )
-    )
-    people = db.exec(statement).all()
-    return [enrich_person_with_health(person, db) for person in people]
-
-
 # Tag-related endpoints for people
 @router.get("/{person_id}/tags", response_model=List[TagRead])
 async def get_person_tags(
@@ -384,7 +818,7 @@ async def get_people_by_tag(
         Person.user_id == user_id
     )
     people = db.exec(query).all()
-    return [enrich_person_with_health(person, db) for person in people]
+    return enrich_people_with_health(people, db)
 
 
 @router.get("/by-tags/", response_model=List[PersonRead])
@@ -434,4 +868,4 @@ async def get_people_by_tags(
         ).distinct()
 
     people = db.exec(query).all()
-    return [enrich_person_with_health(person, db) for person in people]
\ No newline at end of file
+    return enrich_people_with_health(people, db)
\ No newline at end of file
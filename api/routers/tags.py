@@ -1,22 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select, or_, func
 from typing import List, Optional
 from uuid import UUID
 
 from database import get_db
-from models import Tag, TagCreate, TagRead, TagUpdate, PersonTag, Person
+from models import Tag, TagCreate, TagRead, TagUpdate, PersonTag, Person, PersonNearbyResult
 from routers.auth import get_current_user_id
-from services.geocoding import geocode_address
+from services.geocode_queue import enqueue_geocode
+from services.nearby import nearby_people, nearby_results
+from services.pagination import paginate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[TagRead])
 async def get_tags(
+    response: Response,
     db: Session = Depends(get_db),
     user_id: UUID = Depends(get_current_user_id),
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     skip: int = 0,
     limit: int = 100
 ):
@@ -34,9 +38,10 @@ async def get_tags(
             )
         )
     
-    query = query.offset(skip).limit(limit).order_by(Tag.name)
-    tags = db.exec(query).all()
-    return tags
+    return paginate(
+        db, query, (Tag.name, Tag.id), response,
+        cursor=cursor, skip=skip, limit=limit
+    )
 
 
 @router.post("/", response_model=TagRead)
@@ -62,6 +67,8 @@ async def create_tag(
     
     db_tag = Tag(**tag.model_dump(), user_id=user_id)
     db.add(db_tag)
+    if any([db_tag.street_address, db_tag.city, db_tag.state, db_tag.zip]) and db_tag.latitude is None:
+        enqueue_geocode(db, [db_tag])
     db.commit()
     db.refresh(db_tag)
     return db_tag
@@ -96,17 +103,13 @@ async def update_tag(
     for key, value in tag_data.items():
         setattr(tag, key, value)
 
-    # If address changed, re-geocode
+    # If address changed, re-geocode in the background
     address_fields = ['street_address', 'city', 'state', 'zip']
-    if any(key in tag_data for key in address_fields):
-        coords = geocode_address(
-            street_address=tag.street_address,
-            city=tag.city,
-            state=tag.state,
-            zip_code=tag.zip
-        )
-        if coords:
-            tag.latitude, tag.longitude = coords
+    if (
+        any(key in tag_data for key in address_fields)
+        and not ("latitude" in tag_data and "longitude" in tag_data)
+    ):
+        enqueue_geocode(db, [tag])
 
     db.add(tag)
     db.commit()
@@ -160,6 +163,25 @@ async def get_tag_people(
     return [person.model_dump() for person in people]
 
 
+@router.get("/{tag_id}/nearby", response_model=List[PersonNearbyResult])
+async def get_people_near_tag(
+    tag_id: UUID,
+    radius_km: float = Query(25, gt=0, le=1000),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_current_user_id)
+):
+    """Get people located within radius_km of a tag's location, nearest first"""
+    tag = db.get(Tag, tag_id)
+    if not tag or tag.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    if tag.latitude is None or tag.longitude is None:
+        raise HTTPException(status_code=400, detail="Tag has no location")
+
+    hits = nearby_people(db, user_id, tag.latitude, tag.longitude, radius_km, limit=limit)
+    return nearby_results(db, hits)
+
+
 @router.get("/suggest/", response_model=List[TagRead])
 async def suggest_tags(
     query: str = Query(..., description="Search query for tag suggestions"),
@@ -0,0 +1,97 @@
+"""
+PersonRead views of people: health score and status, tags and the latest
+notebook entry.
+
+Shared by every endpoint that returns people, so the queries run per page
+rather than per person.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import List
+
+from sqlmodel import Session, func, select
+
+from models import NotebookEntry, Person, PersonRead, PersonTag, Tag
+from services.health_score import calculate_health_score, get_health_emoji, get_health_status
+from services.notebook import materialize, segments_by_entry
+
+
+def enrich_people_with_health(people: List[Person], db: Session) -> List[PersonRead]:
+    """
+    Enrich a page of Person objects with health scores, latest notebook entry and tags.
+
+    Runs a fixed number of queries regardless of how many people are passed in:
+    one for the latest notebook entry per person and one for all their tags.
+    """
+    if not people:
+        return []
+
+    person_ids = [person.id for person in people]
+
+    # Latest notebook entry per person (window function works on Postgres and SQLite)
+    ranked_entries = select(
+        NotebookEntry.id,
+        NotebookEntry.person_id,
+        NotebookEntry.content,
+        NotebookEntry.created_at,
+        func.row_number().over(
+            partition_by=NotebookEntry.person_id,
+            order_by=NotebookEntry.created_at.desc()
+        ).label("rank")
+    ).where(NotebookEntry.person_id.in_(person_ids)).subquery()
+
+    latest_entries_query = select(
+        ranked_entries.c.id,
+        ranked_entries.c.person_id,
+        ranked_entries.c.content,
+        ranked_entries.c.created_at
+    ).where(ranked_entries.c.rank == 1)
+    latest_rows = db.exec(latest_entries_query).all()
+    # Text appended since the entry was last compacted
+    segments = segments_by_entry(db, [entry_id for entry_id, *_ in latest_rows])
+    latest_entries = {
+        person_id: (materialize(content, segments.get(entry_id, [])), created_at)
+        for entry_id, person_id, content, created_at in latest_rows
+    }
+
+    # All tags for every person on the page in one join
+    tags_query = select(PersonTag.person_id, Tag).join(
+        Tag, Tag.id == PersonTag.tag_id
+    ).where(PersonTag.person_id.in_(person_ids))
+    tags_by_person = defaultdict(list)
+    for person_id, tag in db.exec(tags_query).all():
+        tags_by_person[person_id].append(tag)
+
+    now = datetime.utcnow()
+    result = []
+    for person in people:
+        # Calculate health score
+        health_score = calculate_health_score(
+            person.last_contact_date, now, person.resolved_decay_rate, person.resolved_decay_curve
+        )
+        health_status = get_health_status(health_score)
+
+        # Build PersonRead dict
+        person_dict = person.model_dump()
+        person_dict['health_score'] = health_score
+        person_dict['health_status'] = health_status
+        person_dict['health_emoji'] = get_health_emoji(health_status)
+        person_dict['days_since_contact'] = (now - person.last_contact_date).days
+        person_dict['tags'] = tags_by_person.get(person.id, [])
+
+        latest_entry = latest_entries.get(person.id)
+        if latest_entry:
+            person_dict['latest_notebook_entry_content'] = latest_entry[0]
+            person_dict['latest_notebook_entry_time'] = latest_entry[1]
+
+        result.append(PersonRead(**person_dict))
+
+    return result
+
+
+def enrich_person_with_health(person: Person, db: Session) -> PersonRead:
+    """
+    Enrich a Person object with computed health score fields and tags
+    """
+    return enrich_people_with_health([person], db)[0]
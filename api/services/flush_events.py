@@ -0,0 +1,141 @@
+"""
+One pair of ORM flush listeners for all state derived from people and tags.
+
+Search documents, resolved locations, map versions, name trigrams and health
+schedules are recomputed in the same transaction as the change that affects
+them. Each of those services registers a FlushHandler here instead of its
+own after_flush/after_flush_postexec pair:
+
+- watch() declares which model instances matter and, for dirty instances,
+  which attributes: a write that changes none of them (e.g. a geocode job
+  touching only geocode_status) costs the handler nothing.
+- after_flush walks the session's new, dirty and deleted instances once and
+  collects keys (usually ids) into the handler's named buckets.
+- after_flush_postexec calls each handler that collected anything with the
+  session's connection and its buckets; it must use Core statements.
+"""
+
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import select
+
+from models import PersonTag
+import logging
+
+logger = logging.getLogger(__name__)
+
+# session.info key holding {handler name: {bucket: keys}} between the two events
+_PENDING_KEY = "flush_handlers_pending"
+
+Buckets = Dict[str, Set[Any]]
+
+
+class FlushHandler:
+    """Derived state recomputed after flushes that write the attributes it watches"""
+
+    def __init__(
+        self,
+        name: str,
+        apply: Callable[[Any, Buckets], None],
+        dialect: Optional[str] = None
+    ):
+        """
+        Args:
+            name: Unique name, used to keep its pending keys apart
+            apply: Called as apply(connection, buckets) after the flush
+            dialect: Only run on this database dialect
+        """
+        self.name = name
+        self.apply = apply
+        self.dialect = dialect
+
+    def watch(
+        self,
+        model: type,
+        bucket: str,
+        fields: Optional[Sequence[str]] = None,
+        key: Callable[[Any], Any] = lambda obj: obj.id,
+        new: bool = True,
+        deleted: bool = True
+    ) -> "FlushHandler":
+        """
+        Collect key(obj) into bucket for written instances of model.
+
+        Args:
+            fields: Attributes whose change makes a dirty instance count;
+                None counts every dirty instance, an empty list none
+            new, deleted: Whether inserted / deleted instances count
+        """
+        _watches.setdefault(model, []).append((self, bucket, fields, key, new, deleted))
+        return self
+
+
+_handlers: List[FlushHandler] = []
+
+# model -> [(handler, bucket, fields, key, new, deleted)]
+_watches: Dict[type, List[Tuple]] = {}
+
+
+def register(name: str, apply: Callable[[Any, Buckets], None], dialect: Optional[str] = None) -> FlushHandler:
+    """Create and register a FlushHandler; add its watches with watch()"""
+    if any(handler.name == name for handler in _handlers):
+        raise ValueError(f"Flush handler '{name}' is already registered")
+    handler = FlushHandler(name, apply, dialect)
+    _handlers.append(handler)
+    return handler
+
+
+def people_of_tags(connection, tag_ids: Iterable[UUID]) -> Set[UUID]:
+    """IDs of the people linked to any of the given tags"""
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return set()
+    return set(connection.execute(
+        select(PersonTag.person_id).where(PersonTag.tag_id.in_(tag_ids))
+    ).scalars().all())
+
+
+def _changed(obj, fields: Sequence[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect(session, flush_context):
+    """Record, per handler, the keys this flush's writes affect"""
+    if not _watches:
+        return
+    dialect = session.get_bind().dialect.name
+    pending: Dict[str, Buckets] = session.info.setdefault(_PENDING_KEY, {})
+
+    writes = chain(
+        ((obj, "new") for obj in session.new),
+        ((obj, "dirty") for obj in session.dirty),
+        ((obj, "deleted") for obj in session.deleted),
+    )
+    for obj, kind in writes:
+        for handler, bucket, fields, key, new, deleted in _watches.get(type(obj), ()):
+            if handler.dialect and handler.dialect != dialect:
+                continue
+            if kind == "new" and not new or kind == "deleted" and not deleted:
+                continue
+            if kind == "dirty" and fields is not None and not _changed(obj, fields):
+                continue
+            pending.setdefault(handler.name, {}).setdefault(bucket, set()).add(key(obj))
+
+
+@event.listens_for(OrmSession, "after_flush_postexec")
+def _apply(session, flush_context):
+    """Run each handler that collected keys, inside the same transaction"""
+    pending: Dict[str, Buckets] = session.info.pop(_PENDING_KEY, {})
+    if not pending:
+        return
+    connection = session.connection()
+    for handler in _handlers:
+        buckets = pending.get(handler.name)
+        if buckets:
+            handler.apply(connection, buckets)
@@ -0,0 +1,390 @@
+"""
+Background geocoding queue for people and tags.
+
+Request handlers never call the geocoder themselves. When an address changes
+they call enqueue_geocode(), which marks the record's geocode_status as
+pending and adds a row to geocodeJobs in the same transaction. A
+GeocodeWorker started with the app drains due jobs one at a time (the
+geocoder itself limits Nominatim traffic to one request per second), writes
+the coordinates back and marks the record completed. Network errors are
+retried with exponential backoff; addresses that cannot be found are marked
+failed.
+
+A backfill (start_backfill) geocodes every person and tag of a user that has
+an address but no coordinates. The worker feeds its targets into the queue
+BACKFILL_BATCH_SIZE at a time, so edits made meanwhile are never stuck behind
+thousands of backfill jobs, and it checkpoints the last target queued so a
+restarted process carries on where the previous one stopped.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Union
+from uuid import UUID
+import logging
+
+from sqlalchemy import delete, or_, tuple_, update
+from sqlmodel import Session, select, func
+
+from models import GeocodeBackfill, GeocodeJob, Person, ProcessingStatus, Tag
+from services import geocoders
+from services.geocoding import GeocoderUnavailable, GeocodingError, geocode_address
+
+logger = logging.getLogger(__name__)
+
+# Failed requests are retried after 1, 2, 4, ... minutes, capped at 6 hours
+MAX_ATTEMPTS = 8
+RETRY_BASE = timedelta(minutes=1)
+RETRY_MAX = timedelta(hours=6)
+
+# A claimed job is hidden from other workers for this long
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+# Seconds the worker sleeps when the queue is empty
+POLL_INTERVAL = 5.0
+
+# Backfill targets waiting in the queue at any time
+BACKFILL_BATCH_SIZE = 20
+
+# Seconds between checks for backfills that need their next batch queued
+BACKFILL_INTERVAL = 5.0
+
+ACTIVE_BACKFILL_STATUSES = [ProcessingStatus.PENDING, ProcessingStatus.PROCESSING]
+
+TARGET_MODELS = {"person": Person, "tag": Tag}
+
+Geocodable = Union[Person, Tag]
+
+
+def _target_type(target: Geocodable) -> str:
+    return "person" if isinstance(target, Person) else "tag"
+
+
+def _has_address(target: Geocodable) -> bool:
+    return any((value or "").strip() for value in [target.street_address, target.city, target.state, target.zip])
+
+
+def _release_from_backfills(db: Session, released: Dict[UUID, int]) -> None:
+    """
+    Take jobs out of their backfills' queued counts when they leave the
+    backfill without a result (re-queued by an edit, address removed, target
+    deleted), so succeeded + failed still reaches queued.
+    """
+    for backfill_id, count in released.items():
+        db.execute(
+            update(GeocodeBackfill)
+            .where(GeocodeBackfill.id == backfill_id)
+            .values(queued=GeocodeBackfill.queued - count, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def enqueue_geocode(
+    db: Session,
+    targets: Iterable[Geocodable],
+    backfill_id: Optional[UUID] = None
+) -> None:
+    """
+    Queue people/tags for geocoding after an address change.
+
+    Clears their coordinates and marks them pending (or, if the address was
+    removed, clears the status). Changes are added to the session and saved
+    with the caller's commit. backfill_id attributes the jobs to a backfill.
+    """
+    targets = list(targets)
+    if not targets:
+        return
+
+    keys = [(_target_type(target), target.id) for target in targets]
+    existing = {
+        (job.target_type, job.target_id): job
+        for job in db.exec(
+            select(GeocodeJob).where(tuple_(GeocodeJob.target_type, GeocodeJob.target_id).in_(keys))
+        ).all()
+    }
+
+    now = datetime.utcnow()
+    released: Dict[UUID, int] = {}
+    for target, key in zip(targets, keys):
+        target.latitude = None
+        target.longitude = None
+        job = existing.get(key)
+        # A job whose retries ran out was already counted as failed
+        if job and job.backfill_id and job.backfill_id != backfill_id and job.next_attempt_at is not None:
+            released[job.backfill_id] = released.get(job.backfill_id, 0) + 1
+
+        if not _has_address(target):
+            target.geocode_status = None
+            if job:
+                db.delete(job)
+            db.add(target)
+            continue
+
+        if job is None:
+            job = GeocodeJob(target_type=key[0], target_id=key[1])
+            existing[key] = job
+        job.attempts = 0
+        job.last_error = None
+        job.next_attempt_at = now
+        job.enqueued_at = now
+        job.backfill_id = backfill_id
+        target.geocode_status = ProcessingStatus.PENDING
+        db.add(job)
+        db.add(target)
+    _release_from_backfills(db, released)
+
+
+def _claim_next_job(db: Session) -> Optional[GeocodeJob]:
+    """Claim the oldest due job, or return None if nothing is due"""
+    now = datetime.utcnow()
+    while True:
+        job = db.exec(
+            select(GeocodeJob)
+            .where(GeocodeJob.next_attempt_at <= now)
+            .order_by(GeocodeJob.next_attempt_at)
+            .limit(1)
+        ).first()
+        if job is None:
+            return None
+
+        # Push the job into the future; only one worker wins the update
+        claimed = db.execute(
+            update(GeocodeJob)
+            .where(
+                GeocodeJob.target_type == job.target_type,
+                GeocodeJob.target_id == job.target_id,
+                GeocodeJob.next_attempt_at == job.next_attempt_at
+            )
+            .values(next_attempt_at=now + CLAIM_TIMEOUT)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return job
+
+
+def process_next_job(session_factory: Callable[[], Session]) -> bool:
+    """
+    Geocode the next due job.
+
+    Returns:
+        True if a job was processed, False if the queue had nothing due
+        or the geocoder's circuit breaker is open
+    """
+    # While the geocoder is down, leave jobs alone instead of using up their attempts
+    if geocoders.breaker.retry_after() > 0:
+        return False
+
+    with session_factory() as db:
+        job = _claim_next_job(db)
+        if job is None:
+            return False
+
+        key = (job.target_type, job.target_id)
+        enqueued_at = job.enqueued_at
+        target = db.get(TARGET_MODELS[job.target_type], job.target_id)
+        if target is None:
+            db.execute(delete(GeocodeJob).where(
+                GeocodeJob.target_type == key[0], GeocodeJob.target_id == key[1]
+            ))
+            if job.backfill_id:
+                _release_from_backfills(db, {job.backfill_id: 1})
+            db.commit()
+            return True
+
+        error = None
+        unavailable = False
+        try:
+            coords = geocode_address(
+                street_address=target.street_address,
+                city=target.city,
+                state=target.state,
+                zip_code=target.zip,
+                db=db,
+                raise_errors=True
+            )
+        except GeocoderUnavailable as e:
+            coords, error, unavailable = None, str(e), True
+        except GeocodingError as e:
+            coords, error = None, str(e)
+
+        # Reload: the address may have changed while we were geocoding
+        db.expire_all()
+        job = db.get(GeocodeJob, key)
+        target = db.get(TARGET_MODELS[key[0]], key[1])
+        if job is None or target is None or job.enqueued_at != enqueued_at:
+            # Re-queued (or deleted) meanwhile; the newer job writes the result
+            db.commit()
+            return True
+
+        if unavailable:
+            # Not the job's fault: retry once the circuit lets requests through
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=geocoders.breaker.retry_after())
+            db.add(job)
+        elif error is None:
+            target.latitude, target.longitude = coords if coords else (None, None)
+            target.geocode_status = ProcessingStatus.COMPLETED if coords else ProcessingStatus.FAILED
+            db.delete(job)
+        else:
+            job.attempts += 1
+            job.last_error = error[:500]
+            if job.attempts < MAX_ATTEMPTS:
+                job.next_attempt_at = datetime.utcnow() + min(RETRY_BASE * 2 ** (job.attempts - 1), RETRY_MAX)
+            else:
+                logger.warning(f"Giving up geocoding {key[0]} {key[1]} after {job.attempts} attempts: {error}")
+                job.next_attempt_at = None
+                target.geocode_status = ProcessingStatus.FAILED
+            db.add(job)
+        db.add(target)
+
+        if job.backfill_id and target.geocode_status != ProcessingStatus.PENDING:
+            counter = "succeeded" if target.geocode_status == ProcessingStatus.COMPLETED else "failed"
+            db.execute(
+                update(GeocodeBackfill)
+                .where(GeocodeBackfill.id == job.backfill_id)
+                .values({counter: getattr(GeocodeBackfill, counter) + 1, "updated_at": datetime.utcnow()})
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        return True
+
+
+def _missing_coordinates(model):
+    """Condition for people/tags that have an address but no coordinates; blank parts don't count, as in _has_address"""
+    return [
+        model.latitude.is_(None),
+        or_(*[
+            func.coalesce(func.trim(column), "") != ""
+            for column in [model.street_address, model.city, model.state, model.zip]
+        ])
+    ]
+
+
+def start_backfill(db: Session, user_id: UUID) -> GeocodeBackfill:
+    """
+    Start geocoding a user's people and tags that have no coordinates.
+
+    Returns the user's running backfill instead if there is one.
+    """
+    backfill = db.exec(
+        select(GeocodeBackfill).where(
+            GeocodeBackfill.user_id == user_id,
+            GeocodeBackfill.status.in_(ACTIVE_BACKFILL_STATUSES)
+        )
+    ).first()
+    if backfill:
+        return backfill
+
+    total = sum(
+        db.exec(
+            select(func.count()).select_from(model).where(model.user_id == user_id, *_missing_coordinates(model))
+        ).one()
+        for model in TARGET_MODELS.values()
+    )
+    backfill = GeocodeBackfill(user_id=user_id, total=total)
+    if total == 0:
+        backfill.status = ProcessingStatus.COMPLETED
+        backfill.all_queued = True
+        backfill.completed_at = datetime.utcnow()
+    db.add(backfill)
+    db.commit()
+    db.refresh(backfill)
+    return backfill
+
+
+def _queue_backfill_batch(db: Session, backfill: GeocodeBackfill, size: int) -> None:
+    """Queue the next targets after the backfill's checkpoint"""
+    target_types = list(TARGET_MODELS)
+    target_type = backfill.checkpoint_type or target_types[0]
+    while size > 0:
+        model = TARGET_MODELS[target_type]
+        query = select(model).where(model.user_id == backfill.user_id, *_missing_coordinates(model))
+        if backfill.checkpoint_type == target_type and backfill.checkpoint_id:
+            query = query.where(model.id > backfill.checkpoint_id)
+        targets = db.exec(query.order_by(model.id).limit(size)).all()
+
+        if targets:
+            enqueue_geocode(db, targets, backfill_id=backfill.id)
+            backfill.checkpoint_type = target_type
+            backfill.checkpoint_id = targets[-1].id
+            backfill.queued += len(targets)
+            size -= len(targets)
+        if size > 0:
+            # This target type is exhausted; move on to the next one
+            position = target_types.index(target_type)
+            if position + 1 == len(target_types):
+                backfill.all_queued = True
+                return
+            target_type = target_types[position + 1]
+            backfill.checkpoint_type = target_type
+            backfill.checkpoint_id = None
+
+
+def advance_backfills(session_factory: Callable[[], Session]) -> None:
+    """Top up the queue for running backfills and mark finished ones completed"""
+    with session_factory() as db:
+        backfills = db.exec(
+            select(GeocodeBackfill).where(GeocodeBackfill.status.in_(ACTIVE_BACKFILL_STATUSES))
+        ).all()
+        for backfill in backfills:
+            outstanding = db.exec(
+                select(func.count()).select_from(GeocodeJob).where(
+                    GeocodeJob.backfill_id == backfill.id,
+                    GeocodeJob.next_attempt_at.isnot(None)
+                )
+            ).one()
+
+            if not backfill.all_queued and outstanding < BACKFILL_BATCH_SIZE:
+                _queue_backfill_batch(db, backfill, BACKFILL_BATCH_SIZE - outstanding)
+                backfill.status = ProcessingStatus.PROCESSING
+                outstanding = None  # just queued more
+
+            if backfill.all_queued and outstanding == 0:
+                backfill.status = ProcessingStatus.COMPLETED
+                backfill.completed_at = datetime.utcnow()
+
+            backfill.updated_at = datetime.utcnow()
+            db.add(backfill)
+            # One transaction per backfill: jobs and checkpoint commit together
+            db.commit()
+
+
+class GeocodeWorker:
+    """Drains the geocoding queue in a background task on the app's event loop"""
+
+    def __init__(self, session_factory: Callable[[], Session], poll_interval: float = POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        last_backfill_check = 0.0
+        while True:
+            if time.monotonic() - last_backfill_check >= BACKFILL_INTERVAL:
+                last_backfill_check = time.monotonic()
+                try:
+                    await asyncio.to_thread(advance_backfills, self.session_factory)
+                except Exception:
+                    logger.exception("Geocoding worker failed to advance backfills")
+
+            try:
+                # Geocoding blocks (network + rate limit), so keep it off the event loop
+                processed = await asyncio.to_thread(process_next_job, self.session_factory)
+            except Exception:
+                logger.exception("Geocoding worker failed to process a job")
+                processed = False
+            if not processed:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
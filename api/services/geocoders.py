@@ -0,0 +1,322 @@
+"""
+Geocoder backends and the circuit breaker in front of them.
+
+services/geocoding.py caches results and asks the configured backend
+(GEOCODER_BACKEND) only about addresses it has not seen:
+
+- "nominatim" (default): OpenStreetMap Nominatim over a pooled async httpx
+  client. NOMINATIM_URL points it at another instance, such as the stand-in
+  server in fake_geocoder.py.
+- "offline": answers ZIP codes from the centroid dataset and never touches
+  the network.
+
+Backends are async; synchronous callers (the geocoding queue runs in worker
+threads) go through lookup(), which runs them on one long-lived event loop so
+the HTTP connection pool is reused across lookups.
+
+After FAILURE_THRESHOLD consecutive errors or timeouts the circuit opens and
+lookups fail immediately with GeocoderUnavailable instead of each waiting out
+the request timeout. Once RESET_TIMEOUT has passed the circuit is half-open:
+a single trial lookup is let through, and its outcome closes the circuit or
+opens it again.
+
+Requests to a backend are spaced at least its min_interval apart. With
+REDIS_URL set the spacing is shared through Redis, so every process and
+worker together stays within the provider's limit; without it each process
+keeps its own clock, and running N workers allows N times the rate.
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+from threading import Lock, Thread
+from typing import Callable, Optional, Tuple
+import logging
+import os
+import time
+
+import httpx
+
+from services.redis_client import get_redis
+from services.zip_centroids import lookup_zip
+
+logger = logging.getLogger(__name__)
+
+GEOCODER_BACKEND = os.getenv("GEOCODER_BACKEND", "nominatim")
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+USER_AGENT = "peopleperson-app"
+
+# Seconds before a Nominatim request is abandoned
+REQUEST_TIMEOUT = 5.0
+
+# Nominatim's usage policy allows at most one request per second
+MIN_REQUEST_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
+
+# Consecutive failures that open the circuit
+FAILURE_THRESHOLD = 5
+
+# Seconds the circuit stays open before a trial lookup is allowed
+RESET_TIMEOUT = 30.0
+
+Coordinates = Tuple[float, float]
+
+
+class GeocodingError(Exception):
+    """The geocoder could not be reached or returned an error (worth retrying)"""
+
+
+class GeocoderUnavailable(GeocodingError):
+    """The circuit is open; the geocoder was not called"""
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of a backend and decides whether to call it.
+
+    closed: calls go through. open: calls fail fast until reset_timeout has
+    passed. half_open: one trial call goes through; the rest fail fast.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = Lock()
+
+    def retry_after(self) -> float:
+        """Seconds until a call would be let through (0 if it would be now)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            if self.state == self.HALF_OPEN:
+                # A trial is in flight; check back shortly
+                return 1.0
+            return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            GeocoderUnavailable: If the call should not be made
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self.clock() >= self.opened_at + self.reset_timeout:
+                self.state = self.HALF_OPEN
+                logger.info("Geocoder circuit half-open; sending a trial request")
+                return
+            raise GeocoderUnavailable("Geocoder circuit is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Geocoder circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Geocoder circuit open after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class Geocoder(ABC):
+    """Base class for geocoder backends"""
+
+    # Minimum seconds between requests (across processes when REDIS_URL is set)
+    min_interval = 0.0
+
+    @abstractmethod
+    async def geocode(
+        self,
+        street_address: Optional[str],
+        city: Optional[str],
+        state: Optional[str],
+        zip_code: Optional[str]
+    ) -> Optional[Coordinates]:
+        """
+        Returns:
+            (latitude, longitude), or None if the address was not found
+
+        Raises:
+            GeocodingError: If the lookup failed
+        """
+
+    async def aclose(self) -> None:
+        pass
+
+
+class NominatimGeocoder(Geocoder):
+    """Nominatim search API over a pooled async HTTP client"""
+
+    def __init__(
+        self,
+        base_url: str = NOMINATIM_URL,
+        timeout: float = REQUEST_TIMEOUT,
+        min_interval: float = MIN_REQUEST_INTERVAL,
+        max_connections: int = 4
+    ):
+        self.min_interval = min_interval
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"User-Agent": USER_AGENT},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def geocode(self, street_address, city, state, zip_code):
+        address = ", ".join(p for p in [street_address, city, state, zip_code] if p)
+        try:
+            response = await self.client.get("/search", params={
+                "q": address,
+                "format": "jsonv2",
+                "limit": 1,
+                "countrycodes": "us",  # Only search in United States
+            })
+            response.raise_for_status()
+            results = response.json()
+        except httpx.TimeoutException as e:
+            raise GeocodingError(f"Timed out geocoding '{address}'") from e
+        except (httpx.HTTPError, ValueError) as e:
+            raise GeocodingError(f"{type(e).__name__}: {e}") from e
+
+        if not results:
+            return None
+        return (float(results[0]["lat"]), float(results[0]["lon"]))
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class OfflineGeocoder(Geocoder):
+    """Answers from the bundled ZIP centroids only; everything else is not found"""
+
+    async def geocode(self, street_address, city, state, zip_code):
+        return lookup_zip(zip_code) if zip_code else None
+
+
+BACKENDS = {"nominatim": NominatimGeocoder, "offline": OfflineGeocoder}
+
+breaker = CircuitBreaker()
+
+_geocoder: Optional[Geocoder] = None
+_geocoder_lock = Lock()
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = Lock()
+
+_rate_lock = Lock()
+_last_request_at = 0.0
+
+
+def get_geocoder() -> Geocoder:
+    """The configured backend, created on first use"""
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            if GEOCODER_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown GEOCODER_BACKEND '{GEOCODER_BACKEND}'")
+            _geocoder = BACKENDS[GEOCODER_BACKEND]()
+        return _geocoder
+
+
+def set_geocoder(geocoder: Optional[Geocoder]) -> None:
+    """Replace the backend (None: recreate the configured one) and reset the circuit"""
+    global _geocoder
+    with _geocoder_lock:
+        previous, _geocoder = _geocoder, geocoder
+    if previous is not None and _loop is not None:
+        asyncio.run_coroutine_threadsafe(previous.aclose(), _loop)
+    breaker.record_success()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            Thread(target=_loop.run_forever, name="geocoder", daemon=True).start()
+        return _loop
+
+
+def _wait_for_shared_rate_limit(client, min_interval: float) -> None:
+    """Block until this process holds the backend's request slot in Redis"""
+    key = f"geocoder:rate:{GEOCODER_BACKEND}"
+    interval_ms = max(1, int(min_interval * 1000))
+    # SET NX PX: whoever creates the key may send now; the key expiring frees the next slot
+    while not client.set(key, 1, nx=True, px=interval_ms):
+        remaining_ms = client.pttl(key)
+        time.sleep(max(remaining_ms, 1) / 1000)
+
+
+def _wait_for_rate_limit(min_interval: float) -> None:
+    """Block until the next request is allowed (shared via Redis if configured, else per process)"""
+    global _last_request_at
+    if min_interval <= 0:
+        return
+
+    client = get_redis()
+    if client is not None:
+        try:
+            _wait_for_shared_rate_limit(client, min_interval)
+            return
+        except Exception as e:
+            # Fall back to this process's own clock rather than fail the lookup
+            logger.warning(f"Shared geocoder rate limit unavailable: {e}")
+
+    with _rate_lock:
+        wait = _last_request_at + min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request_at = time.monotonic()
+
+
+def lookup(
+    street_address: Optional[str],
+    city: Optional[str],
+    state: Optional[str],
+    zip_code: Optional[str]
+) -> Optional[Coordinates]:
+    """
+    Geocode through the configured backend and the circuit breaker.
+
+    Blocking; call it from a worker thread, not from the event loop.
+
+    Raises:
+        GeocoderUnavailable: If the circuit is open
+        GeocodingError: If the backend failed
+    """
+    # Resolved before taking a (possibly half-open trial) slot from the breaker
+    geocoder = get_geocoder()
+    breaker.before_call()
+
+    try:
+        _wait_for_rate_limit(geocoder.min_interval)
+        future = asyncio.run_coroutine_threadsafe(
+            geocoder.geocode(street_address, city, state, zip_code), _event_loop()
+        )
+        coords = future.result()
+    except GeocodingError:
+        breaker.record_failure()
+        raise
+    except Exception as e:
+        breaker.record_failure()
+        raise GeocodingError(f"{type(e).__name__}: {e}") from e
+
+    breaker.record_success()
+    return coords
@@ -1,23 +1,125 @@
 """
 Geocoding service to convert addresses to coordinates.
-Uses geopy with Nominatim (free, OpenStreetMap-based).
+Lookups go to the configured backend (Nominatim by default, see
+services/geocoders.py) behind a circuit breaker.
+
+Lookups with only a ZIP code are answered from the bundled ZIP centroid
+dataset without touching the network. Other results are cached by normalized
+address: an in-process LRU in front of the persistent geocodeCache table.
+Addresses Nominatim cannot resolve are cached too (for a shorter time), so
+repeated lookups of the same address never leave the process and we stay
+inside Nominatim's rate limits.
 """
 
-from geopy.geocoders import Nominatim
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from sqlmodel import Session
 from typing import Optional, Tuple
 import logging
+import re
+
+from models import GeocodeCache
+from services import geocoders
+from services.geocoders import GeocodingError, GeocoderUnavailable
+from services.zip_centroids import lookup_zip
 
 logger = logging.getLogger(__name__)
 
-# Initialize geocoder (Nominatim requires a user agent)
-geolocator = Nominatim(user_agent="peopleperson-app")
+# How long cached results stay valid
+POSITIVE_TTL = timedelta(days=90)
+NEGATIVE_TTL = timedelta(days=7)
+
+# Entries kept in the in-process LRU
+LRU_SIZE = 2048
+
+_lru: "OrderedDict[str, Tuple[Optional[Tuple[float, float]], datetime]]" = OrderedDict()
+_lru_lock = Lock()
+
+
+def normalize_address(*parts: Optional[str]) -> Optional[str]:
+    """
+    Build a cache key from address components.
+
+    Lowercases, strips punctuation and collapses whitespace so that
+    "123 Main St." and "123  main st" share a cache entry.
+
+    Examples:
+        >>> normalize_address("123 Main St.", None, "CA", "94110")
+        '123 main st, ca, 94110'
+    """
+    normalized = []
+    for part in parts:
+        if not part:
+            continue
+        part = re.sub(r"[^\w\s-]", " ", part.lower())
+        part = re.sub(r"\s+", " ", part).strip()
+        if part:
+            normalized.append(part)
+    return ", ".join(normalized) or None
+
+
+def _lru_get(key: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is None:
+            return False, None
+        coords, expires_at = entry
+        if expires_at <= datetime.utcnow():
+            del _lru[key]
+            return False, None
+        _lru.move_to_end(key)
+        return True, coords
+
+
+def _lru_put(key: str, coords: Optional[Tuple[float, float]], expires_at: datetime) -> None:
+    with _lru_lock:
+        _lru[key] = (coords, expires_at)
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def clear_geocode_cache() -> None:
+    """Clear the in-process LRU (the persistent cache is left untouched)"""
+    with _lru_lock:
+        _lru.clear()
+
+
+def _cache_lookup(db: Session, key: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+    entry = db.get(GeocodeCache, key)
+    if not entry or entry.expires_at <= datetime.utcnow():
+        return False, None
+
+    coords = None
+    if entry.latitude is not None and entry.longitude is not None:
+        coords = (entry.latitude, entry.longitude)
+    _lru_put(key, coords, entry.expires_at)
+    return True, coords
+
+
+def _cache_store(db: Optional[Session], key: str, coords: Optional[Tuple[float, float]]) -> None:
+    expires_at = datetime.utcnow() + (POSITIVE_TTL if coords else NEGATIVE_TTL)
+    _lru_put(key, coords, expires_at)
+
+    if db is None:
+        return
+
+    # Written through the caller's session and persisted with its commit
+    entry = db.get(GeocodeCache, key) or GeocodeCache(address_key=key, expires_at=expires_at)
+    entry.latitude, entry.longitude = coords if coords else (None, None)
+    entry.created_at = datetime.utcnow()
+    entry.expires_at = expires_at
+    db.add(entry)
 
 
 def geocode_address(
     street_address: Optional[str] = None,
     city: Optional[str] = None,
     state: Optional[str] = None,
-    zip_code: Optional[str] = None
+    zip_code: Optional[str] = None,
+    db: Optional[Session] = None,
+    raise_errors: bool = False
 ) -> Optional[Tuple[float, float]]:
     """
     Convert address to coordinates.
@@ -27,10 +129,19 @@ def geocode_address(
         city: City name
         state: State name or abbreviation
         zip_code: ZIP/postal code
+        db: Database session for the persistent cache. Without it only the
+            in-process cache is used. New cache rows are added to this
+            session and saved when the caller commits.
+        raise_errors: Raise GeocodingError on network/service errors instead
+            of returning None, so callers can tell them apart from "not found"
 
     Returns:
         Tuple of (latitude, longitude) or None if geocoding fails
 
+    Raises:
+        GeocodingError: If raise_errors is set and the geocoder request failed
+            (GeocoderUnavailable if the circuit breaker is open)
+
     Examples:
         >>> geocode_address(zip_code="94110")
         (37.7484, -122.4156)
@@ -44,21 +155,38 @@ def geocode_address(
         logger.warning("No address components provided for geocoding")
         return None
 
+    # ZIP-only lookups are answered offline from the centroid dataset
+    if zip_code and not any([street_address, city, state]):
+        coords = lookup_zip(zip_code)
+        if coords:
+            return coords
+
     address = ", ".join(parts)
+    key = normalize_address(street_address, city, state, zip_code)
+
+    hit, coords = _lru_get(key)
+    if not hit and db is not None:
+        hit, coords = _cache_lookup(db, key)
+    if hit:
+        return coords
 
     try:
-        # Restrict to US by using countrycodes parameter
-        location = geolocator.geocode(
-            address,
-            timeout=10,
-            country_codes=['us']  # Only search in United States
-        )
-        if location:
-            logger.info(f"Geocoded '{address}' to ({location.latitude}, {location.longitude})")
-            return (location.latitude, location.longitude)
-        else:
-            logger.warning(f"Could not geocode address: {address}")
-            return None
-    except Exception as e:
+        coords = geocoders.lookup(street_address, city, state, zip_code)
+    except GeocoderUnavailable:
+        if raise_errors:
+            raise
+        return None
+    except GeocodingError as e:
+        # Transient failures (timeouts, HTTP errors) are not cached
         logger.error(f"Geocoding error for '{address}': {e}")
+        if raise_errors:
+            raise
         return None
+
+    if coords:
+        logger.info(f"Geocoded '{address}' to {coords}")
+    else:
+        logger.warning(f"Could not geocode address: {address}")
+
+    _cache_store(db, key, coords)
+    return coords
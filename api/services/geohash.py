@@ -0,0 +1,179 @@
+"""
+Geohash encoding and bounding-box covering for spatial queries.
+
+A geohash interleaves longitude and latitude bits into a base32 string, so
+nearby points share a prefix and every prefix is a rectangular cell. Storing
+the geohash in an ordinary B-tree indexed column turns "points inside this
+box" into a handful of index range scans (one per covering cell), which
+works the same on PostgreSQL and SQLite without a spatial extension.
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: index for index, char in enumerate(BASE32)}
+
+# Stored precision: 9 characters is a cell of about 5m x 5m
+PRECISION = 9
+
+# Upper bound on range scans issued for one bounding box
+MAX_COVER_CELLS = 16
+
+BBox = Tuple[float, float, float, float]  # west, south, east, north
+
+
+def encode(latitude: float, longitude: float, precision: int = PRECISION) -> str:
+    """
+    Encode a point as a geohash.
+
+    Examples:
+        >>> encode(37.7749, -122.4194, 6)
+        '9q8yyk'
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            middle = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= middle:
+                value = value * 2 + 1
+                lng_range[0] = middle
+            else:
+                value = value * 2
+                lng_range[1] = middle
+        else:
+            middle = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= middle:
+                value = value * 2 + 1
+                lat_range[0] = middle
+            else:
+                value = value * 2
+                lat_range[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def decode_bbox(geohash: str) -> BBox:
+    """Return the (west, south, east, north) cell covered by a geohash"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            middle = (target[0] + target[1]) / 2
+            target[1 - bit] = middle
+            even = not even
+    return (lng_range[0], lat_range[0], lng_range[1], lat_range[1])
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(width, height) in degrees of a geohash cell at a precision"""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 360.0 / 2 ** lng_bits, 180.0 / 2 ** lat_bits
+
+
+def neighbors(geohash: str) -> List[str]:
+    """The geohash itself and its (up to) eight surrounding cells"""
+    west, south, east, north = decode_bbox(geohash)
+    width, height = east - west, north - south
+    center_lat, center_lng = (south + north) / 2, (west + east) / 2
+
+    cells = []
+    for d_lat in (-1, 0, 1):
+        latitude = center_lat + d_lat * height
+        if not -90 < latitude < 90:
+            continue
+        for d_lng in (-1, 0, 1):
+            longitude = (center_lng + d_lng * width + 180) % 360 - 180
+            cell = encode(latitude, longitude, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def _cells_in_box(bbox: BBox, precision: int) -> List[str]:
+    west, south, east, north = bbox
+    width, height = cell_size(precision)
+    # Step through cell centers from the cell containing the south-west corner
+    first_lng = math.floor((west + 180) / width) * width - 180 + width / 2
+    first_lat = math.floor((south + 90) / height) * height - 90 + height / 2
+
+    cells = []
+    latitude = first_lat
+    while latitude - height / 2 <= north and latitude < 90:
+        longitude = first_lng
+        while longitude - width / 2 <= east and longitude < 180:
+            cells.append(encode(latitude, longitude, precision))
+            longitude += width
+        latitude += height
+    return cells
+
+
+def _cover_count(bbox: BBox, precision: int) -> int:
+    west, south, east, north = bbox
+    width, height = cell_size(precision)
+    columns = math.floor((east + 180) / width) - math.floor((west + 180) / width) + 1
+    rows = math.floor((north + 90) / height) - math.floor((south + 90) / height) + 1
+    return columns * rows
+
+
+def cover(bbox: BBox, max_cells: int = MAX_COVER_CELLS) -> Optional[List[str]]:
+    """
+    Geohash prefixes whose cells together cover a bounding box.
+
+    Picks the finest precision that needs at most max_cells cells. Returns
+    None when even single-character cells are too many (a whole-world view),
+    in which case an index range scan would not help.
+    west > east is a box crossing the antimeridian.
+    """
+    west, south, east, north = bbox
+    boxes = [bbox] if west <= east else [(west, south, 180.0, north), (-180.0, south, east, north)]
+
+    for precision in range(PRECISION, 0, -1):
+        if sum(_cover_count(box, precision) for box in boxes) <= max_cells:
+            cells = []
+            for box in boxes:
+                cells.extend(cell for cell in _cells_in_box(box, precision) if cell not in cells)
+            return cells
+    return None
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest geohash string greater than every string starting with prefix"""
+    chars = list(prefix)
+    while chars:
+        index = _DECODE[chars[-1]]
+        if index + 1 < len(BASE32):
+            chars[-1] = BASE32[index + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+def prefix_conditions(column, prefixes: List[str]):
+    """
+    SQL condition matching geohashes that start with any of the prefixes,
+    written as range comparisons so a B-tree index on column is used.
+    """
+    ranges = []
+    for prefix in sorted(prefixes):
+        upper = _prefix_upper_bound(prefix)
+        ranges.append(and_(column >= prefix, column < upper) if upper else column >= prefix)
+    return or_(*ranges)
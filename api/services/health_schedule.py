@@ -0,0 +1,270 @@
+"""
+Per-person decay models and precomputed status transition times.
+
+A person's health decays with their own decay_rate/decay_curve if either is
+set; otherwise with the most demanding model among their tags (the one that
+turns dormant soonest), otherwise with the default. The model in effect is
+stored on the person (resolved_decay_rate, resolved_decay_curve) together
+with the moments they stop being healthy (warning_at) and become dormant
+(dormant_at), so status filters and reminders are indexed timestamp
+comparisons no matter how decay differs between people.
+
+Transition times are not score order across decay models: someone on a slow
+model can score lower today yet turn dormant later than someone on a fast
+one. Listings ordered by health therefore sort on score_expression, the
+score itself computed in SQL from the stored model.
+
+The stored values are recomputed whenever they could change: the person's
+last contact date or decay settings, the decay settings of a linked tag, or
+the person's set of tags.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import DateTime, Integer, and_, bindparam, case, cast, func, literal, or_, update
+from sqlmodel import Session, select
+
+from models import DecayCurve, Person, PersonTag, Tag
+from services import flush_events
+from services.flush_events import people_of_tags
+from services.health_score import (
+    DECAY_RATE_PER_DAY, DEFAULT_DECAY_CURVE, EXPONENT_FLOOR, STATUS_SCORE_RANGES, HealthStatus,
+    last_contact_conditions, max_days_for_score, status_transitions
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+person_table = Person.__table__
+
+# Person/tag attributes that feed into the stored schedule
+PERSON_DECAY_FIELDS = ["last_contact_date", "decay_rate", "decay_curve"]
+TAG_DECAY_FIELDS = ["decay_rate", "decay_curve"]
+
+DecayModel = Tuple[float, DecayCurve]
+
+
+def resolve_decay_model(
+    decay_rate: Optional[float],
+    decay_curve: Optional[DecayCurve],
+    tag_models: Iterable[Tuple[Optional[float], Optional[DecayCurve]]] = ()
+) -> DecayModel:
+    """
+    Pick the decay model in effect for a person.
+
+    Args:
+        decay_rate, decay_curve: The person's own settings
+        tag_models: (decay_rate, decay_curve) of their tags that set either
+
+    Returns:
+        (decay_rate, decay_curve) with defaults filled in
+    """
+    if decay_rate is not None or decay_curve is not None:
+        return (decay_rate or DECAY_RATE_PER_DAY, decay_curve or DEFAULT_DECAY_CURVE)
+
+    models = [(rate or DECAY_RATE_PER_DAY, curve or DEFAULT_DECAY_CURVE) for rate, curve in tag_models]
+    if not models:
+        return (DECAY_RATE_PER_DAY, DEFAULT_DECAY_CURVE)
+    # The closest relationship sets the cadence: the model that turns dormant soonest
+    warning_min = STATUS_SCORE_RANGES["warning"][0]
+    return min(models, key=lambda model: (max_days_for_score(warning_min, *model), -model[0]))
+
+
+def schedule_health(connection, person_ids: Iterable[UUID]) -> None:
+    """
+    Recompute the stored decay model and status transition times of the given people.
+
+    Uses Core statements on the connection so it is safe to call from
+    inside ORM flush events.
+    """
+    person_ids = list(set(person_ids))
+    if not person_ids:
+        return
+
+    people = connection.execute(
+        select(Person.id, Person.last_contact_date, Person.decay_rate, Person.decay_curve)
+        .where(Person.id.in_(person_ids))
+    ).all()
+
+    tag_models: Dict[UUID, List[Tuple[Optional[float], Optional[DecayCurve]]]] = {}
+    for person_id, rate, curve in connection.execute(
+        select(PersonTag.person_id, Tag.decay_rate, Tag.decay_curve)
+        .join(Tag, Tag.id == PersonTag.tag_id)
+        .where(
+            PersonTag.person_id.in_(person_ids),
+            or_(Tag.decay_rate.isnot(None), Tag.decay_curve.isnot(None))
+        )
+    ).all():
+        tag_models.setdefault(person_id, []).append((rate, curve))
+
+    rows = []
+    for person_id, last_contact_date, decay_rate, decay_curve in people:
+        rate, curve = resolve_decay_model(decay_rate, decay_curve, tag_models.get(person_id, []))
+        warning_at, dormant_at = status_transitions(last_contact_date, rate, curve)
+        rows.append({
+            "b_id": person_id,
+            "b_rate": rate,
+            "b_curve": curve,
+            "b_warning_at": warning_at,
+            "b_dormant_at": dormant_at,
+        })
+
+    if rows:
+        connection.execute(
+            update(person_table)
+            .where(person_table.c.id == bindparam("b_id"))
+            .values({
+                person_table.c.resolved_decay_rate: bindparam("b_rate"),
+                person_table.c.resolved_decay_curve: bindparam("b_curve"),
+                person_table.c.warningAt: bindparam("b_warning_at"),
+                person_table.c.dormantAt: bindparam("b_dormant_at"),
+            }),
+            rows
+        )
+
+
+def rebuild_health_schedules(db: Session, user_id: Optional[UUID] = None, batch_size: int = 500) -> int:
+    """
+    Recompute stored decay models and transition times for every person (or every person of one user).
+
+    Returns:
+        Number of people updated
+    """
+    query = select(Person.id)
+    if user_id:
+        query = query.where(Person.user_id == user_id)
+    person_ids = db.exec(query).all()
+
+    connection = db.connection()
+    for start in range(0, len(person_ids), batch_size):
+        schedule_health(connection, person_ids[start:start + batch_size])
+    db.commit()
+    return len(person_ids)
+
+
+def status_conditions(status: HealthStatus, now: Optional[datetime] = None) -> List:
+    """SQL conditions selecting people whose current health status is status"""
+    now = now or datetime.utcnow()
+    if status == "healthy":
+        return [Person.warning_at > now]
+    if status == "warning":
+        return [Person.warning_at <= now, Person.dormant_at > now]
+    return [Person.dormant_at <= now]
+
+
+def decay_models(db: Session, user_id: UUID) -> List[Tuple[Optional[float], Optional[DecayCurve]]]:
+    """The distinct (resolved_decay_rate, resolved_decay_curve) pairs a user's people are on"""
+    return db.exec(
+        select(Person.resolved_decay_rate, Person.resolved_decay_curve)
+        .where(Person.user_id == user_id)
+        .distinct()
+    ).all()
+
+
+def score_conditions(
+    db: Session,
+    user_id: UUID,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> Optional[List]:
+    """
+    SQL conditions selecting a user's people whose score is in a range.
+
+    The score is monotonic in last_contact_date for any one decay model, so
+    this is one last_contact_date range per decay model the user's people
+    actually use (normally just one or a few).
+
+    Returns:
+        List of conditions to AND together (empty for no restriction),
+        or None if no row can match
+    """
+    models = decay_models(db, user_id)
+
+    branches = []
+    for rate, curve in models:
+        conditions = last_contact_conditions(
+            Person.last_contact_date, min_score=min_score, max_score=max_score, now=now,
+            decay_rate=rate, decay_curve=curve
+        )
+        if conditions is None:
+            continue
+        model_match = [
+            Person.resolved_decay_rate.is_(None) if rate is None else Person.resolved_decay_rate == rate,
+            Person.resolved_decay_curve.is_(None) if curve is None else Person.resolved_decay_curve == curve,
+        ]
+        branches.append(and_(*model_match, *conditions))
+
+    if not branches:
+        return None
+    return [or_(*branches)]
+
+
+def days_since_contact_expression(db: Session, now: Optional[datetime] = None):
+    """SQL expression for whole days since each person's last contact (as timedelta.days)"""
+    now = literal(now or datetime.utcnow(), DateTime)
+    if db.get_bind().dialect.name == "postgresql":
+        seconds = func.extract("epoch", now - Person.last_contact_date)
+    else:
+        seconds = cast(func.strftime("%s", now), Integer) - cast(func.strftime("%s", Person.last_contact_date), Integer)
+    return cast(func.floor(seconds / 86400.0), Integer)
+
+
+def score_expression(db: Session, now: Optional[datetime] = None):
+    """
+    SQL expression for each person's current health score under their stored
+    decay model; the same integer calculate_health_score returns.
+    """
+    days = days_since_contact_expression(db, now)
+    rate = func.coalesce(Person.resolved_decay_rate, DECAY_RATE_PER_DAY)
+    exponential = Person.resolved_decay_curve == DecayCurve.EXPONENTIAL
+    if DEFAULT_DECAY_CURVE == DecayCurve.EXPONENTIAL:
+        exponential = or_(exponential, Person.resolved_decay_curve.is_(None))
+
+    # Clamped like _decayed_score: float exp raises on underflow on Postgres
+    exponent = -rate * days / 100
+    exponent = case((exponent < EXPONENT_FLOOR, EXPONENT_FLOOR), (exponent > 0, 0), else_=exponent)
+    score = cast(func.floor(case(
+        (exponential, 100 * func.exp(exponent)),
+        else_=100 - days * rate
+    )), Integer)
+    return case((score < 0, 0), (score > 100, 100), else_=score)
+
+
+def days_until_below_expression(db: Session, user_id: UUID, threshold: int, now: Optional[datetime] = None):
+    """
+    SQL expression for the days until each of a user's people first scores
+    below threshold (0 or less if they already do), under their stored
+    decay model: one CASE branch per model the user's people use.
+    """
+    models = decay_models(db, user_id)
+
+    last_day_above = case(
+        *[
+            (
+                and_(
+                    Person.resolved_decay_rate.is_(None) if rate is None else Person.resolved_decay_rate == rate,
+                    Person.resolved_decay_curve.is_(None) if curve is None else Person.resolved_decay_curve == curve,
+                ),
+                max_days_for_score(threshold, rate, curve)
+            )
+            for rate, curve in models
+        ],
+        else_=max_days_for_score(threshold)
+    ) if models else literal(max_days_for_score(threshold))
+    return last_day_above + 1 - days_since_contact_expression(db, now)
+
+
+def _apply_schedule_changes(connection, changes) -> None:
+    """Recompute the schedules of people whose contact date, decay settings or tags changed"""
+    person_ids = changes.get("people", set()) | people_of_tags(connection, changes.get("tags", ()))
+    # Deleted people have nothing left to update
+    schedule_health(connection, person_ids)
+
+
+_schedule_handler = flush_events.register("health_schedule", _apply_schedule_changes)
+_schedule_handler.watch(Person, "people", fields=PERSON_DECAY_FIELDS, deleted=False)
+_schedule_handler.watch(PersonTag, "people", key=lambda link: link.person_id)
+_schedule_handler.watch(Tag, "tags", fields=TAG_DECAY_FIELDS, new=False, deleted=False)
@@ -1,33 +1,76 @@
 """
 Simple health score calculation.
-Score decays linearly based on days since last contact.
+Score decays with the days since last contact, by default linearly at
+DECAY_RATE_PER_DAY. People (or their tags) can set their own decay rate and
+curve; see services/health_schedule.py for how the model in effect is picked.
 """
 
-from datetime import datetime
-from typing import Literal
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import DecayCurve
 
 HealthStatus = Literal["healthy", "warning", "dormant"]
 
 # Simple linear decay: lose ~1.5 points per day
 # 100 → 0 in about 66 days
 DECAY_RATE_PER_DAY = 1.5
+DEFAULT_DECAY_CURVE = DecayCurve.LINEAR
+
+# Score range (inclusive) for each status
+STATUS_SCORE_RANGES = {
+    "healthy": (70, 100),
+    "warning": (40, 69),
+    "dormant": (0, 39),
+}
+
+
+# Width of the score histogram buckets
+HISTOGRAM_BIN_WIDTH = 10
 
+# Exponential decay exponents are clamped to [EXPONENT_FLOOR, 0]: e^-700 already
+# scores 0, and below about -745 float exp underflows (an error on Postgres)
+EXPONENT_FLOOR = -700
 
-def calculate_health_score(last_contact_date: datetime) -> int:
+# Status transitions too far out to represent are scheduled at this time
+FAR_FUTURE = datetime(9999, 12, 31)
+
+
+def _decayed_score(days_inactive: int, decay_rate: float, decay_curve: DecayCurve) -> int:
+    if decay_curve == DecayCurve.EXPONENTIAL:
+        score = 100 * math.exp(min(0, max(EXPONENT_FLOOR, -decay_rate * days_inactive / 100)))
+    else:
+        score = 100 - (days_inactive * decay_rate)
+    return max(0, min(100, int(score)))
+
+
+def calculate_health_score(
+    last_contact_date: datetime,
+    now: Optional[datetime] = None,
+    decay_rate: Optional[float] = None,
+    decay_curve: Optional[DecayCurve] = None
+) -> int:
     """
     Calculate health score based on days since last contact.
 
-    Formula: 100 - (days_inactive × 1.5)
+    Formula: 100 - (days_inactive × decay_rate) for the linear curve,
+    100 × e^(-decay_rate × days_inactive / 100) for the exponential one.
 
     Args:
         last_contact_date: The datetime of last contact
+        now: Reference time (defaults to utcnow); pass it when scoring many people
+        decay_rate: Points (linear) or percent (exponential) lost per day;
+            defaults to DECAY_RATE_PER_DAY
+        decay_curve: Defaults to linear
 
     Returns:
         Health score (0-100)
     """
-    days_inactive = (datetime.utcnow() - last_contact_date).days
-    score = 100 - (days_inactive * DECAY_RATE_PER_DAY)
-    return max(0, min(100, int(score)))
+    days_inactive = ((now or datetime.utcnow()) - last_contact_date).days
+    return _decayed_score(days_inactive, decay_rate or DECAY_RATE_PER_DAY, decay_curve or DEFAULT_DECAY_CURVE)
 
 
 def get_health_status(score: int) -> HealthStatus:
@@ -47,6 +90,69 @@ def get_health_status(score: int) -> HealthStatus:
         return "dormant"
 
 
+def calculate_health_scores(
+    last_contact_dates: Sequence[datetime],
+    now: Optional[datetime] = None,
+    decay_rates: Optional[Sequence[Optional[float]]] = None,
+    decay_curves: Optional[Sequence[Optional[DecayCurve]]] = None
+) -> np.ndarray:
+    """
+    Vectorized calculate_health_score for many last contact dates at once.
+
+    decay_rates/decay_curves are per-date (None entries use the defaults).
+
+    Returns:
+        Integer array of health scores, in the order of last_contact_dates
+    """
+    now = np.datetime64(now or datetime.utcnow(), "us")
+    dates = np.asarray(last_contact_dates, dtype="datetime64[us]")
+    # Floor division matches timedelta.days, which rounds toward negative infinity
+    days_inactive = (now - dates) // np.timedelta64(1, "D")
+
+    rates = np.full(dates.shape, DECAY_RATE_PER_DAY)
+    if decay_rates is not None:
+        rates = np.array([rate or DECAY_RATE_PER_DAY for rate in decay_rates], dtype=np.float64)
+    scores = 100 - days_inactive * rates
+
+    if decay_curves is not None:
+        exponential = np.array([curve == DecayCurve.EXPONENTIAL for curve in decay_curves], dtype=bool)
+        if exponential.any():
+            exponents = np.clip(-rates * days_inactive / 100, EXPONENT_FLOOR, 0)
+            scores = np.where(exponential, 100 * np.exp(exponents), scores)
+
+    return np.clip(np.trunc(scores), 0, 100).astype(np.int64)
+
+
+def summarize_health_scores(scores: np.ndarray) -> Dict:
+    """
+    Status counts, histogram and mean of an array of health scores.
+
+    Returns:
+        Dict with "total", "status_counts" ({status: count}), "mean_score"
+        (None without scores) and "histogram", a list of
+        {"min_score", "max_score", "count"} buckets of HISTOGRAM_BIN_WIDTH
+        points (the last one includes 100)
+    """
+    status_counts = {
+        status: int(np.count_nonzero((scores >= low) & (scores <= high)))
+        for status, (low, high) in STATUS_SCORE_RANGES.items()
+    }
+
+    edges = np.arange(0, 100 + HISTOGRAM_BIN_WIDTH, HISTOGRAM_BIN_WIDTH)
+    counts, _ = np.histogram(scores, bins=edges)
+    histogram = [
+        {"min_score": int(low), "max_score": int(high) - 1 if high < 100 else 100, "count": int(count)}
+        for low, high, count in zip(edges[:-1], edges[1:], counts)
+    ]
+
+    return {
+        "total": int(scores.size),
+        "status_counts": status_counts,
+        "mean_score": round(float(scores.mean()), 1) if scores.size else None,
+        "histogram": histogram,
+    }
+
+
 def get_health_emoji(status: HealthStatus) -> str:
     """Get emoji for health status"""
     return {
@@ -54,3 +160,141 @@ def get_health_emoji(status: HealthStatus) -> str:
         "warning": "🍂",
         "dormant": "🪵",
     }[status]
+
+
+def max_days_for_score(
+    min_score: int,
+    decay_rate: Optional[float] = None,
+    decay_curve: Optional[DecayCurve] = None
+) -> int:
+    """
+    Largest number of days since contact that still scores at least min_score.
+
+    Inverse of calculate_health_score, e.g. for the default linear model
+    int(100 - days × 1.5) >= min_score holds exactly when
+    days <= floor((100 - min_score) / 1.5).
+    """
+    decay_rate = decay_rate or DECAY_RATE_PER_DAY
+    decay_curve = decay_curve or DEFAULT_DECAY_CURVE
+    if decay_curve == DecayCurve.EXPONENTIAL:
+        days = math.floor(100 * math.log(100 / min_score) / decay_rate)
+    else:
+        days = math.floor((100 - min_score) / decay_rate)
+
+    # Guard the boundary against floating point error
+    while _decayed_score(days + 1, decay_rate, decay_curve) >= min_score:
+        days += 1
+    while days > 0 and _decayed_score(days, decay_rate, decay_curve) < min_score:
+        days -= 1
+    return days
+
+
+def _first_moment_below(
+    last_contact_date: datetime,
+    min_score: int,
+    decay_rate: Optional[float],
+    decay_curve: Optional[DecayCurve]
+) -> datetime:
+    try:
+        return last_contact_date + timedelta(days=max_days_for_score(min_score, decay_rate, decay_curve) + 1)
+    except OverflowError:
+        return FAR_FUTURE
+
+
+def status_transitions(
+    last_contact_date: datetime,
+    decay_rate: Optional[float] = None,
+    decay_curve: Optional[DecayCurve] = None
+) -> Tuple[datetime, datetime]:
+    """
+    When a person stops being healthy and when they become dormant.
+
+    Returns:
+        (warning_at, dormant_at): the first moments their score is below the
+        healthy and the warning range, or FAR_FUTURE if that is too far out
+    """
+    healthy_min = STATUS_SCORE_RANGES["healthy"][0]
+    warning_min = STATUS_SCORE_RANGES["warning"][0]
+    return (
+        _first_moment_below(last_contact_date, healthy_min, decay_rate, decay_curve),
+        _first_moment_below(last_contact_date, warning_min, decay_rate, decay_curve),
+    )
+
+
+def last_contact_range(
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    status: Optional[HealthStatus] = None,
+    now: Optional[datetime] = None,
+    decay_rate: Optional[float] = None,
+    decay_curve: Optional[DecayCurve] = None
+) -> Optional[Tuple[Optional[datetime], Optional[datetime]]]:
+    """
+    Translate a health score range into a last_contact_date range.
+
+    Because the score is a monotonic function of last_contact_date, any score
+    filter is equivalent to a range predicate that an index can answer:
+    score >= S  <=>  last_contact_date > now - (max_days_for_score(S) + 1) days
+
+    Args:
+        min_score: Minimum health score (inclusive)
+        max_score: Maximum health score (inclusive)
+        status: Health status, intersected with min_score/max_score
+        now: Reference time (defaults to utcnow)
+        decay_rate, decay_curve: Decay model of the people being filtered
+
+    Returns:
+        (after, until) where matching rows satisfy
+        last_contact_date > after (if set) and last_contact_date <= until (if set),
+        or None if the range is empty
+    """
+    now = now or datetime.utcnow()
+    low, high = 0, 100
+    if status:
+        low, high = STATUS_SCORE_RANGES[status]
+    if min_score is not None:
+        low = max(low, min_score)
+    if max_score is not None:
+        high = min(high, max_score)
+    low, high = max(low, 0), min(high, 100)
+    if low > high:
+        return None
+
+    after = None
+    if low > 0:
+        after = now - timedelta(days=max_days_for_score(low, decay_rate, decay_curve) + 1)
+
+    until = None
+    if high < 100:
+        until = now - timedelta(days=max_days_for_score(high + 1, decay_rate, decay_curve) + 1)
+
+    return after, until
+
+
+def last_contact_conditions(
+    column,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    status: Optional[HealthStatus] = None,
+    now: Optional[datetime] = None,
+    decay_rate: Optional[float] = None,
+    decay_curve: Optional[DecayCurve] = None
+) -> Optional[List]:
+    """
+    SQL conditions on a last_contact_date column for a health score range.
+
+    Returns:
+        List of conditions to AND together (empty for no restriction),
+        or None if no row can match
+    """
+    bounds = last_contact_range(min_score, max_score, status, now, decay_rate, decay_curve)
+    if bounds is None:
+        return None
+
+    after, until = bounds
+    conditions = []
+    if after is not None:
+        conditions.append(column > after)
+    if until is not None:
+        conditions.append(column <= until)
+    return conditions
@@ -0,0 +1,210 @@
+"""
+Daily relationship-health snapshots.
+
+Health is computed for "now", so history has to be recorded as it happens.
+Once a day the snapshot job writes one healthSnapshots row per user for the
+day that just ended: people per status, the mean score and how many people
+were contacted that day. Trend charts read these small rollups instead of
+recomputing anything.
+
+Snapshots are forward-only. A person only stores their latest contact, so
+a score for a past day is computed from today's last_contact_date and is
+only right for the day that just ended. Days the job did not run (the app
+was down across midnight, the worker disabled without cron) are not
+backfilled, and the trend simply has no row for them.
+
+With PERSON_SNAPSHOTS enabled it also writes a personHealthSnapshots row for
+each person whose status differs from their latest row (or who has none), so
+individual histories stay sparse: one row per status change.
+
+The job runs in the app (HealthSnapshotWorker, checking every
+SNAPSHOT_CHECK_INTERVAL seconds) or from cron via snapshot_health.py. Days
+already snapshotted are skipped, so running it more often, or from several
+processes, is harmless.
+"""
+
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Optional
+from uuid import UUID
+import logging
+import os
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from models import HealthSnapshot, Person, PersonHealthSnapshot, User
+from services.health_score import STATUS_SCORE_RANGES, calculate_health_scores
+
+logger = logging.getLogger(__name__)
+
+PERSON_SNAPSHOTS = os.getenv("HEALTH_PERSON_SNAPSHOTS_ENABLED", "true").lower() == "true"
+
+# Seconds between checks for a day that still needs its snapshot
+SNAPSHOT_CHECK_INTERVAL = 60 * 60
+
+
+def _end_of_day(snapshot_date: date) -> datetime:
+    return datetime.combine(snapshot_date + timedelta(days=1), time.min)
+
+
+def snapshot_user(
+    db: Session,
+    user_id: UUID,
+    snapshot_date: date,
+    person_snapshots: bool = PERSON_SNAPSHOTS
+) -> HealthSnapshot:
+    """
+    Record a user's health as of the end of snapshot_date (UTC).
+
+    Adds the rows to the session; the caller commits. People created after
+    the day are left out. Scores use each person's current last_contact_date,
+    so only the day that just ended is recorded accurately (see the module
+    docstring).
+
+    Args:
+        db: Database session
+        user_id: User to snapshot
+        snapshot_date: Day being recorded
+        person_snapshots: Also record people whose status changed
+
+    Returns:
+        The user's HealthSnapshot for the day
+    """
+    as_of = _end_of_day(snapshot_date)
+    rows = db.exec(
+        select(Person.id, Person.last_contact_date, Person.resolved_decay_rate, Person.resolved_decay_curve)
+        .where(Person.user_id == user_id, Person.created_at < as_of)
+    ).all()
+    person_ids, last_contact_dates, decay_rates, decay_curves = zip(*rows) if rows else ((), (), (), ())
+    scores = calculate_health_scores(last_contact_dates, as_of, decay_rates, decay_curves)
+
+    statuses = np.full(scores.shape, "", dtype=object)
+    for status, (low, high) in STATUS_SCORE_RANGES.items():
+        statuses[(scores >= low) & (scores <= high)] = status
+
+    day_start = np.datetime64(datetime.combine(snapshot_date, time.min), "us")
+    day_end = np.datetime64(as_of, "us")
+    contacted = np.asarray(last_contact_dates, dtype="datetime64[us]")
+
+    snapshot = HealthSnapshot(
+        user_id=user_id,
+        snapshot_date=snapshot_date,
+        total=int(scores.size),
+        healthy=int(np.count_nonzero(statuses == "healthy")),
+        warning=int(np.count_nonzero(statuses == "warning")),
+        dormant=int(np.count_nonzero(statuses == "dormant")),
+        mean_score=round(float(scores.mean()), 1) if scores.size else None,
+        # last_contact_date only keeps the latest contact, so this counts people, not contacts
+        contacts_made=int(np.count_nonzero((contacted >= day_start) & (contacted < day_end))),
+    )
+    db.add(snapshot)
+
+    if person_snapshots and rows:
+        latest_dates = (
+            select(PersonHealthSnapshot.person_id, func.max(PersonHealthSnapshot.snapshot_date).label("snapshot_date"))
+            .where(PersonHealthSnapshot.user_id == user_id, PersonHealthSnapshot.snapshot_date < snapshot_date)
+            .group_by(PersonHealthSnapshot.person_id)
+            .subquery()
+        )
+        previous = dict(db.exec(
+            select(PersonHealthSnapshot.person_id, PersonHealthSnapshot.health_status)
+            .join(
+                latest_dates,
+                (PersonHealthSnapshot.person_id == latest_dates.c.person_id)
+                & (PersonHealthSnapshot.snapshot_date == latest_dates.c.snapshot_date)
+            )
+        ).all())
+
+        for person_id, status, score in zip(person_ids, statuses, scores):
+            if previous.get(person_id) != status:
+                db.add(PersonHealthSnapshot(
+                    person_id=person_id,
+                    snapshot_date=snapshot_date,
+                    user_id=user_id,
+                    health_status=status,
+                    health_score=int(score),
+                ))
+
+    return snapshot
+
+
+def take_daily_snapshots(
+    session_factory: Callable[[], Session],
+    snapshot_date: Optional[date] = None,
+    person_snapshots: bool = PERSON_SNAPSHOTS
+) -> int:
+    """
+    Snapshot every user that has no snapshot for the day yet.
+
+    Each user is committed separately, so one failure doesn't lose the rest
+    and a crash resumes where it stopped. Earlier days that were missed are
+    not backfilled.
+
+    Args:
+        session_factory: Creates database sessions
+        snapshot_date: Day to record (defaults to yesterday, UTC)
+        person_snapshots: Also record people whose status changed
+
+    Returns:
+        Number of users snapshotted
+    """
+    snapshot_date = snapshot_date or (datetime.utcnow().date() - timedelta(days=1))
+
+    with session_factory() as db:
+        user_ids = db.exec(
+            select(User.id).where(
+                ~select(HealthSnapshot.user_id)
+                .where(HealthSnapshot.user_id == User.id, HealthSnapshot.snapshot_date == snapshot_date)
+                .exists()
+            )
+        ).all()
+
+    taken = 0
+    for user_id in user_ids:
+        with session_factory() as db:
+            try:
+                snapshot_user(db, user_id, snapshot_date, person_snapshots)
+                db.commit()
+                taken += 1
+            except IntegrityError:
+                # Another process snapshotted this user first
+                db.rollback()
+            except Exception:
+                db.rollback()
+                logger.exception(f"Failed to snapshot health for user {user_id}")
+
+    if taken:
+        logger.info(f"Recorded {snapshot_date} health snapshots for {taken} users")
+    return taken
+
+
+class HealthSnapshotWorker:
+    """Takes the daily snapshots in a background task on the app's event loop"""
+
+    def __init__(self, session_factory: Callable[[], Session], check_interval: float = SNAPSHOT_CHECK_INTERVAL):
+        self.session_factory = session_factory
+        self.check_interval = check_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(take_daily_snapshots, self.session_factory)
+            except Exception:
+                logger.exception("Health snapshot worker failed")
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,33 +1,52 @@
 """
 Location resolution service - implements the location hierarchy.
 Priority: Person address > Tag address > Zip code
+
+The resolved location is stored on each person (resolved_lat, resolved_lng,
+location_source and its geohash for spatial queries) and recomputed whenever it could change: the person's
+address or coordinates, the address or coordinates of a linked tag, or the
+person's set of tags. Reads such as the map view never resolve anything.
+Resolution itself never touches the network; addresses are geocoded by the
+background queue and the result is picked up here once it is written.
 """
 
+from typing import Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, update
 from sqlmodel import Session, select
-from typing import Optional, Tuple
 from models import Person, Tag, PersonTag
-from services.geocoding import geocode_address
+from services import flush_events
+from services.flush_events import people_of_tags
+from services.geohash import encode as encode_geohash
+from services.zip_centroids import lookup_zip
 import logging
 
 logger = logging.getLogger(__name__)
 
+person_table = Person.__table__
+
+# Person/tag attributes that feed into the resolved location
+PERSON_LOCATION_FIELDS = ["street_address", "city", "state", "zip", "latitude", "longitude"]
+TAG_LOCATION_FIELDS = ["name", "latitude", "longitude"]
 
-def get_person_coordinates(
-    db: Session,
-    person: Person
+
+def resolve_location(
+    street_address: Optional[str],
+    city: Optional[str],
+    state: Optional[str],
+    zip_code: Optional[str],
+    latitude: Optional[float],
+    longitude: Optional[float],
+    tag: Optional[Tuple[str, float, float]] = None
 ) -> Optional[Tuple[float, float, str]]:
     """
-    Get coordinates for a person using location hierarchy.
-
-    Priority:
-    1. Person's own address (street + city + state)
-    2. Person's own coordinates (if manually set)
-    3. Tag-based location (from tags with addresses)
-    4. Person's zip code only
+    Pick a person's location using the location hierarchy.
 
     Args:
-        db: Database session
-        person: Person object
+        street_address, city, state, zip_code: The person's address
+        latitude, longitude: The person's stored coordinates
+        tag: (name, latitude, longitude) of the person's first located tag
 
     Returns:
         Tuple of (latitude, longitude, source_description) or None
@@ -37,54 +56,113 @@ def get_person_coordinates(
         (37.7849, -122.4094, "tag:Climbing Gym")
         (37.7484, -122.4156, "zip:94110")
     """
+    has_coords = latitude is not None and longitude is not None
 
-    # 1. Try person's stored coordinates (if address was geocoded)
-    if person.latitude is not None and person.longitude is not None:
-        return (person.latitude, person.longitude, "personal")
-
-    # 2. Try to geocode person's full address
-    if any([person.street_address, person.city, person.state]):
-        coords = geocode_address(
-            street_address=person.street_address,
-            city=person.city,
-            state=person.state,
-            zip_code=person.zip
-        )
+    # 1. Person's own coordinates (geocoded from their address or set manually).
+    #    Coordinates geocoded from a bare zip only count at the zip level.
+    if has_coords and (any([street_address, city, state]) or not zip_code):
+        return (latitude, longitude, "personal")
+
+    # 2. Tag-based location
+    if tag:
+        return (tag[1], tag[2], f"tag:{tag[0]}")
+
+    # 3. Person's zip code only
+    if zip_code:
+        coords = lookup_zip(zip_code) or ((latitude, longitude) if has_coords else None)
         if coords:
-            return (coords[0], coords[1], "personal")
+            return (coords[0], coords[1], f"zip:{zip_code}")
+
+    return None
+
+
+def resolve_locations(connection, person_ids: Iterable[UUID]) -> None:
+    """
+    Recompute the stored location of the given people.
+
+    Uses Core statements on the connection so it is safe to call from
+    inside ORM flush events.
+    """
+    person_ids = list(set(person_ids))
+    if not person_ids:
+        return
+
+    people = connection.execute(
+        select(
+            Person.id, Person.street_address, Person.city, Person.state, Person.zip,
+            Person.latitude, Person.longitude
+        ).where(Person.id.in_(person_ids))
+    ).all()
 
-    # 3. Try tag-based locations
-    person_tags = db.exec(
-        select(Tag)
-        .join(PersonTag, PersonTag.tag_id == Tag.id)
-        .where(PersonTag.person_id == person.id)
+    # First located tag per person, by name
+    tags = {}
+    for person_id, name, latitude, longitude in connection.execute(
+        select(PersonTag.person_id, Tag.name, Tag.latitude, Tag.longitude)
+        .join(Tag, Tag.id == PersonTag.tag_id)
         .where(
-            (Tag.latitude.isnot(None)) |
-            (Tag.street_address.isnot(None))
+            PersonTag.person_id.in_(person_ids),
+            Tag.latitude.isnot(None),
+            Tag.longitude.isnot(None)
         )
-    ).all()
+        .order_by(Tag.name, Tag.id)
+    ).all():
+        tags.setdefault(person_id, (name, latitude, longitude))
 
-    for tag in person_tags:
-        # Use stored tag coordinates if available
-        if tag.latitude is not None and tag.longitude is not None:
-            return (tag.latitude, tag.longitude, f"tag:{tag.name}")
-
-        # Try to geocode tag address
-        if any([tag.street_address, tag.city, tag.state, tag.zip]):
-            coords = geocode_address(
-                street_address=tag.street_address,
-                city=tag.city,
-                state=tag.state,
-                zip_code=tag.zip
-            )
-            if coords:
-                return (coords[0], coords[1], f"tag:{tag.name}")
-
-    # 4. Fall back to person's zip code only
-    if person.zip:
-        coords = geocode_address(zip_code=person.zip)
-        if coords:
-            return (coords[0], coords[1], f"zip:{person.zip}")
+    rows = []
+    for person_id, street_address, city, state, zip_code, latitude, longitude in people:
+        location = resolve_location(
+            street_address, city, state, zip_code, latitude, longitude, tags.get(person_id)
+        )
+        resolved_lat, resolved_lng, source = location or (None, None, None)
+        rows.append({
+            "b_id": person_id,
+            "b_lat": resolved_lat,
+            "b_lng": resolved_lng,
+            "b_source": source,
+            "b_geohash": encode_geohash(resolved_lat, resolved_lng) if location else None,
+        })
 
-    logger.info(f"No location data available for person {person.id}")
-    return None
+    if rows:
+        connection.execute(
+            update(person_table)
+            .where(person_table.c.id == bindparam("b_id"))
+            .values(
+                resolved_lat=bindparam("b_lat"),
+                resolved_lng=bindparam("b_lng"),
+                location_source=bindparam("b_source"),
+                geohash=bindparam("b_geohash")
+            ),
+            rows
+        )
+
+
+def rebuild_resolved_locations(db: Session, user_id: Optional[UUID] = None, batch_size: int = 500) -> int:
+    """
+    Recompute stored locations for every person (or every person of one user).
+
+    Returns:
+        Number of people updated
+    """
+    query = select(Person.id)
+    if user_id:
+        query = query.where(Person.user_id == user_id)
+    person_ids = db.exec(query).all()
+
+    connection = db.connection()
+    for start in range(0, len(person_ids), batch_size):
+        resolve_locations(connection, person_ids[start:start + batch_size])
+    db.commit()
+    return len(person_ids)
+
+
+def _apply_location_changes(connection, changes) -> None:
+    """Recompute the locations of people whose address, tags or tags' locations changed"""
+    person_ids = changes.get("people", set()) | people_of_tags(connection, changes.get("tags", ()))
+    # Deleted people have nothing left to update
+    resolve_locations(connection, person_ids)
+
+
+_location_handler = flush_events.register("location", _apply_location_changes)
+_location_handler.watch(Person, "people", fields=PERSON_LOCATION_FIELDS, deleted=False)
+_location_handler.watch(PersonTag, "people", key=lambda link: link.person_id)
+_location_handler.watch(Tag, "tags", fields=TAG_LOCATION_FIELDS, new=False, deleted=False)
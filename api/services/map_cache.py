@@ -0,0 +1,142 @@
+"""
+Cache of serialized map-data responses.
+
+Each user has a map version (users.mapVersion) that is bumped in the same
+transaction as any change that can alter their map: a person added, removed,
+renamed or with a changed address/coordinates, a tag with a changed name or
+location, or a person's tags changing. Cached payloads are keyed by the
+version, so a bump makes every older entry unreachable without having to find
+and delete it, and it works the same for every process sharing the database.
+
+Payloads are kept in an in-process LRU and, when REDIS_URL is set, in Redis
+so that other processes and restarts can reuse them. The ETag is derived
+from the cache key, so a client holding the current version gets a 304
+without the payload being looked up at all.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Iterable, Optional
+from uuid import UUID
+import hashlib
+import logging
+
+from sqlalchemy import inspect, update
+from sqlmodel import Session, select
+
+from models import Person, PersonTag, Tag, User
+from services import flush_events
+from services.location import PERSON_LOCATION_FIELDS, TAG_LOCATION_FIELDS
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Payloads kept in the in-process LRU
+LRU_SIZE = 256
+
+# Seconds a payload stays in Redis; stale versions are never read, so this only bounds memory
+REDIS_TTL = 24 * 60 * 60
+
+# Person attributes that appear in, or feed into, the map payload
+PERSON_MAP_FIELDS = ["name", "user_id"] + PERSON_LOCATION_FIELDS
+
+_lru: "OrderedDict[str, bytes]" = OrderedDict()
+_lru_lock = Lock()
+
+
+def get_map_version(db: Session, user_id: UUID) -> int:
+    """The user's current map version, read from the database"""
+    return db.exec(select(User.map_version).where(User.id == user_id)).first() or 0
+
+
+def cache_key(user_id: UUID, version: int, *params) -> str:
+    """Key for one user's map payload at a version and request parameters"""
+    return f"map-data:{user_id}:{version}:" + ":".join(str(param) for param in params)
+
+
+def etag_for(key: str) -> str:
+    return '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def get_payload(key: str) -> Optional[bytes]:
+    with _lru_lock:
+        payload = _lru.get(key)
+        if payload is not None:
+            _lru.move_to_end(key)
+            return payload
+
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        payload = client.get(key)
+    except Exception as e:
+        # The cache is an optimization; a Redis outage just means rebuilding
+        logger.warning(f"Map cache read failed: {e}")
+        return None
+    if payload is not None:
+        _lru_put(key, payload)
+    return payload
+
+
+def store_payload(key: str, payload: bytes) -> None:
+    _lru_put(key, payload)
+
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.set(key, payload, ex=REDIS_TTL)
+    except Exception as e:
+        logger.warning(f"Map cache write failed: {e}")
+
+
+def _lru_put(key: str, payload: bytes) -> None:
+    with _lru_lock:
+        _lru[key] = payload
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def clear_map_cache() -> None:
+    """Clear the in-process LRU (Redis entries expire on their own)"""
+    with _lru_lock:
+        _lru.clear()
+
+
+def bump_map_versions(connection, user_ids: Iterable[UUID]) -> None:
+    """Invalidate the cached maps of the given users"""
+    user_ids = list(set(user_ids))
+    if user_ids:
+        connection.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(map_version=User.map_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _previous_user_id(person: Person) -> UUID:
+    """The user a person belonged to before this flush"""
+    previous = inspect(person).attrs.user_id.history.deleted
+    return previous[0] if previous else person.user_id
+
+
+def _apply_map_changes(connection, changes) -> None:
+    """Bump the map versions of users whose people, tags or tag links changed"""
+    user_ids = changes.get("users", set())
+    person_ids = changes.get("people")
+    if person_ids:
+        user_ids |= set(connection.execute(
+            select(Person.user_id).where(Person.id.in_(person_ids))
+        ).scalars().all())
+    bump_map_versions(connection, user_ids)
+
+
+_map_handler = flush_events.register("map_cache", _apply_map_changes)
+_map_handler.watch(Person, "users", fields=PERSON_MAP_FIELDS, key=lambda person: person.user_id)
+# Moving a person to another user changes the old user's map too
+_map_handler.watch(Person, "users", fields=["user_id"], key=_previous_user_id, new=False, deleted=False)
+_map_handler.watch(Tag, "users", fields=TAG_LOCATION_FIELDS, key=lambda tag: tag.user_id, new=False)
+_map_handler.watch(PersonTag, "people", key=lambda link: link.person_id)
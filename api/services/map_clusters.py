@@ -0,0 +1,128 @@
+"""
+Server-side clustering of map markers.
+
+Points are bucketed into a grid aligned with the web map's tiles (Web
+Mercator), CELLS_PER_TILE cells across each tile at the requested zoom, so a
+cluster covers roughly the same number of screen pixels at every zoom level.
+Each occupied cell becomes one cluster with a count, centroid and a few
+sample names; cells holding a single person, and every cell once the map is
+zoomed in to INDIVIDUAL_POINTS_ZOOM, are returned as individual points. The
+response size is therefore bounded by the number of cells on screen rather
+than by the number of contacts.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Grid cells across one map tile (a 256px tile -> ~64px cells)
+CELLS_PER_TILE = 4
+
+# From this zoom on (street level), every person is returned individually
+INDIVIDUAL_POINTS_ZOOM = 16
+
+MAX_ZOOM = 22
+
+# Names included with each cluster for the marker tooltip
+SAMPLE_NAMES = 3
+
+# Web Mercator cannot represent the poles
+MAX_LATITUDE = 85.05112878
+
+BBox = Tuple[float, float, float, float]
+
+
+def parse_bbox(bbox: Optional[str]) -> Optional[BBox]:
+    """
+    Parse a "west,south,east,north" bounding box in degrees.
+
+    west may be greater than east for a viewport that crosses the antimeridian.
+
+    Raises:
+        HTTPException: 400 if the box is malformed
+    """
+    if bbox is None:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'west,south,east,north'")
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+        raise HTTPException(status_code=400, detail="bbox is out of range")
+    return (west, south, east, north)
+
+
+def bbox_conditions(latitude_column, longitude_column, bbox: BBox) -> list:
+    """SQL conditions selecting rows whose coordinates fall inside bbox"""
+    west, south, east, north = bbox
+    if west <= east:
+        longitude_condition = and_(longitude_column >= west, longitude_column <= east)
+    else:
+        longitude_condition = or_(longitude_column >= west, longitude_column <= east)
+    return [latitude_column >= south, latitude_column <= north, longitude_condition]
+
+
+def _tile_position(latitude: float, longitude: float, zoom: int) -> Tuple[float, float]:
+    """Fractional Web Mercator tile coordinates of a point"""
+    scale = 2 ** zoom
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+    x = (longitude + 180.0) / 360.0 * scale
+    y = (1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * scale
+    return x, y
+
+
+def cluster_points(
+    points: Iterable[Tuple[UUID, str, float, float, Optional[str]]],
+    zoom: int
+) -> List[dict]:
+    """
+    Cluster (id, name, latitude, longitude, location_source) rows for a zoom level.
+
+    Returns:
+        A list of markers; each is either
+        {"type": "point", "id", "name", "latitude", "longitude", "location_source"} or
+        {"type": "cluster", "count", "latitude", "longitude", "names"}.
+        Pass points ordered by name to get alphabetical sample names.
+    """
+    if zoom >= INDIVIDUAL_POINTS_ZOOM:
+        return [_point(*row) for row in points]
+
+    cells: Dict[Tuple[int, int], list] = {}
+    for row in points:
+        x, y = _tile_position(row[2], row[3], zoom)
+        cell = (int(x * CELLS_PER_TILE), int(y * CELLS_PER_TILE))
+        # [count, sum of latitudes, sum of longitudes, first rows]
+        entry = cells.setdefault(cell, [0, 0.0, 0.0, []])
+        entry[0] += 1
+        entry[1] += row[2]
+        entry[2] += row[3]
+        if len(entry[3]) < SAMPLE_NAMES:
+            entry[3].append(row)
+
+    markers = []
+    for count, latitude_sum, longitude_sum, rows in cells.values():
+        if count == 1:
+            markers.append(_point(*rows[0]))
+        else:
+            markers.append({
+                "type": "cluster",
+                "count": count,
+                "latitude": round(latitude_sum / count, 6),
+                "longitude": round(longitude_sum / count, 6),
+                "names": [row[1] for row in rows],
+            })
+    return markers
+
+
+def _point(person_id: UUID, name: str, latitude: float, longitude: float, location_source: Optional[str]) -> dict:
+    return {
+        "type": "point",
+        "id": str(person_id),
+        "name": name,
+        "latitude": latitude,
+        "longitude": longitude,
+        "location_source": location_source,
+    }
@@ -0,0 +1,228 @@
+"""
+Indexed fuzzy name matching for people.
+
+Similarity follows pg_trgm: names are lowercased, split into words, each word
+is padded ("  word ") and cut into trigrams. The score for a query name against
+a person's name is the mean of
+- similarity: shared trigrams / all distinct trigrams of both names
+- word similarity: shared trigrams / trigrams of the query name
+so "Johnson" matches "Sarah Johnson" strongly and "Jonson" still matches as a typo.
+
+On PostgreSQL the scores come from pg_trgm's similarity()/word_similarity()
+over the GIN-indexed people.name_normalized column. On SQLite they are computed
+from the personNameTrigrams table, which is kept in sync on write.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import ARRAY, DDL, String, delete, event, insert, literal, or_
+from sqlmodel import Session, select, func
+import logging
+
+from models import Person, PersonNameTrigram
+from services import flush_events
+
+logger = logging.getLogger(__name__)
+
+# Minimum score for a person to count as a match (pg_trgm's default threshold)
+MIN_SIMILARITY = 0.3
+
+trigram_table = PersonNameTrigram.__table__
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS "ix_people_name_normalized_trgm"
+    ON people USING GIN (name_normalized gin_trgm_ops)
+    """,
+]
+
+for statement in _POSTGRES_DDL:
+    event.listen(Person.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+
+def create_name_index(connection) -> None:
+    """Create the pg_trgm extension and name index on an existing Postgres database"""
+    if connection.dialect.name == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.execute(DDL(statement))
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a name the same way as the people.name_normalized column"""
+    return (name or "").strip().lower()
+
+
+def trigrams(name: str) -> Set[str]:
+    """
+    Extract pg_trgm-style trigrams from a name.
+
+    Examples:
+        >>> sorted(trigrams("Tom"))
+        ['  t', ' to', 'om ', 'tom']
+    """
+    result = set()
+    for word in re.findall(r"\w+", normalize_name(name)):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity_score(query: Set[str], name_count: int, shared: int) -> float:
+    """Mean of trigram similarity and word similarity, given trigram set sizes"""
+    if not query or not shared:
+        return 0.0
+    similarity = shared / (len(query) + name_count - shared)
+    word_similarity = shared / len(query)
+    return round((similarity + word_similarity) / 2, 4)
+
+
+def reindex_name_trigrams(connection, person_ids: Sequence[UUID]) -> None:
+    """Rebuild the trigram rows for the given people (SQLite only)"""
+    person_ids = list(set(person_ids))
+    if not person_ids:
+        return
+
+    people = connection.execute(
+        select(Person.id, Person.user_id, Person.name).where(Person.id.in_(person_ids))
+    ).all()
+
+    connection.execute(
+        delete(trigram_table).where(trigram_table.c.personId.in_(person_ids))
+    )
+
+    rows = []
+    for person_id, user_id, name in people:
+        person_trigrams = trigrams(name)
+        rows.extend(
+            {
+                "personId": person_id,
+                "userId": user_id,
+                "trigram": trigram,
+                "trigram_count": len(person_trigrams),
+            }
+            for trigram in person_trigrams
+        )
+    if rows:
+        connection.execute(insert(trigram_table), rows)
+
+
+def _apply_name_changes(connection, changes) -> None:
+    """Rebuild trigram rows for people whose names were written"""
+    reindex_name_trigrams(connection, list(changes["people"]))
+
+
+# Only SQLite keeps a trigram table; PostgreSQL indexes name_normalized directly
+_name_handler = flush_events.register("name_trigrams", _apply_name_changes, dialect="sqlite")
+_name_handler.watch(Person, "people", fields=["name"])
+
+
+def match_names(
+    db: Session,
+    names: Sequence[str],
+    user_id: UUID,
+    min_similarity: float = MIN_SIMILARITY
+) -> Dict[str, List[Tuple[Person, float]]]:
+    """
+    Match a batch of names against a user's people in a single query.
+
+    Args:
+        db: Database session
+        names: Names to match (e.g. every name extracted from one message)
+        user_id: User ID to scope the search
+        min_similarity: Minimum score (0-1) for a person to be returned
+
+    Returns:
+        Dict mapping each input name to a list of (Person, score) tuples,
+        best match first. Exact (case-insensitive) matches score 1.0.
+    """
+    results: Dict[str, List[Tuple[Person, float]]] = {name: [] for name in names}
+    unique_names = list(dict.fromkeys(normalize_name(name) for name in names if normalize_name(name)))
+    if not unique_names:
+        return results
+
+    if db.get_bind().dialect.name == "postgresql":
+        matches = _match_names_postgres(db, unique_names, user_id)
+    else:
+        matches = _match_names_trigram_table(db, unique_names, user_id)
+
+    for name in names:
+        ranked = [
+            (person, score)
+            for person, score in matches.get(normalize_name(name), [])
+            if score >= min_similarity
+        ]
+        ranked.sort(key=lambda match: (-match[1], match[0].name))
+        results[name] = ranked
+
+    return results
+
+
+def _match_names_postgres(
+    db: Session,
+    names: List[str],
+    user_id: UUID
+) -> Dict[str, List[Tuple[Person, float]]]:
+    """pg_trgm scoring; % and <% are answered from the GIN trigram index"""
+    query_names = func.unnest(literal(names, ARRAY(String))).table_valued("name").render_derived()
+    score = (
+        func.similarity(Person.name_normalized, query_names.c.name)
+        + func.word_similarity(query_names.c.name, Person.name_normalized)
+    ) / 2
+
+    statement = select(Person, query_names.c.name, score).join(
+        query_names,
+        or_(
+            Person.name_normalized.op("%")(query_names.c.name),
+            query_names.c.name.op("<%")(Person.name_normalized)
+        )
+    ).where(Person.user_id == user_id)
+
+    matches = defaultdict(list)
+    for person, query_name, person_score in db.exec(statement).all():
+        matches[query_name].append((person, round(float(person_score), 4)))
+    return matches
+
+
+def _match_names_trigram_table(
+    db: Session,
+    names: List[str],
+    user_id: UUID
+) -> Dict[str, List[Tuple[Person, float]]]:
+    """Trigram-table scoring; candidates come from the (userId, trigram) index"""
+    query_trigrams = {name: trigrams(name) for name in names}
+    all_trigrams = set().union(*query_trigrams.values())
+    if not all_trigrams:
+        return {}
+
+    statement = select(
+        Person, PersonNameTrigram.trigram, PersonNameTrigram.trigram_count
+    ).join(
+        PersonNameTrigram, PersonNameTrigram.person_id == Person.id
+    ).where(
+        PersonNameTrigram.user_id == user_id,
+        PersonNameTrigram.trigram.in_(all_trigrams)
+    )
+
+    people: Dict[UUID, Person] = {}
+    person_trigrams: Dict[UUID, Set[str]] = defaultdict(set)
+    trigram_counts: Dict[UUID, int] = {}
+    for person, trigram, trigram_count in db.exec(statement).all():
+        people[person.id] = person
+        person_trigrams[person.id].add(trigram)
+        trigram_counts[person.id] = trigram_count
+
+    matches = defaultdict(list)
+    for name, query in query_trigrams.items():
+        for person_id, shared in person_trigrams.items():
+            person = people[person_id]
+            if normalize_name(person.name) == name:
+                score = 1.0
+            else:
+                score = similarity_score(query, trigram_counts[person_id], len(query & shared))
+            if score > 0:
+                matches[name].append((person, score))
+    return matches
@@ -0,0 +1,105 @@
+"""
+Radius queries over people's resolved locations.
+
+Candidates come from the (userId, geohash) index: the query point's geohash
+cell and its eight neighbors, at a precision where one cell is at least as
+large as the radius, always contain the whole search circle. Exact
+great-circle distances for the candidates are then computed in one
+vectorized NumPy pass, filtered to the radius and sorted.
+"""
+
+import math
+from typing import List, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlmodel import Session, select
+
+from models import Person, PersonNearbyResult
+from services import geohash
+from services.enrichment import enrich_people_with_health
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km from one point to arrays of points"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    d_lat = lat2 - lat1
+    d_lng = np.radians(longitudes) - math.radians(longitude)
+    a = np.sin(d_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(d_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def search_cells(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """
+    Geohash cells that together contain the circle around a point, or an empty
+    list if the circle is too large for any precision (search everything).
+    """
+    # Cells shrink east-west away from the equator; size them for the widest latitude in the circle
+    edge_latitude = min(89.9, abs(latitude) + radius_km / KM_PER_DEGREE)
+    for precision in range(geohash.PRECISION, 0, -1):
+        width, height = geohash.cell_size(precision)
+        width_km = width * KM_PER_DEGREE * math.cos(math.radians(edge_latitude))
+        if min(width_km, height * KM_PER_DEGREE) >= radius_km:
+            return geohash.neighbors(geohash.encode(latitude, longitude, precision))
+    return []
+
+
+def nearby_people(
+    db: Session,
+    user_id: UUID,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: int = 50
+) -> List[Tuple[UUID, float]]:
+    """
+    Find a user's people within radius_km of a point.
+
+    Args:
+        db: Database session
+        user_id: User ID to scope the search
+        latitude, longitude: Center of the search
+        radius_km: Search radius in kilometres
+        limit: Maximum number of results
+
+    Returns:
+        List of (person_id, distance_km) tuples, nearest first
+    """
+    query = select(Person.id, Person.resolved_lat, Person.resolved_lng).where(
+        Person.user_id == user_id,
+        Person.geohash.isnot(None)
+    )
+    cells = search_cells(latitude, longitude, radius_km)
+    if cells:
+        query = query.where(geohash.prefix_conditions(Person.geohash, cells))
+
+    candidates = db.exec(query).all()
+    if not candidates:
+        return []
+
+    ids = [person_id for person_id, _, _ in candidates]
+    coordinates = np.array([(lat, lng) for _, lat, lng in candidates], dtype=np.float64)
+    distances = haversine_km(latitude, longitude, coordinates[:, 0], coordinates[:, 1])
+
+    inside = np.flatnonzero(distances <= radius_km)
+    nearest = inside[np.argsort(distances[inside], kind="stable")][:limit]
+    return [(ids[index], round(float(distances[index]), 3)) for index in nearest]
+
+
+def nearby_results(db: Session, hits: List[tuple]) -> List[PersonNearbyResult]:
+    """Enrich (person_id, distance_km) hits, keeping their order"""
+    if not hits:
+        return []
+    people = db.exec(
+        select(Person).where(Person.id.in_([person_id for person_id, _ in hits]))
+    ).all()
+    enriched = {person.id: person for person in enrich_people_with_health(people, db)}
+    return [
+        PersonNearbyResult(person=enriched[person_id], distance_km=distance_km)
+        for person_id, distance_km in hits
+        if person_id in enriched
+    ]
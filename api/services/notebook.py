@@ -0,0 +1,294 @@
+"""
+Per-day notebook writes and the day view.
+
+A person has at most one notebook entry per day, enforced by the unique
+(personId, entry_date) index. Text appended to a day is stored as an
+immutable NotebookSegment row with the next sequence number, so an append
+is a small insert whatever the size of the day, and the entry row itself
+only has its updatedAt touched. The day's text is materialized on read: the
+entry's content followed by its segments in order.
+
+Appends take the entry row's lock through INSERT ... ON CONFLICT DO UPDATE
+... RETURNING (PostgreSQL and SQLite), which also serializes the sequence
+numbers of concurrent appends to the same day. None of this goes through an
+ORM flush, so the appended segment is indexed for search explicitly in the
+same transaction, as its own document; the rest of the day is not reindexed.
+
+Compaction folds the segments of days that have gone quiet (no append for
+COMPACT_AFTER) back into the entry's content, so reads stay one row per day
+for old entries while recent appends keep their own timestamps. It runs in
+the app (NotebookCompactionWorker) and is optional: the day view is the same
+before and after.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+import logging
+
+from sqlalchemy import DateTime, String, delete, func, literal, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from models import NotebookEntry, NotebookEntryRead, NotebookSegment
+from services.search import index_notebook_segment, reindex_notebook_entries, unindex_notebook_segments
+
+logger = logging.getLogger(__name__)
+
+# Separates appended text from the day's existing content
+APPEND_SEPARATOR = "\n"
+
+# A day's segments are folded into its entry once it has had no append for this long
+COMPACT_AFTER = timedelta(days=1)
+
+# Entries compacted per run
+COMPACT_BATCH_SIZE = 100
+
+# Seconds between compaction runs
+COMPACT_INTERVAL = 10 * 60
+
+notebook_table = NotebookEntry.__table__
+segment_table = NotebookSegment.__table__
+
+
+def _upsert_day(db: Session, person_id: UUID, user_id: UUID, entry_date: str, now: datetime) -> NotebookEntry:
+    """The day's entry, created empty if needed; its updatedAt is set to now and its row locked"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(NotebookEntry).values(
+        id=uuid4(),
+        person_id=person_id,
+        user_id=user_id,
+        entry_date=entry_date,
+        content="",
+        created_at=now,
+        updated_at=now
+    )
+    # An update rather than DO NOTHING, so RETURNING yields the existing row and it stays locked
+    statement = statement.on_conflict_do_update(
+        index_elements=[notebook_table.c.personId, notebook_table.c.entry_date],
+        set_={notebook_table.c.updatedAt: statement.excluded.updatedAt}
+    )
+    return db.exec(
+        statement.returning(NotebookEntry),
+        execution_options={"populate_existing": True}
+    ).scalar_one()
+
+
+def append_to_notebook(
+    db: Session,
+    person_id: UUID,
+    user_id: UUID,
+    entry_date: str,
+    content: str
+) -> NotebookEntry:
+    """
+    Append text to a person's entry for a day, creating the entry if needed.
+
+    Race-free, and three statements whatever the size of the day: the entry
+    upsert, the segment insert and the segment's search document. The caller
+    commits. The returned entry's content does not include its segments; use
+    read_entries for the day's text.
+
+    Args:
+        db: Database session
+        person_id: Person the entry belongs to
+        user_id: Owner of the person
+        entry_date: Day in YYYY-MM-DD format
+        content: Text to add (on its own line if the day already has text)
+
+    Returns:
+        The day's entry
+    """
+    now = datetime.utcnow()
+    entry = _upsert_day(db, person_id, user_id, entry_date, now)
+
+    # The entry row lock taken above keeps concurrent appends from picking the same seq
+    next_seq = (
+        select(
+            literal(entry.id, NotebookSegment.entry_id.type),
+            func.coalesce(func.max(segment_table.c.seq), 0) + 1,
+            literal(content, String),
+            literal(now, DateTime)
+        )
+        .where(segment_table.c.entryId == entry.id)
+    )
+    seq = db.exec(segment_table.insert().from_select(
+        [segment_table.c.entryId, segment_table.c.seq, segment_table.c.content, segment_table.c.createdAt],
+        next_seq
+    ).returning(segment_table.c.seq)).scalar_one()
+    index_notebook_segment(db.connection(), entry, seq, content)
+    return entry
+
+
+def get_or_create_notebook_entry(
+    db: Session,
+    person_id: UUID,
+    user_id: UUID,
+    entry_date: str
+) -> NotebookEntry:
+    """
+    A person's entry for a day, created empty if there is none.
+
+    A single upsert statement and race-free; the caller commits. The entry
+    is not written through an ORM flush and an empty day has nothing to
+    index, so no search documents are touched.
+    """
+    return _upsert_day(db, person_id, user_id, entry_date, datetime.utcnow())
+
+
+def replace_notebook_content(db: Session, entry: NotebookEntry, content: str) -> None:
+    """Replace a day's whole text, dropping its segments; the caller commits"""
+    db.exec(delete(NotebookSegment).where(NotebookSegment.entry_id == entry.id))
+    # The content change reindexes the entry on flush, but only if the content differs
+    unindex_notebook_segments(db.connection(), entry.id)
+    entry.content = content
+    entry.updated_at = datetime.utcnow()
+    db.add(entry)
+
+
+def materialize(content: str, segments: Iterable[str]) -> str:
+    """A day's text from its entry content and segment contents in order"""
+    return APPEND_SEPARATOR.join(part for part in [content, *segments] if part)
+
+
+def segments_by_entry(
+    db: Session,
+    entry_ids: Iterable[UUID],
+    max_length: Optional[int] = None
+) -> Dict[UUID, List[str]]:
+    """
+    Segment contents of the given entries, in order.
+
+    Args:
+        max_length: Read at most this many characters of each segment
+    """
+    entry_ids = list(entry_ids)
+    if not entry_ids:
+        return {}
+
+    content = func.substr(NotebookSegment.content, 1, max_length) if max_length else NotebookSegment.content
+    segments: Dict[UUID, List[str]] = {}
+    for entry_id, text in db.exec(
+        select(NotebookSegment.entry_id, content)
+        .where(NotebookSegment.entry_id.in_(entry_ids))
+        .order_by(NotebookSegment.entry_id, NotebookSegment.seq)
+    ).all():
+        segments.setdefault(entry_id, []).append(text)
+    return segments
+
+
+def read_entries(db: Session, entries: List[NotebookEntry]) -> List[NotebookEntryRead]:
+    """Entries with their segments materialized into content, in one query"""
+    segments = segments_by_entry(db, [entry.id for entry in entries])
+    return [
+        NotebookEntryRead.model_validate(entry).model_copy(
+            update={"content": materialize(entry.content, segments.get(entry.id, []))}
+        )
+        for entry in entries
+    ]
+
+
+def compact_entry(db: Session, entry_id: UUID) -> int:
+    """
+    Fold an entry's segments into its content. The caller commits.
+
+    Returns:
+        Number of segments folded
+    """
+    # Locks out appends to the day until the caller commits (no-op on SQLite, which locks the database)
+    entry_content = db.exec(
+        select(NotebookEntry.content).where(NotebookEntry.id == entry_id).with_for_update()
+    ).first()
+    if entry_content is None:
+        return 0
+
+    segments = db.exec(
+        select(NotebookSegment.seq, NotebookSegment.content)
+        .where(NotebookSegment.entry_id == entry_id)
+        .order_by(NotebookSegment.seq)
+    ).all()
+    if not segments:
+        return 0
+
+    # Core statements; the folded segments' search documents are merged below too
+    db.exec(
+        update(NotebookEntry)
+        .where(NotebookEntry.id == entry_id)
+        .values(content=materialize(entry_content, [content for _, content in segments]))
+        .execution_options(synchronize_session=False)
+    )
+    db.exec(
+        delete(NotebookSegment)
+        .where(NotebookSegment.entry_id == entry_id, NotebookSegment.seq <= segments[-1][0])
+        .execution_options(synchronize_session=False)
+    )
+    reindex_notebook_entries(db.connection(), [entry_id])
+    return len(segments)
+
+
+def compact_notebook_segments(
+    session_factory: Callable[[], Session],
+    older_than: timedelta = COMPACT_AFTER,
+    batch_size: int = COMPACT_BATCH_SIZE
+) -> int:
+    """
+    Compact up to batch_size entries whose last append is older than older_than.
+
+    Each entry is committed separately so appends are never blocked for long.
+
+    Returns:
+        Number of entries compacted
+    """
+    cutoff = datetime.utcnow() - older_than
+    with session_factory() as db:
+        entry_ids = db.exec(
+            select(NotebookSegment.entry_id)
+            .group_by(NotebookSegment.entry_id)
+            .having(func.max(NotebookSegment.created_at) < cutoff)
+            .limit(batch_size)
+        ).all()
+
+    compacted = 0
+    for entry_id in entry_ids:
+        with session_factory() as db:
+            try:
+                if compact_entry(db, entry_id):
+                    compacted += 1
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception(f"Failed to compact notebook entry {entry_id}")
+
+    if compacted:
+        logger.info(f"Compacted {compacted} notebook entries")
+    return compacted
+
+
+class NotebookCompactionWorker:
+    """Compacts notebook segments in a background task on the app's event loop"""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float = COMPACT_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(compact_notebook_segments, self.session_factory)
+            except Exception:
+                logger.exception("Notebook compaction worker failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,125 @@
+"""
+Keyset (cursor) pagination helpers for list endpoints.
+
+Cursors are opaque, URL-safe tokens that encode the sort key of the last row
+on a page. The next page is fetched with a row-value comparison on the same
+key, so deep pages stay as cheap as the first one and rows don't shift
+between pages when contacts are added or renamed.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlmodel import Session
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "uuid" in value:
+            return UUID(value["uuid"])
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode sort key values into an opaque cursor token"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor token back into sort key values.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong cursor size")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _sort_value(row: Any, column) -> Any:
+    """A sort column's value on a row; rows of select(Entity, ...) keep the entity's columns on the entity"""
+    if hasattr(row, column.key):
+        return getattr(row, column.key)
+    return getattr(row[0], column.key)
+
+
+def paginate(
+    db: Session,
+    query,
+    sort_columns: Sequence,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    descending: bool = False
+) -> list:
+    """
+    Fetch one page of rows ordered by sort_columns, using keyset pagination
+    when a cursor is given and falling back to skip/limit otherwise.
+
+    The last column of sort_columns must be unique (usually the primary key)
+    so the ordering is total. When more rows exist, the cursor for the next
+    page is set on the X-Next-Cursor response header.
+
+    Args:
+        db: Database session
+        query: Base select() with filters applied
+        sort_columns: Columns forming the sort key, e.g. (Person.name, Person.id);
+            labelled expressions must also be selected by the query
+        response: Response to attach the next-page cursor header to
+        cursor: Cursor from a previous page's X-Next-Cursor header
+        skip: Offset for legacy offset pagination (ignored when cursor is given)
+        limit: Page size, or None for every remaining row (no next cursor)
+        descending: Sort newest/largest first
+
+    Returns:
+        List of rows for the page
+    """
+    key = tuple_(*sort_columns)
+
+    if cursor:
+        values = decode_cursor(cursor, len(sort_columns))
+        query = query.where(key < tuple(values) if descending else key > tuple(values))
+    elif skip:
+        query = query.offset(skip)
+
+    order = [c.desc() for c in sort_columns] if descending else list(sort_columns)
+    query = query.order_by(*order)
+    if limit is None:
+        return db.exec(query).all()
+    rows = db.exec(query.limit(limit + 1)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if rows:
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                *(_sort_value(last, c) for c in sort_columns)
+            )
+
+    return rows
@@ -0,0 +1,32 @@
+"""
+Optional shared Redis connection.
+
+Redis is only used for state that is worth sharing between processes (the
+map payload cache, the geocoder rate limit). Everything that uses it must
+keep working without it: get_redis() returns None when REDIS_URL is unset or
+the redis package is missing, and callers treat Redis errors as a miss.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_redis = None
+_redis_checked = False
+
+
+def get_redis():
+    """Redis client if REDIS_URL is configured, else None"""
+    global _redis, _redis_checked
+    if not _redis_checked:
+        _redis_checked = True
+        if REDIS_URL:
+            try:
+                import redis
+                _redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.25, socket_connect_timeout=0.25)
+            except ImportError:
+                logger.warning("REDIS_URL is set but the redis package is not installed")
+    return _redis
@@ -0,0 +1,412 @@
+"""
+Full-text search over people, notebook entries and tag names.
+
+Each person has one row in personSearch holding their own fields and tag
+names, and each piece of notebook text has its own row in notebookSearch: an
+entry's content and each segment appended to it. A person matches a query
+when every word is found in at least one of their documents. The index on
+top of both tables depends on the database:
+- PostgreSQL: a generated, weighted tsvector column with a GIN index
+- SQLite: an external-content FTS5 table kept in sync by triggers
+
+Rows are rebuilt automatically whenever a Person, NotebookEntry, Tag or
+PersonTag is written through an ORM session. services/notebook.py adds one
+notebookSearch row per appended segment and rebuilds a day's rows when it
+compacts its segments.
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import DDL, Float, delete, event, func, insert, literal, literal_column, text, union, union_all
+from sqlmodel import Session, select
+import logging
+
+from models import (
+    Person, NotebookEntry, NotebookSegment, Tag, PersonTag, PersonSearchDocument, NotebookSearchDocument
+)
+from services import flush_events
+from services.flush_events import people_of_tags
+
+logger = logging.getLogger(__name__)
+
+search_table = PersonSearchDocument.__table__
+notebook_search_table = NotebookSearchDocument.__table__
+
+# Person attributes that appear in their search document (user_id scopes it)
+PERSON_SEARCH_FIELDS = ["name", "body", "mnemonic", "email", "phone_number", "city", "user_id"]
+
+SNIPPET_START = "<b>"
+SNIPPET_END = "</b>"
+
+
+_POSTGRES_DDL = {
+    "personSearch": [
+        """
+        ALTER TABLE "personSearch" ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(tags, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(details, '')), 'C')
+        ) STORED
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS "ix_personSearch_search_vector"
+        ON "personSearch" USING GIN (search_vector)
+        """,
+    ],
+    "notebookSearch": [
+        """
+        ALTER TABLE "notebookSearch" ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce(content, '')), 'D')) STORED
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS "ix_notebookSearch_search_vector"
+        ON "notebookSearch" USING GIN (search_vector)
+        """,
+    ],
+}
+
+
+def _sqlite_ddl(table: str, columns: List[str]) -> List[str]:
+    """FTS5 external-content table over table's columns, with its sync triggers"""
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS "{table}Fts" USING fts5(
+            {names},
+            content='{table}', content_rowid='rowid',
+            tokenize='porter unicode61'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS "{table}_ai" AFTER INSERT ON "{table}" BEGIN
+            INSERT INTO "{table}Fts"(rowid, {names}) VALUES (new.rowid, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS "{table}_ad" AFTER DELETE ON "{table}" BEGIN
+            INSERT INTO "{table}Fts"("{table}Fts", rowid, {names}) VALUES ('delete', old.rowid, {old_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS "{table}_au" AFTER UPDATE ON "{table}" BEGIN
+            INSERT INTO "{table}Fts"("{table}Fts", rowid, {names}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO "{table}Fts"(rowid, {names}) VALUES (new.rowid, {new_values});
+        END
+        """,
+    ]
+
+
+_SQLITE_DDL = {
+    "personSearch": _sqlite_ddl("personSearch", ["name", "tags", "details"]),
+    "notebookSearch": _sqlite_ddl("notebookSearch", ["content"]),
+}
+
+for table in (search_table, notebook_search_table):
+    for statement in _POSTGRES_DDL[table.name]:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    for statement in _SQLITE_DDL[table.name]:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(
+        table,
+        "before_drop",
+        DDL(f'DROP TABLE IF EXISTS "{table.name}Fts"').execute_if(dialect="sqlite")
+    )
+
+
+def create_search_index(connection) -> None:
+    """Create the dialect-specific index objects on existing personSearch and notebookSearch tables"""
+    ddl = _POSTGRES_DDL if connection.dialect.name == "postgresql" else _SQLITE_DDL
+    for statements in ddl.values():
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def reindex_people(connection, person_ids: Iterable[UUID]) -> None:
+    """
+    Rebuild the search documents for the given people (their notebooks have their own).
+
+    Uses Core statements on the connection so it is safe to call from
+    inside ORM flush events.
+    """
+    person_ids = list(set(person_ids))
+    if not person_ids:
+        return
+
+    people = connection.execute(
+        select(
+            Person.id, Person.user_id, Person.name, Person.body, Person.mnemonic,
+            Person.email, Person.phone_number, Person.city
+        ).where(Person.id.in_(person_ids))
+    ).all()
+
+    tags = {}
+    for person_id, tag_name in connection.execute(
+        select(PersonTag.person_id, Tag.name)
+        .join(Tag, Tag.id == PersonTag.tag_id)
+        .where(PersonTag.person_id.in_(person_ids))
+    ).all():
+        tags.setdefault(person_id, []).append(tag_name)
+
+    connection.execute(
+        delete(search_table).where(search_table.c.personId.in_(person_ids))
+    )
+
+    documents = [
+        {
+            "personId": person_id,
+            "userId": user_id,
+            "name": name or "",
+            "tags": " ".join(tags.get(person_id, [])),
+            "details": " ".join(part for part in [body, mnemonic, email, phone_number, city] if part),
+        }
+        for person_id, user_id, name, body, mnemonic, email, phone_number, city in people
+    ]
+    if documents:
+        connection.execute(insert(search_table), documents)
+
+
+def reindex_notebook_entries(connection, entry_ids: Iterable[UUID]) -> None:
+    """
+    Rebuild the search documents of the given notebook entries: one for the
+    entry's content and one per segment. Safe to call from flush events.
+    """
+    entry_ids = list(set(entry_ids))
+    if not entry_ids:
+        return
+
+    connection.execute(
+        delete(notebook_search_table).where(notebook_search_table.c.entryId.in_(entry_ids))
+    )
+    columns = [
+        notebook_search_table.c.entryId, notebook_search_table.c.seq, notebook_search_table.c.personId,
+        notebook_search_table.c.userId, notebook_search_table.c.content
+    ]
+    connection.execute(notebook_search_table.insert().from_select(columns, select(
+        NotebookEntry.id, literal(0), NotebookEntry.person_id, NotebookEntry.user_id, NotebookEntry.content
+    ).where(NotebookEntry.id.in_(entry_ids), NotebookEntry.content != "")))
+    connection.execute(notebook_search_table.insert().from_select(columns, select(
+        NotebookSegment.entry_id, NotebookSegment.seq, NotebookEntry.person_id, NotebookEntry.user_id,
+        NotebookSegment.content
+    ).join(NotebookEntry, NotebookEntry.id == NotebookSegment.entry_id).where(NotebookSegment.entry_id.in_(entry_ids))))
+
+
+def index_notebook_segment(connection, entry: NotebookEntry, seq: int, content: str) -> None:
+    """Add the search document of one appended segment; costs the segment's size, not the day's"""
+    connection.execute(insert(notebook_search_table).values(
+        entryId=entry.id, seq=seq, personId=entry.person_id, userId=entry.user_id, content=content
+    ))
+
+
+def unindex_notebook_segments(connection, entry_id: UUID) -> None:
+    """Drop the search documents of an entry's segments, e.g. after they are deleted"""
+    connection.execute(
+        delete(notebook_search_table)
+        .where(notebook_search_table.c.entryId == entry_id, notebook_search_table.c.seq > 0)
+    )
+
+
+def rebuild_search_index(db: Session, user_id: Optional[UUID] = None, batch_size: int = 500) -> int:
+    """
+    Rebuild search documents for every person (or every person of one user)
+    and their notebooks.
+
+    Returns:
+        Number of people reindexed
+    """
+    query = select(Person.id)
+    entries = select(NotebookEntry.id)
+    if user_id:
+        query = query.where(Person.user_id == user_id)
+        entries = entries.where(NotebookEntry.user_id == user_id)
+    person_ids = db.exec(query).all()
+    entry_ids = db.exec(entries).all()
+
+    connection = db.connection()
+    for start in range(0, len(person_ids), batch_size):
+        reindex_people(connection, person_ids[start:start + batch_size])
+    for start in range(0, len(entry_ids), batch_size):
+        reindex_notebook_entries(connection, entry_ids[start:start + batch_size])
+    db.commit()
+    return len(person_ids)
+
+
+def _apply_search_changes(connection, changes) -> None:
+    """Rebuild the search documents whose text changed"""
+    reindex_people(connection, changes.get("people", set()) | people_of_tags(connection, changes.get("tags", ())))
+    reindex_notebook_entries(connection, changes.get("entries", ()))
+
+
+# Only writes to text that ends up in a document count; contact dates, health
+# schedules, coordinates and geocoding status leave the index alone
+_search_handler = flush_events.register("search", _apply_search_changes)
+_search_handler.watch(Person, "people", fields=PERSON_SEARCH_FIELDS)
+_search_handler.watch(NotebookEntry, "entries", fields=["content"])
+_search_handler.watch(PersonTag, "people", key=lambda link: link.person_id)
+_search_handler.watch(Tag, "tags", fields=["name"], new=False, deleted=False)
+
+
+def _tokens(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _token_query(dialect: str, token: str) -> str:
+    """Prefix query for one word"""
+    return f"{token}:*" if dialect == "postgresql" else f'"{token}"*'
+
+
+def _searchable_tokens(db: Session, query: str) -> List[str]:
+    """
+    The words of query that can match anything. On Postgres a stopword
+    ("the", "from") parses to an empty tsquery, which matches no document,
+    so such words are dropped rather than required.
+    """
+    tokens = _tokens(query)
+    if not tokens or _dialect(db) != "postgresql":
+        return tokens
+    lexemes = db.execute(select(*[
+        func.numnode(func.to_tsquery("english", _token_query("postgresql", token))) for token in tokens
+    ])).one()
+    return [token for token, count in zip(tokens, lexemes) if count]
+
+
+def _documents_matching(dialect: str, table, user_id: UUID, param: str, search_query: str):
+    """Select of the person ID of each of a user's documents in table that match search_query"""
+    if dialect == "postgresql":
+        condition = f"search_vector @@ to_tsquery('english', :{param})"
+    else:
+        condition = f'"{table.name}".rowid IN (SELECT rowid FROM "{table.name}Fts" WHERE "{table.name}Fts" MATCH :{param})'
+    return select(table.c.personId).where(
+        table.c.userId == user_id,
+        text(condition).bindparams(**{param: search_query})
+    )
+
+
+def matching_person_ids(db: Session, user_id: UUID, query: str):
+    """
+    Subquery of person IDs where every word in query (prefix match) is found
+    in their search document or one of their notebook documents, for use as
+    Person.id.in_(...). Returns None if the query has no searchable words.
+    """
+    tokens = _searchable_tokens(db, query)
+    if not tokens:
+        return None
+    return _matching(_dialect(db), user_id, tokens)
+
+
+def _matching(dialect: str, user_id: UUID, tokens: List[str]):
+    """matching_person_ids for words already known to be searchable"""
+    per_token = [
+        union(*[
+            _documents_matching(dialect, table, user_id, f"{table.name}_{position}", _token_query(dialect, token))
+            for table in (search_table, notebook_search_table)
+        ])
+        for position, token in enumerate(tokens)
+    ]
+    first = per_token[0].subquery()
+    return select(first.c.personId).where(*[first.c.personId.in_(matches) for matches in per_token[1:]])
+
+
+def _hits(dialect: str, table, user_id: UUID, search_query: str):
+    """
+    Select of (person_id, rank, document) for each of a user's documents in
+    table matching search_query. On SQLite the document is already a snippet.
+    """
+    if dialect == "postgresql":
+        vector = literal_column(f'"{table.name}".search_vector')
+        ts_query = func.to_tsquery("english", search_query)
+        rank = func.ts_rank(vector, ts_query)
+        condition = vector.op("@@")(ts_query)
+        if table is search_table:
+            document = func.concat_ws(
+                " … ", table.c.name, func.nullif(table.c.tags, ""), func.nullif(table.c.details, "")
+            )
+        else:
+            document = table.c.content
+        source = table
+    else:
+        fts = f'"{table.name}Fts"'
+        # bm25() is lower-is-better, so negate it for a common ordering; names weigh most
+        weights = ", 10.0, 5.0, 2.0" if table is search_table else ""
+        rank = literal_column(f"-bm25({fts}{weights})", Float)
+        condition = text(f"{fts} MATCH :search_query").bindparams(search_query=search_query)
+        document = literal_column(f"snippet({fts}, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 12)")
+        source = table.join(text(fts), text(f'{fts}.rowid = "{table.name}".rowid'))
+
+    return (
+        select(table.c.personId.label("person_id"), rank.label("rank"), document.label("document"))
+        .select_from(source)
+        .where(table.c.userId == user_id, condition)
+    )
+
+
+def search_people(
+    db: Session,
+    user_id: UUID,
+    query: str,
+    limit: int = 20
+) -> List[Tuple[UUID, float, str]]:
+    """
+    Ranked full-text search over a user's people.
+
+    A person's rank and snippet are those of their best-matching document.
+
+    Args:
+        db: Database session
+        user_id: User ID to scope the search
+        query: Free-text query; every word must match (prefix match)
+        limit: Maximum number of results
+
+    Returns:
+        List of (person_id, rank, snippet) tuples, best match first.
+        Higher rank is better on both databases.
+    """
+    tokens = _searchable_tokens(db, query)
+    if not tokens:
+        return []
+
+    dialect = _dialect(db)
+    matches = _matching(dialect, user_id, tokens)
+    if dialect == "postgresql":
+        search_query = " | ".join(_token_query(dialect, token) for token in tokens)
+    else:
+        search_query = " OR ".join(_token_query(dialect, token) for token in tokens)
+
+    hits = union_all(*[
+        _hits(dialect, table, user_id, search_query) for table in (search_table, notebook_search_table)
+    ]).subquery("hits")
+    ranked = (
+        select(
+            hits.c.person_id, hits.c.rank, hits.c.document,
+            func.row_number().over(partition_by=hits.c.person_id, order_by=hits.c.rank.desc()).label("position")
+        )
+        .where(hits.c.person_id.in_(matches))
+        .subquery("ranked")
+    )
+    best = (
+        select(ranked.c.person_id, ranked.c.rank, ranked.c.document)
+        .where(ranked.c.position == 1)
+        .order_by(ranked.c.rank.desc())
+        .limit(limit)
+        .subquery("best")
+    )
+
+    snippet = best.c.document
+    if dialect == "postgresql":
+        # Highlight only the page of results, not every hit
+        snippet = func.ts_headline(
+            "english", best.c.document, func.to_tsquery("english", search_query),
+            f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=24, MinWords=8"
+        )
+    rows = db.execute(
+        select(best.c.person_id, best.c.rank, snippet).order_by(best.c.rank.desc())
+    ).all()
+    return [(person_id, float(rank), snippet) for person_id, rank, snippet in rows]
@@ -0,0 +1,176 @@
+"""
+Offline US ZIP code centroid lookup.
+
+Centroids live in a compact binary file that is memory-mapped and binary
+searched, so a zip-only geocode needs no network and touches only a few
+pages of the file.
+
+File format (little-endian):
+- header: magic b"ZIPC", uint16 version, uint32 record count
+- records sorted by zip: uint32 zip, float32 latitude, float32 longitude
+
+The file is built from the Census Gazetteer ZCTA file with
+build_zip_centroids.py. If it is missing, lookups return None and callers
+fall back to the online geocoder.
+"""
+
+import mmap
+import os
+import re
+import struct
+from threading import Lock
+from typing import Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ZIPC"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<Iff")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "zip_centroids.bin")
+ZIP_CENTROIDS_PATH = os.getenv("ZIP_CENTROIDS_PATH", DEFAULT_PATH)
+
+_ZIP_PATTERN = re.compile(r"^\s*(\d{5})(?:-\d{4})?\s*$")
+
+
+def parse_zip(zip_code: Optional[str]) -> Optional[int]:
+    """
+    Extract the 5-digit ZIP from a ZIP or ZIP+4 string.
+
+    Examples:
+        >>> parse_zip("02139-4307")
+        2139
+        >>> parse_zip("SW1A 1AA") is None
+        True
+    """
+    match = _ZIP_PATTERN.match(zip_code or "")
+    return int(match.group(1)) if match else None
+
+
+def write_zip_centroids(path: str, centroids: Iterable[Tuple[str, float, float]]) -> int:
+    """
+    Write (zip, latitude, longitude) rows to a centroid file.
+
+    Returns:
+        Number of records written
+    """
+    records = {}
+    for zip_code, latitude, longitude in centroids:
+        key = parse_zip(zip_code)
+        if key is not None:
+            records[key] = (latitude, longitude)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for key in sorted(records):
+            f.write(RECORD.pack(key, *records[key]))
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class ZipCentroids:
+    """Read-only, memory-mapped view of a centroid file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {VERSION} ZIP centroid file")
+        if len(self._mmap) < HEADER.size + count * RECORD.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is truncated")
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _zip_at(self, index: int) -> int:
+        return struct.unpack_from("<I", self._mmap, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, zip_code: Optional[str]) -> Optional[Tuple[float, float]]:
+        """
+        Return the (latitude, longitude) centroid of a ZIP code, or None.
+
+        Examples:
+            >>> centroids.lookup("94110")
+            (37.7484, -122.4156)
+        """
+        key = parse_zip(zip_code)
+        if key is None:
+            return None
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._zip_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.count:
+            return None
+        found, latitude, longitude = RECORD.unpack_from(self._mmap, HEADER.size + low * RECORD.size)
+        if found != key:
+            return None
+        # float32 storage: round away the representation noise (~1m precision)
+        return (round(latitude, 5), round(longitude, 5))
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+_centroids: Optional[ZipCentroids] = None
+_loaded = False
+_load_lock = Lock()
+
+
+def _get_centroids() -> Optional[ZipCentroids]:
+    global _centroids, _loaded
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                try:
+                    _centroids = ZipCentroids(ZIP_CENTROIDS_PATH)
+                    logger.info(f"Loaded {len(_centroids)} ZIP centroids from {ZIP_CENTROIDS_PATH}")
+                except FileNotFoundError:
+                    logger.warning(
+                        f"ZIP centroid file not found at {ZIP_CENTROIDS_PATH}; "
+                        "zip-only geocoding will use the online geocoder"
+                    )
+                except ValueError as e:
+                    logger.error(f"Could not load ZIP centroids: {e}")
+                _loaded = True
+    return _centroids
+
+
+def lookup_zip(zip_code: Optional[str]) -> Optional[Tuple[float, float]]:
+    """
+    Look up a ZIP code centroid in the bundled dataset.
+
+    Returns:
+        Tuple of (latitude, longitude), or None if the ZIP is unknown or
+        the dataset is not installed
+    """
+    centroids = _get_centroids()
+    return centroids.lookup(zip_code) if centroids else None
+
+
+def load_zip_centroids(path: str) -> None:
+    """Use the centroid file at path for lookup_zip (replaces any loaded file)"""
+    global _centroids, _loaded
+    with _load_lock:
+        previous = _centroids
+        _centroids = ZipCentroids(path)
+        _loaded = True
+    if previous:
+        previous.close()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Record the daily relationship-health snapshots, for running from cron when
+the app's background worker is disabled (HEALTH_SNAPSHOT_WORKER_ENABLED=false).
+
+Snapshots are forward-only: each run records the day that just ended
+(yesterday, UTC). Past days cannot be recorded after the fact, because the
+people's contact history is not kept.
+
+Usage:
+    python snapshot_health.py
+"""
+
+import logging
+
+from database import SessionLocal
+from services.health_snapshots import take_daily_snapshots
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    taken = take_daily_snapshots(SessionLocal)
+    logger.info(f"Snapshotted {taken} users")
@@ -309,6 +309,55 @@ class TestNameMatching:
         assert results[1].name == "Tommy"  # Starts with second
         assert results[2].name == "John Tomson"  # Contains third
 
+    def test_find_by_name_tolerates_typos(self, db_session, test_user):
+        """Test that a misspelled name still matches via trigram similarity."""
+        db_session.add(Person(name="Katherine Johnson", body="", user_id=test_user.id))
+        db_session.commit()
+
+        manager = PersonManager(db_session)
+        results = manager.find_by_name("Katharine", test_user.id)
+
+        assert len(results) == 1
+        assert results[0].name == "Katherine Johnson"
+
+    def test_match_people_batch_scores(self, db_session, test_user):
+        """Test batch matching returns one result per name with real scores."""
+        db_session.add(Person(name="Tom", body="", user_id=test_user.id))
+        db_session.add(Person(name="Tommy", body="", user_id=test_user.id))
+        db_session.add(Person(name="Sarah Johnson", body="", user_id=test_user.id))
+        db_session.commit()
+
+        manager = PersonManager(db_session)
+        results = manager.match_people(["tom", "Johnson", "Alexander"], test_user.id)
+
+        assert [r.extracted_name for r in results] == ["tom", "Johnson", "Alexander"]
+
+        tom = results[0]
+        assert [m.person_name for m in tom.matches] == ["Tom", "Tommy"]
+        assert tom.matches[0].similarity == 1.0
+        assert 0 < tom.matches[1].similarity < 1.0
+        assert tom.is_ambiguous
+
+        johnson = results[1]
+        assert [m.person_name for m in johnson.matches] == ["Sarah Johnson"]
+        assert not johnson.is_ambiguous
+
+        assert results[2].matches == []
+
+    def test_renamed_person_is_rematched(self, db_session, test_user):
+        """Test that the name index follows renames."""
+        person = Person(name="Robert", body="", user_id=test_user.id)
+        db_session.add(person)
+        db_session.commit()
+
+        person.name = "Bobby"
+        db_session.add(person)
+        db_session.commit()
+
+        manager = PersonManager(db_session)
+        assert manager.find_by_name("Robert", test_user.id) == []
+        assert [p.name for p in manager.find_by_name("Bobby", test_user.id)] == ["Bobby"]
+
 
 class TestPersonManager:
     """Test PersonManager functionality."""
@@ -0,0 +1,131 @@
+"""
+Tests for the streaming NDJSON export
+"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.pool import StaticPool
+
+from main import app
+from database import get_db
+from models import (
+    User, Person, Tag, PersonTag, NotebookEntry, Message, MessageDirection,
+    History, ChangeTypeChoices, PersonAssociation
+)
+from routers import export
+from routers.auth import get_current_user_id, get_current_user
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    """Create a test database session with in-memory SQLite"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(name="test_user")
+def test_user_fixture(session: Session):
+    """Create a test user"""
+    user = User(
+        firebase_uid="test_uid_123",
+        name="Test User",
+        email="test@example.com"
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+@pytest.fixture(name="client")
+def client_fixture(session: Session, test_user: User):
+    """Create a test client with overridden dependencies"""
+    user_id = test_user.id
+
+    def get_db_override():
+        yield session
+
+    def get_current_user_override():
+        return test_user
+
+    def get_current_user_id_override():
+        return user_id
+
+    app.dependency_overrides[get_db] = get_db_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    app.dependency_overrides[get_current_user_id] = get_current_user_id_override
+
+    client = TestClient(app)
+    yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="address_book")
+def address_book_fixture(session: Session, test_user: User):
+    """Create people with every kind of related data"""
+    alice = Person(name="Alice", user_id=test_user.id)
+    bob = Person(name="Bob", user_id=test_user.id)
+    tag = Tag(name="Climbing", user_id=test_user.id)
+    session.add_all([alice, bob, tag])
+    session.commit()
+
+    session.add_all([
+        PersonTag(person_id=alice.id, tag_id=tag.id),
+        NotebookEntry(person_id=alice.id, user_id=test_user.id, entry_date="2024-01-01", content="Met at the gym"),
+        Message(person_id=alice.id, user_id=test_user.id, body="Hi!", direction=MessageDirection.OUTBOUND),
+        History(person_id=alice.id, user_id=test_user.id, change_type=ChangeTypeChoices.MANUAL, field="name", detail="Renamed"),
+        PersonAssociation(person_id=alice.id, associate_id=bob.id),
+    ])
+    session.commit()
+    return {"alice": alice.id, "bob": bob.id}
+
+
+class TestExport:
+    """NDJSON export of the full address book"""
+
+    def test_export_lines(self, client: TestClient, test_user: User, address_book):
+        user_id = test_user.id
+        response = client.get("/api/export/")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["type"] == "export"
+        assert lines[0]["user_id"] == str(user_id)
+
+        people = {line["name"]: line for line in lines[1:]}
+        assert set(people) == {"Alice", "Bob"}
+
+        alice = people["Alice"]
+        assert [t["name"] for t in alice["tags"]] == ["Climbing"]
+        assert [e["content"] for e in alice["notebook_entries"]] == ["Met at the gym"]
+        assert [m["body"] for m in alice["messages"]] == ["Hi!"]
+        assert [h["detail"] for h in alice["history"]] == ["Renamed"]
+        assert [a["associate_id"] for a in alice["associations"]] == [str(address_book["bob"])]
+        assert people["Bob"]["tags"] == []
+
+    def test_export_spans_batches(self, client: TestClient, session: Session, test_user: User, monkeypatch):
+        monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 3)
+        session.add_all([Person(name=f"Person {i}", user_id=test_user.id) for i in range(10)])
+        session.commit()
+
+        response = client.get("/api/export/")
+        lines = response.text.splitlines()
+        assert len(lines) == 11
+
+    def test_export_is_scoped_to_user(self, client: TestClient, session: Session):
+        other = User(firebase_uid="other_uid", email="other@example.com")
+        session.add(other)
+        session.commit()
+        session.add(Person(name="Not mine", user_id=other.id))
+        session.commit()
+
+        response = client.get("/api/export/")
+        assert len(response.text.splitlines()) == 1
@@ -0,0 +1,546 @@
+"""
+Tests for the geocoding cache
+"""
+from datetime import datetime, timedelta
+import time
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session, create_engine, SQLModel, select
+from sqlmodel.pool import StaticPool
+
+from models import GeocodeBackfill, GeocodeCache, GeocodeJob, Person, ProcessingStatus, Tag, User
+from services import geocoding, geocode_queue
+from services.geocode_queue import advance_backfills, enqueue_geocode, process_next_job, start_backfill
+from services import geocoders
+from services.geocoders import (
+    CircuitBreaker, Geocoder, GeocoderUnavailable, GeocodingError, NominatimGeocoder, OfflineGeocoder, set_geocoder
+)
+from services.geocoding import geocode_address, normalize_address, clear_geocode_cache
+from services.zip_centroids import ZipCentroids, write_zip_centroids, parse_zip
+from fake_geocoder import FakeNominatimServer
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    """Create an in-memory SQLite engine"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    """Create a test database session"""
+    with Session(engine) as session:
+        yield session
+
+
+class FakeGeocoder(Geocoder):
+    """Records every lookup and answers from a dict (or a replaceable handler)"""
+
+    def __init__(self):
+        self.calls = []
+        self.results = {}
+        self.handler = None
+
+    async def geocode(self, street_address, city, state, zip_code):
+        address = ", ".join(p for p in [street_address, city, state, zip_code] if p)
+        self.calls.append(address)
+        if self.handler:
+            return self.handler(address)
+        return self.results.get(address)
+
+
+@pytest.fixture(name="geocoder")
+def geocoder_fixture(monkeypatch):
+    """Replace Nominatim with a fake backend"""
+    fake = FakeGeocoder()
+    clear_geocode_cache()
+    set_geocoder(fake)
+    monkeypatch.setattr(geocoding, "lookup_zip", lambda zip_code: None)
+    yield fake
+    set_geocoder(None)
+    clear_geocode_cache()
+
+
+def test_normalize_address():
+    assert normalize_address("123 Main St.", None, "CA", "94110") == "123 main st, ca, 94110"
+    assert normalize_address(" 123  MAIN st ", "", "ca", "94110") == "123 main st, ca, 94110"
+    assert normalize_address(None, "  ") is None
+
+
+def test_repeated_lookup_uses_in_process_cache(geocoder):
+    geocoder.results["94110"] = (37.7484, -122.4156)
+
+    assert geocode_address(zip_code="94110") == (37.7484, -122.4156)
+    assert geocode_address(zip_code="94110") == (37.7484, -122.4156)
+    assert geocoder.calls == ["94110"]
+
+
+def test_result_persists_across_processes(session: Session, geocoder):
+    geocoder.results["1 Hacker Way, Menlo Park, CA"] = (37.4845, -122.1477)
+
+    assert geocode_address("1 Hacker Way", "Menlo Park", "CA", db=session) == (37.4845, -122.1477)
+    session.commit()
+
+    # A fresh process has an empty LRU but finds the row; spelling variants share it
+    clear_geocode_cache()
+    assert geocode_address("1 hacker way.", "MENLO PARK", "ca", db=session) == (37.4845, -122.1477)
+    assert len(geocoder.calls) == 1
+
+    entry = session.get(GeocodeCache, "1 hacker way, menlo park, ca")
+    assert entry.expires_at > datetime.utcnow() + timedelta(days=30)
+
+
+def test_negative_result_is_cached(session: Session, geocoder):
+    assert geocode_address(zip_code="00000", db=session) is None
+    session.commit()
+    clear_geocode_cache()
+
+    assert geocode_address(zip_code="00000", db=session) is None
+    assert geocoder.calls == ["00000"]
+
+    entry = session.get(GeocodeCache, "00000")
+    assert entry.latitude is None
+    assert entry.expires_at < datetime.utcnow() + geocoding.POSITIVE_TTL
+
+
+def test_expired_entry_is_refreshed(session: Session, geocoder):
+    session.add(GeocodeCache(
+        address_key="94110",
+        latitude=1.0,
+        longitude=2.0,
+        expires_at=datetime.utcnow() - timedelta(days=1)
+    ))
+    session.commit()
+    geocoder.results["94110"] = (37.7484, -122.4156)
+
+    assert geocode_address(zip_code="94110", db=session) == (37.7484, -122.4156)
+    session.commit()
+    assert session.get(GeocodeCache, "94110").latitude == 37.7484
+
+
+def test_errors_are_not_cached(session: Session, geocoder):
+    def failing_geocode(address):
+        raise TimeoutError("timed out")
+
+    geocoder.handler = failing_geocode
+
+    assert geocode_address(zip_code="94110", db=session) is None
+    assert geocode_address(zip_code="94110", db=session) is None
+    assert len(geocoder.calls) == 2
+    assert session.get(GeocodeCache, "94110") is None
+
+
+@pytest.fixture(name="centroids")
+def centroids_fixture(tmp_path):
+    """A small centroid file"""
+    path = str(tmp_path / "zip_centroids.bin")
+    write_zip_centroids(path, [
+        ("94110", 37.7484, -122.4156),
+        ("02139", 42.3647, -71.1042),
+        ("10001", 40.7506, -73.9972),
+        ("99501", 61.2166, -149.8761),
+    ])
+    centroids = ZipCentroids(path)
+    yield centroids
+    centroids.close()
+
+
+def test_parse_zip():
+    assert parse_zip("94110") == 94110
+    assert parse_zip(" 02139-4307 ") == 2139
+    assert parse_zip("9411") is None
+    assert parse_zip(None) is None
+
+
+def test_zip_centroid_lookup(centroids: ZipCentroids):
+    assert len(centroids) == 4
+    assert centroids.lookup("02139") == (42.3647, -71.1042)
+    assert centroids.lookup("99501-1234") == (61.2166, -149.8761)
+    assert centroids.lookup("00000") is None
+    assert centroids.lookup("10002") is None
+    assert centroids.lookup("99999") is None
+
+
+def test_zip_only_geocode_is_offline(geocoder, centroids: ZipCentroids, monkeypatch):
+    monkeypatch.setattr(geocoding, "lookup_zip", centroids.lookup)
+    geocoder.results["1 Hacker Way, 94110"] = (37.4845, -122.1477)
+
+    assert geocode_address(zip_code="94110") == (37.7484, -122.4156)
+    assert geocoder.calls == []
+
+    # Anything more specific than a ZIP still goes to the geocoder
+    assert geocode_address(street_address="1 Hacker Way", zip_code="94110") == (37.4845, -122.1477)
+    assert geocoder.calls == ["1 Hacker Way, 94110"]
+
+
+@pytest.fixture(name="person")
+def person_fixture(session: Session):
+    """A person with an address, queued for geocoding"""
+    user = User(firebase_uid="test_uid_123", name="Test User", email="test@example.com")
+    session.add(user)
+    session.commit()
+
+    person = Person(name="Alice", user_id=user.id, street_address="1 Hacker Way", city="Menlo Park")
+    session.add(person)
+    enqueue_geocode(session, [person])
+    session.commit()
+    return person
+
+
+def worker_session(engine):
+    return lambda: Session(engine)
+
+
+class TestGeocodeQueue:
+    """Background geocoding of queued address changes"""
+
+    def test_enqueue_marks_pending(self, session: Session, person: Person):
+        assert person.geocode_status == ProcessingStatus.PENDING
+        assert person.latitude is None
+        job = session.get(GeocodeJob, ("person", person.id))
+        assert job.attempts == 0
+
+        # Re-enqueueing replaces the job; removing the address cancels it
+        person.street_address = person.city = None
+        enqueue_geocode(session, [person])
+        session.commit()
+        assert person.geocode_status is None
+        assert session.get(GeocodeJob, ("person", person.id)) is None
+
+    def test_worker_writes_coordinates(self, engine, session: Session, person: Person, geocoder):
+        geocoder.results["1 Hacker Way, Menlo Park"] = (37.4845, -122.1477)
+
+        assert process_next_job(worker_session(engine)) is True
+        assert process_next_job(worker_session(engine)) is False
+
+        session.refresh(person)
+        assert (person.latitude, person.longitude) == (37.4845, -122.1477)
+        assert person.geocode_status == ProcessingStatus.COMPLETED
+        assert session.get(GeocodeJob, ("person", person.id)) is None
+
+    def test_address_not_found(self, engine, session: Session, person: Person, geocoder):
+        assert process_next_job(worker_session(engine)) is True
+
+        session.refresh(person)
+        assert person.geocode_status == ProcessingStatus.FAILED
+        assert session.get(GeocodeJob, ("person", person.id)) is None
+
+    def test_errors_are_retried(self, engine, session: Session, person: Person, geocoder):
+        def failing_geocode(address):
+            raise GeocodingError("timed out")
+
+        geocoder.handler = failing_geocode
+        assert process_next_job(worker_session(engine)) is True
+
+        session.expire_all()
+        job = session.get(GeocodeJob, ("person", person.id))
+        assert job.attempts == 1
+        assert job.last_error == "timed out"
+        assert job.next_attempt_at > datetime.utcnow()
+        assert session.get(Person, person.id).geocode_status == ProcessingStatus.PENDING
+
+        # Not due yet
+        assert process_next_job(worker_session(engine)) is False
+
+        # Give up after the last attempt
+        job.attempts = geocode_queue.MAX_ATTEMPTS - 1
+        job.next_attempt_at = datetime.utcnow()
+        session.commit()
+        assert process_next_job(worker_session(engine)) is True
+
+        session.expire_all()
+        assert session.get(GeocodeJob, ("person", person.id)).next_attempt_at is None
+        assert session.get(Person, person.id).geocode_status == ProcessingStatus.FAILED
+
+    def test_address_changed_while_geocoding(self, engine, session: Session, person: Person, geocoder):
+        def geocode_then_edit(address):
+            # The user edits the address while the request is in flight
+            with Session(engine) as other:
+                edited = other.get(Person, person.id)
+                edited.street_address = "2 Infinite Loop"
+                edited.city = "Cupertino"
+                enqueue_geocode(other, [edited])
+                other.commit()
+            return (37.4845, -122.1477)
+
+        geocoder.handler = geocode_then_edit
+        assert process_next_job(worker_session(engine)) is True
+
+        # The stale result is discarded and the new address is still queued
+        session.expire_all()
+        assert session.get(Person, person.id).latitude is None
+        assert session.get(Person, person.id).geocode_status == ProcessingStatus.PENDING
+        assert session.get(GeocodeJob, ("person", person.id)).next_attempt_at <= datetime.utcnow()
+
+    def test_tags_are_geocoded(self, engine, session: Session, person: Person, geocoder):
+        tag = Tag(name="Climbing Gym", user_id=person.user_id, city="Oakland")
+        session.add(tag)
+        enqueue_geocode(session, [tag])
+        session.commit()
+        session.delete(session.get(GeocodeJob, ("person", person.id)))
+        session.commit()
+        geocoder.results["Oakland"] = (37.8044, -122.2712)
+
+        assert process_next_job(worker_session(engine)) is True
+
+        session.refresh(tag)
+        assert (tag.latitude, tag.longitude) == (37.8044, -122.2712)
+        assert tag.geocode_status == ProcessingStatus.COMPLETED
+
+
+class TestGeocodeBackfill:
+    """Resumable geocoding of everything that has an address but no coordinates"""
+
+    @pytest.fixture(name="user")
+    def user_fixture(self, session: Session):
+        user = User(firebase_uid="test_uid_123", name="Test User", email="test@example.com")
+        session.add(user)
+        session.commit()
+
+        for index in range(5):
+            session.add(Person(name=f"Person {index}", user_id=user.id, city=f"City {index}"))
+        session.add(Person(name="No address", user_id=user.id))
+        session.add(Person(name="Located", user_id=user.id, city="Oakland", latitude=37.8, longitude=-122.3))
+        session.add(Tag(name="Climbing Gym", user_id=user.id, city="Berkeley"))
+        session.commit()
+        return user
+
+    def test_start_counts_targets(self, session: Session, user: User):
+        backfill = start_backfill(session, user.id)
+        assert backfill.total == 6
+        assert backfill.status == ProcessingStatus.PENDING
+
+        # Starting again returns the running backfill
+        assert start_backfill(session, user.id).id == backfill.id
+
+    def test_targets_are_queued_in_batches(self, engine, session: Session, user: User, geocoder, monkeypatch):
+        monkeypatch.setattr(geocode_queue, "BACKFILL_BATCH_SIZE", 2)
+        geocoder.results["City 0"] = (1.0, 1.0)
+        backfill_id = start_backfill(session, user.id).id
+
+        advance_backfills(worker_session(engine))
+        session.expire_all()
+        assert len(session.exec(select(GeocodeJob)).all()) == 2
+        assert session.get(GeocodeBackfill, backfill_id).queued == 2
+
+        # Nothing more is queued until the batch drains
+        advance_backfills(worker_session(engine))
+        assert len(session.exec(select(GeocodeJob)).all()) == 2
+
+        while True:
+            advance_backfills(worker_session(engine))
+            if not process_next_job(worker_session(engine)):
+                break
+        advance_backfills(worker_session(engine))
+
+        session.expire_all()
+        backfill = session.get(GeocodeBackfill, backfill_id)
+        assert backfill.status == ProcessingStatus.COMPLETED
+        assert (backfill.queued, backfill.succeeded, backfill.failed) == (6, 1, 5)
+        assert backfill.completed_at is not None
+        assert session.exec(select(GeocodeJob)).all() == []
+
+    def test_blank_addresses_are_not_counted(self, session: Session, user: User):
+        session.add(Person(name="Blank", user_id=user.id, city="", street_address="  "))
+        session.commit()
+        assert start_backfill(session, user.id).total == 6
+
+    def test_counts_add_up_when_edits_requeue(self, engine, session: Session, user: User, geocoder, monkeypatch):
+        monkeypatch.setattr(geocode_queue, "BACKFILL_BATCH_SIZE", 2)
+        backfill_id = start_backfill(session, user.id).id
+        advance_backfills(worker_session(engine))
+
+        # An edit takes a queued target out of the backfill
+        job = session.exec(select(GeocodeJob)).first()
+        person = session.get(Person, job.target_id)
+        person.city = "Edited"
+        enqueue_geocode(session, [person])
+        session.commit()
+        session.expire_all()
+        assert session.get(GeocodeBackfill, backfill_id).queued == 1
+
+        while True:
+            advance_backfills(worker_session(engine))
+            if not process_next_job(worker_session(engine)):
+                break
+        advance_backfills(worker_session(engine))
+
+        session.expire_all()
+        backfill = session.get(GeocodeBackfill, backfill_id)
+        assert backfill.status == ProcessingStatus.COMPLETED
+        assert backfill.queued == 5
+        assert backfill.succeeded + backfill.failed == backfill.queued
+
+    def test_resumes_from_checkpoint(self, engine, session: Session, user: User, monkeypatch):
+        monkeypatch.setattr(geocode_queue, "BACKFILL_BATCH_SIZE", 4)
+        backfill_id = start_backfill(session, user.id).id
+        advance_backfills(worker_session(engine))
+
+        # A restart loses nothing but in-flight work: drop the queue and carry on
+        session.exec(delete(GeocodeJob))
+        session.commit()
+        advance_backfills(worker_session(engine))
+
+        session.expire_all()
+        backfill = session.get(GeocodeBackfill, backfill_id)
+        queued = session.exec(select(GeocodeJob.target_type)).all()
+        assert sorted(queued) == ["person", "tag"]
+        assert backfill.queued == 6
+        assert backfill.all_queued is True
+
+    def test_nothing_to_do(self, session: Session):
+        user = User(firebase_uid="other_uid", name="Other", email="other@example.com")
+        session.add(user)
+        session.commit()
+        assert start_backfill(session, user.id).status == ProcessingStatus.COMPLETED
+
+
+@pytest.fixture(name="nominatim")
+def nominatim_fixture():
+    """Nominatim backend talking to the local stand-in server"""
+    clear_geocode_cache()
+    with FakeNominatimServer(results={"Nowhere": None, "Oakland": (37.8044, -122.2712)}) as server:
+        backend = NominatimGeocoder(base_url=server.url, timeout=0.2, min_interval=0)
+        set_geocoder(backend)
+        yield server
+        set_geocoder(None)
+    clear_geocode_cache()
+
+
+class TestGeocoderBackends:
+    """Backends, the stand-in server and the circuit breaker"""
+
+    def test_nominatim_backend(self, nominatim: FakeNominatimServer):
+        assert geocode_address(city="Oakland") == (37.8044, -122.2712)
+        assert geocode_address(city="Nowhere") is None
+        # Unlisted addresses get a stable made-up point
+        assert geocode_address(city="Springfield") == nominatim.lookup("Springfield")
+        assert nominatim.requests == 3
+
+    def test_server_errors_raise(self, nominatim: FakeNominatimServer):
+        nominatim.error_rate = 1.0
+        with pytest.raises(GeocodingError):
+            geocode_address(city="Oakland", raise_errors=True)
+        assert geocode_address(city="Oakland") is None
+
+    def test_timeouts_open_the_circuit(self, nominatim: FakeNominatimServer, monkeypatch):
+        monkeypatch.setattr(geocoders.breaker, "failure_threshold", 2)
+        nominatim.latency = 0.5
+
+        for city in ["A", "B"]:
+            with pytest.raises(GeocodingError):
+                geocode_address(city=city, raise_errors=True)
+
+        # Open: fail fast without a request
+        nominatim.latency = 0
+        with pytest.raises(GeocoderUnavailable):
+            geocode_address(city="Oakland", raise_errors=True)
+        assert nominatim.requests == 2
+
+    def test_offline_backend(self, centroids: ZipCentroids, monkeypatch):
+        monkeypatch.setattr(geocoders, "lookup_zip", centroids.lookup)
+        clear_geocode_cache()
+        set_geocoder(OfflineGeocoder())
+        try:
+            assert geocode_address(street_address="1 Hacker Way", zip_code="94110") == (37.7484, -122.4156)
+            assert geocode_address(city="Oakland") is None
+        finally:
+            set_geocoder(None)
+            clear_geocode_cache()
+
+    def test_circuit_breaker_half_open(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(GeocoderUnavailable):
+            breaker.before_call()
+        assert breaker.retry_after() == 30
+
+        # After the timeout one trial goes through; concurrent calls still fail fast
+        now[0] = 30.0
+        breaker.before_call()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(GeocoderUnavailable):
+            breaker.before_call()
+
+        # A failed trial reopens the circuit, a successful one closes it
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        now[0] = 60.0
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.retry_after() == 0
+
+    def test_backend_setup_failure_does_not_take_trial_slot(self, monkeypatch):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 30.0
+        monkeypatch.setattr(geocoders, "breaker", breaker)
+        monkeypatch.setattr(geocoders, "GEOCODER_BACKEND", "unknown")
+
+        with pytest.raises(ValueError):
+            geocoders.lookup(None, "Oakland", None, None)
+        # The half-open trial is still available once the backend can be created
+        breaker.before_call()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    def test_geocode_is_abstract(self):
+        class Incomplete(Geocoder):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_rate_limit_shared_through_redis(self, monkeypatch):
+        class FakeRedis:
+            def __init__(self):
+                self.held_until = 0.0
+                self.sets = 0
+
+            def set(self, key, value, nx, px):
+                if time.monotonic() < self.held_until:
+                    return False
+                self.held_until = time.monotonic() + px / 1000
+                self.sets += 1
+                return True
+
+            def pttl(self, key):
+                return int((self.held_until - time.monotonic()) * 1000)
+
+        redis = FakeRedis()
+        monkeypatch.setattr(geocoders, "get_redis", lambda: redis)
+
+        started = time.monotonic()
+        for _ in range(3):
+            geocoders._wait_for_rate_limit(0.05)
+        assert redis.sets == 3
+        assert time.monotonic() - started >= 0.1
+
+    def test_queue_waits_while_circuit_is_open(self, engine, session: Session, person: Person, geocoder):
+        def failing_geocode(address):
+            raise GeocodingError("timed out")
+
+        geocoder.handler = failing_geocode
+        for index in range(geocoders.FAILURE_THRESHOLD):
+            with pytest.raises(GeocodingError):
+                geocode_address(city=f"City {index}", raise_errors=True)
+
+        # Jobs are left alone rather than burning their attempts
+        assert process_next_job(worker_session(engine)) is False
+        session.expire_all()
+        job = session.get(GeocodeJob, ("person", person.id))
+        assert job.attempts == 0
+        assert session.get(Person, person.id).geocode_status == ProcessingStatus.PENDING
@@ -0,0 +1,368 @@
+"""
+Tests for stored person locations and the map-data endpoint
+"""
+import random
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, create_engine, SQLModel, select
+from sqlmodel.pool import StaticPool
+
+from main import app
+from database import get_db
+from models import User, Person, Tag, PersonTag
+from routers.auth import get_current_user_id, get_current_user
+from services import geohash, location, nearby
+
+
+ZIP_CENTROIDS = {"94110": (37.7484, -122.4156)}
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    """Create an in-memory SQLite engine"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine, monkeypatch):
+    """Create a test database session with a fake ZIP centroid dataset"""
+    monkeypatch.setattr(location, "lookup_zip", ZIP_CENTROIDS.get)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(name="test_user")
+def test_user_fixture(session: Session):
+    """Create a test user"""
+    user = User(
+        firebase_uid="test_uid_123",
+        name="Test User",
+        email="test@example.com"
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+@pytest.fixture(name="client")
+def client_fixture(session: Session, test_user: User):
+    """Create a test client with overridden dependencies"""
+    def get_db_override():
+        yield session
+
+    def get_current_user_override():
+        return test_user
+
+    def get_current_user_id_override():
+        return test_user.id
+
+    app.dependency_overrides[get_db] = get_db_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    app.dependency_overrides[get_current_user_id] = get_current_user_id_override
+
+    client = TestClient(app)
+    yield client
+    app.dependency_overrides.clear()
+
+
+def resolved(session: Session, person: Person):
+    session.expire_all()
+    person = session.get(Person, person.id)
+    return (person.resolved_lat, person.resolved_lng, person.location_source)
+
+
+class TestResolvedLocation:
+    """The location hierarchy is stored per person and kept current on write"""
+
+    def test_personal_coordinates(self, session: Session, test_user: User):
+        person = Person(name="Alice", user_id=test_user.id, city="Oakland", latitude=37.8, longitude=-122.27)
+        session.add(person)
+        session.commit()
+        assert resolved(session, person) == (37.8, -122.27, "personal")
+
+        person.latitude = person.longitude = None
+        session.commit()
+        assert resolved(session, person) == (None, None, None)
+
+    def test_tag_then_zip_fallback(self, session: Session, test_user: User):
+        person = Person(name="Bob", user_id=test_user.id, zip="94110")
+        gym = Tag(name="Climbing Gym", user_id=test_user.id)
+        session.add_all([person, gym])
+        session.commit()
+        assert resolved(session, person) == (37.7484, -122.4156, "zip:94110")
+
+        # Linking the tag only matters once the tag has coordinates
+        session.add(PersonTag(person_id=person.id, tag_id=gym.id))
+        session.commit()
+        assert resolved(session, person)[2] == "zip:94110"
+
+        gym.latitude, gym.longitude = 37.87, -122.3
+        session.commit()
+        assert resolved(session, person) == (37.87, -122.3, "tag:Climbing Gym")
+
+        gym.name = "Bouldering Gym"
+        session.commit()
+        assert resolved(session, person)[2] == "tag:Bouldering Gym"
+
+        session.delete(session.get(PersonTag, (person.id, gym.id)))
+        session.commit()
+        assert resolved(session, person) == (37.7484, -122.4156, "zip:94110")
+
+    def test_zip_geocode_does_not_outrank_tags(self, session: Session, test_user: User):
+        gym = Tag(name="Gym", user_id=test_user.id, latitude=40.0, longitude=-75.0)
+        person = Person(name="Cara", user_id=test_user.id, zip="19104", latitude=39.95, longitude=-75.19)
+        session.add_all([gym, person])
+        session.commit()
+        assert resolved(session, person) == (39.95, -75.19, "zip:19104")
+
+        session.add(PersonTag(person_id=person.id, tag_id=gym.id))
+        session.commit()
+        assert resolved(session, person) == (40.0, -75.0, "tag:Gym")
+
+
+class TestMapData:
+    """map-data reads stored locations with a single query"""
+
+    def test_map_data(self, client: TestClient, session: Session, engine, test_user: User):
+        session.add_all([
+            Person(name="Alice", user_id=test_user.id, city="Oakland", latitude=37.8, longitude=-122.27),
+            Person(name="Bob", user_id=test_user.id, zip="94110"),
+            Person(name="Nowhere", user_id=test_user.id),
+        ])
+        session.commit()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        response = client.get("/api/people/map-data")
+        event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        data = sorted(response.json(), key=lambda p: p["name"])
+        assert [(p["name"], p["location_source"]) for p in data] == [
+            ("Alice", "personal"), ("Bob", "zip:94110")
+        ]
+        assert data[1]["latitude"] == 37.7484
+        assert len([s for s in statements if "FROM people" in s]) == 1
+
+
+@pytest.fixture(name="located_people")
+def located_people_fixture(session: Session, test_user: User):
+    """People in San Francisco, Oakland, New York and Fiji"""
+    places = [
+        ("Alice", 37.7749, -122.4194),
+        ("Bob", 37.7790, -122.4180),
+        ("Carol", 37.7700, -122.4300),
+        ("Dave", 37.8044, -122.2712),
+        ("Erin", 40.7128, -74.0060),
+        ("Finn", -17.7134, 178.0650),
+    ]
+    for name, latitude, longitude in places:
+        session.add(Person(
+            name=name, user_id=test_user.id, city="Somewhere", latitude=latitude, longitude=longitude
+        ))
+    session.commit()
+
+
+class TestMapClusters:
+    """map-data clusters nearby people by zoom level and filters by viewport"""
+
+    def test_low_zoom_clusters(self, client: TestClient, located_people):
+        response = client.get("/api/people/map-data?zoom=4")
+        assert response.status_code == 200
+
+        markers = sorted(response.json(), key=lambda m: m.get("count", 1), reverse=True)
+        bay_area = markers[0]
+        assert bay_area["type"] == "cluster"
+        assert bay_area["count"] == 4
+        assert bay_area["names"] == ["Alice", "Bob", "Carol"]
+        assert 37.77 < bay_area["latitude"] < 37.79
+        assert [m["name"] for m in markers[1:]] == ["Erin", "Finn"]
+        assert all(m["type"] == "point" for m in markers[1:])
+
+    def test_city_zoom_splits_clusters(self, client: TestClient, located_people):
+        markers = client.get("/api/people/map-data?zoom=10").json()
+        counts = sorted(m.get("count", 1) for m in markers)
+        # San Francisco stays together, Oakland separates from it
+        assert counts == [1, 1, 1, 3]
+
+    def test_street_zoom_returns_points(self, client: TestClient, located_people):
+        markers = client.get("/api/people/map-data?zoom=17&bbox=-122.45,37.76,-122.40,37.79").json()
+        assert sorted(m["name"] for m in markers) == ["Alice", "Bob", "Carol"]
+        assert all(m["type"] == "point" for m in markers)
+
+    def test_bbox_filter(self, client: TestClient, located_people):
+        markers = client.get("/api/people/map-data?bbox=-123,37,-122,38").json()
+        assert sorted(m["name"] for m in markers) == ["Alice", "Bob", "Carol", "Dave"]
+
+        # A viewport across the antimeridian
+        markers = client.get("/api/people/map-data?bbox=170,-20,-170,0").json()
+        assert [m["name"] for m in markers] == ["Finn"]
+
+    def test_invalid_bbox(self, client: TestClient):
+        assert client.get("/api/people/map-data?bbox=1,2,3").status_code == 400
+        assert client.get("/api/people/map-data?bbox=0,50,10,40").status_code == 400
+        assert client.get("/api/people/map-data?zoom=30").status_code == 422
+
+
+class TestSpatialIndex:
+    """Viewport queries are answered from the (userId, geohash) index"""
+
+    def test_geohash_encoding(self):
+        assert geohash.encode(37.7749, -122.4194, 6) == "9q8yyk"
+        west, south, east, north = geohash.decode_bbox("9q8yyk")
+        assert west <= -122.4194 <= east and south <= 37.7749 <= north
+        assert len(geohash.neighbors("9q8yyk")) == 9
+
+    def test_cover_contains_box(self):
+        cells = geohash.cover((-122.45, 37.76, -122.40, 37.79))
+        assert 0 < len(cells) <= geohash.MAX_COVER_CELLS
+        for latitude, longitude in [(37.76, -122.45), (37.79, -122.40), (37.775, -122.42)]:
+            assert any(geohash.encode(latitude, longitude).startswith(cell) for cell in cells)
+        assert geohash.cover((-180, -90, 180, 90)) is None
+
+    def test_geohash_maintained(self, session: Session, test_user: User, located_people):
+        alice = session.exec(select(Person).where(Person.name == "Alice")).one()
+        assert alice.geohash == geohash.encode(37.7749, -122.4194)
+
+        alice.latitude, alice.longitude = 40.7128, -74.0060
+        session.commit()
+        assert alice.geohash == geohash.encode(40.7128, -74.0060)
+
+    def test_viewport_uses_index(self, client: TestClient, engine, located_people):
+        plans = []
+
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            if "FROM people" in statement and "geohash" in statement and not statement.startswith("EXPLAIN"):
+                plans.extend(conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all())
+
+        event.listen(engine, "before_cursor_execute", explain)
+        response = client.get("/api/people/map-data?bbox=-122.45,37.76,-122.40,37.79")
+        event.remove(engine, "before_cursor_execute", explain)
+
+        assert sorted(m["name"] for m in response.json()) == ["Alice", "Bob", "Carol"]
+        assert any("ix_people_userId_geohash" in str(row) for row in plans)
+
+
+class TestNearby:
+    """Radius queries ordered by distance"""
+
+    def test_people_nearby(self, client: TestClient, located_people):
+        response = client.get("/api/people/nearby?lat=37.7749&lng=-122.4194&radius_km=5")
+        assert response.status_code == 200
+
+        results = response.json()
+        assert [r["person"]["name"] for r in results] == ["Alice", "Bob", "Carol"]
+        assert results[0]["distance_km"] == 0
+        assert results[1]["distance_km"] < results[2]["distance_km"] < 5
+
+        results = client.get("/api/people/nearby?lat=37.7749&lng=-122.4194&radius_km=20&limit=2").json()
+        assert [r["person"]["name"] for r in results] == ["Alice", "Bob"]
+
+        names = [r["person"]["name"] for r in client.get(
+            "/api/people/nearby?lat=37.7749&lng=-122.4194&radius_km=20"
+        ).json()]
+        assert names[-1] == "Dave"
+
+    def test_nearby_across_antimeridian(self, client: TestClient, located_people):
+        results = client.get("/api/people/nearby?lat=-17.7&lng=-179.9&radius_km=300").json()
+        assert [r["person"]["name"] for r in results] == ["Finn"]
+
+    def test_tag_nearby(self, client: TestClient, session: Session, test_user: User, located_people):
+        gym = Tag(name="Gym", user_id=test_user.id, latitude=37.8044, longitude=-122.2712)
+        nowhere = Tag(name="Online", user_id=test_user.id)
+        session.add_all([gym, nowhere])
+        session.commit()
+
+        results = client.get(f"/api/tags/{gym.id}/nearby?radius_km=2").json()
+        assert [r["person"]["name"] for r in results] == ["Dave"]
+        assert client.get(f"/api/tags/{nowhere.id}/nearby").status_code == 400
+
+    def test_cells_contain_circle(self):
+        random.seed(7)
+        for _ in range(200):
+            latitude, longitude = random.uniform(-80, 80), random.uniform(-180, 180)
+            radius_km = random.choice([0.5, 5, 50, 500])
+            cells = nearby.search_cells(latitude, longitude, radius_km)
+            # Points scattered up to the radius in every direction
+            bearings = np.radians([random.uniform(0, 360) for _ in range(50)])
+            offsets = np.array([random.uniform(0, radius_km) for _ in range(50)]) / nearby.KM_PER_DEGREE
+            latitudes = latitude + offsets * np.cos(bearings)
+            longitudes = (longitude + offsets * np.sin(bearings) / np.cos(np.radians(latitudes)) + 180) % 360 - 180
+            distances = nearby.haversine_km(latitude, longitude, latitudes, longitudes)
+            for lat, lng, distance in zip(latitudes, longitudes, distances):
+                if distance <= radius_km and cells:
+                    assert any(geohash.encode(lat, lng).startswith(cell) for cell in cells)
+
+
+class TestMapCache:
+    """map-data is cached per user until something on the map changes"""
+
+    def fetch(self, client: TestClient, engine, **headers):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        response = client.get("/api/people/map-data?zoom=10", headers=headers)
+        event.remove(engine, "before_cursor_execute", listener)
+        return response, len([s for s in statements if "FROM people" in s])
+
+    def test_repeat_loads_hit_the_cache(self, client: TestClient, engine, located_people):
+        first, queries = self.fetch(client, engine)
+        assert queries == 1
+
+        second, queries = self.fetch(client, engine)
+        assert queries == 0
+        assert second.json() == first.json()
+        assert second.headers["etag"] == first.headers["etag"]
+
+        not_modified, _ = self.fetch(client, engine, **{"If-None-Match": first.headers["etag"]})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+    def test_map_changes_invalidate(self, client: TestClient, session: Session, engine, test_user: User, located_people):
+        etags = [self.fetch(client, engine)[0].headers["etag"]]
+        alice = session.exec(select(Person).where(Person.name == "Alice")).one()
+
+        # Fields that are not on the map keep the cache
+        alice.mnemonic = "Loves tea"
+        session.add(alice)
+        session.commit()
+        assert self.fetch(client, engine)[0].headers["etag"] == etags[-1]
+
+        alice.latitude = 37.70
+        session.add(alice)
+        session.commit()
+        response, queries = self.fetch(client, engine)
+        assert queries == 1
+        etags.append(response.headers["etag"])
+
+        gym = Tag(name="Gym", user_id=test_user.id, latitude=37.8, longitude=-122.27)
+        session.add(gym)
+        session.commit()
+        bob = session.exec(select(Person).where(Person.name == "Bob")).one()
+        session.add(PersonTag(person_id=bob.id, tag_id=gym.id))
+        session.commit()
+        etags.append(self.fetch(client, engine)[0].headers["etag"])
+
+        gym.latitude = 37.9
+        session.add(gym)
+        session.commit()
+        etags.append(self.fetch(client, engine)[0].headers["etag"])
+
+        session.delete(alice)
+        session.commit()
+        response = self.fetch(client, engine)[0]
+        etags.append(response.headers["etag"])
+
+        assert len(set(etags)) == len(etags)
+        assert sum(marker.get("count", 1) for marker in response.json()) == 5
@@ -0,0 +1,445 @@
+"""
+Tests for the notebook endpoints (pagination, previews, single entries)
+"""
+import pytest
+from fastapi.testclient import TestClient
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, create_engine, SQLModel, select
+from sqlmodel.pool import StaticPool
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from main import app
+from database import get_db
+from models import User, Person, NotebookEntry, NotebookSegment, NotebookSearchDocument
+from routers.auth import get_current_user_id, get_current_user
+from ai.extractor import PersonManager
+from services.notebook import append_to_notebook, compact_notebook_segments, get_or_create_notebook_entry, read_entries
+from services.pagination import NEXT_CURSOR_HEADER
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    """Create an in-memory SQLite engine"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    """Create a test database session with in-memory SQLite"""
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(name="test_user")
+def test_user_fixture(session: Session):
+    """Create a test user"""
+    user = User(
+        firebase_uid="test_uid_123",
+        name="Test User",
+        email="test@example.com"
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+@pytest.fixture(name="client")
+def client_fixture(session: Session, test_user: User):
+    """Create a test client with overridden dependencies"""
+    def get_db_override():
+        yield session
+
+    def get_current_user_override():
+        return test_user
+
+    def get_current_user_id_override():
+        return test_user.id
+
+    app.dependency_overrides[get_db] = get_db_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    app.dependency_overrides[get_current_user_id] = get_current_user_id_override
+
+    client = TestClient(app)
+    yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="person")
+def person_fixture(session: Session, test_user: User):
+    """Create a person with 25 daily notebook entries, the newest one long"""
+    person = Person(name="Alice", user_id=test_user.id)
+    session.add(person)
+    session.commit()
+
+    start = datetime(2024, 1, 1, 9)
+    for day in range(25):
+        created_at = start + timedelta(days=day)
+        content = "x" * 5000 if day == 24 else f"Day {day}"
+        session.add(NotebookEntry(
+            person_id=person.id,
+            user_id=test_user.id,
+            entry_date=created_at.strftime("%Y-%m-%d"),
+            content=content,
+            created_at=created_at,
+            updated_at=created_at
+        ))
+    session.commit()
+    session.refresh(person)
+    return person
+
+
+class TestNotebookPagination:
+    """Cursor pagination over (created_at, id), newest first"""
+
+    def test_pages_cover_every_entry_once(self, client: TestClient, person: Person):
+        dates, cursor = [], None
+        while True:
+            url = f"/api/people/{person.id}/notebook?limit=10"
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            assert response.status_code == 200
+            dates.extend(entry["entry_date"] for entry in response.json())
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+
+        assert len(dates) == 25
+        assert dates == sorted(dates, reverse=True)
+        assert dates[0] == "2024-01-25"
+
+    def test_same_timestamp_entries_are_not_skipped(self, client: TestClient, session: Session, test_user: User, person: Person):
+        moment = datetime(2023, 6, 1)
+        for i in range(5):
+            session.add(NotebookEntry(
+                person_id=person.id, user_id=test_user.id, entry_date=f"2023-05-0{i + 1}",
+                content=f"Same time {i}", created_at=moment, updated_at=moment
+            ))
+        session.commit()
+
+        seen, cursor = [], None
+        while True:
+            url = f"/api/people/{person.id}/notebook?limit=3"
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            seen.extend(entry["id"] for entry in response.json())
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 30
+
+    def test_uses_index(self, client: TestClient, engine, person: Person):
+        plans = []
+
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            if 'FROM "notebookEntries"' in statement and not statement.startswith("EXPLAIN"):
+                plans.extend(conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all())
+
+        event.listen(engine, "before_cursor_execute", explain)
+        client.get(f"/api/people/{person.id}/notebook?limit=5")
+        event.remove(engine, "before_cursor_execute", explain)
+
+        assert any("ix_notebookEntries_personId_createdAt_id" in str(row) for row in plans)
+        assert not any("TEMP B-TREE" in str(row) for row in plans)
+
+    def test_no_limit_returns_every_entry(self, client: TestClient, session: Session, test_user: User, person: Person):
+        for i in range(120):
+            day = datetime(2022, 1, 1) + timedelta(days=i)
+            session.add(NotebookEntry(
+                person_id=person.id, user_id=test_user.id, entry_date=day.strftime("%Y-%m-%d"),
+                content="Older", created_at=day, updated_at=day
+            ))
+        session.commit()
+
+        response = client.get(f"/api/people/{person.id}/notebook")
+        assert len(response.json()) == 145
+        assert NEXT_CURSOR_HEADER not in response.headers
+
+    def test_unknown_person(self, client: TestClient):
+        response = client.get("/api/people/00000000-0000-0000-0000-000000000000/notebook")
+        assert response.status_code == 404
+
+
+class TestNotebookPreviews:
+    """Previews cut in SQL; full content only from the single-entry endpoint"""
+
+    def test_preview_truncates_long_entries(self, client: TestClient, engine, person: Person):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        response = client.get(f"/api/people/{person.id}/notebook?preview=80&limit=2")
+        event.remove(engine, "before_cursor_execute", capture)
+
+        newest, older = response.json()
+        assert newest["content"] == "x" * 80
+        assert newest["truncated"] is True
+        assert older["content"] == "Day 23"
+        assert older["truncated"] is False
+        assert any("substr" in statement.lower() for statement in statements)
+
+    def test_full_listing_is_not_truncated(self, client: TestClient, person: Person):
+        newest = client.get(f"/api/people/{person.id}/notebook?limit=1").json()[0]
+        assert len(newest["content"]) == 5000
+        assert newest["truncated"] is False
+
+    def test_single_entry_has_full_content(self, client: TestClient, session: Session, test_user: User, person: Person):
+        newest = client.get(f"/api/people/{person.id}/notebook?preview=10&limit=1").json()[0]
+
+        response = client.get(f"/api/people/{person.id}/notebook/{newest['id']}")
+        assert response.status_code == 200
+        assert response.json()["content"] == "x" * 5000
+
+        other = Person(name="Bob", user_id=test_user.id)
+        session.add(other)
+        session.commit()
+        assert client.get(f"/api/people/{other.id}/notebook/{newest['id']}").status_code == 404
+
+
+class TestNotebookUpsert:
+    """One entry per person per day; appends are a single race-free statement"""
+
+    def test_post_appends_to_existing_day(self, client: TestClient, session: Session, person: Person):
+        url = f"/api/people/{person.id}/notebook"
+        first = client.post(url, json={"entry_date": "2024-06-01", "content": "Lunch downtown"}).json()
+        second = client.post(url, json={"entry_date": "2024-06-01", "content": "Mentioned a new job"}).json()
+
+        assert second["id"] == first["id"]
+        assert second["content"] == "Lunch downtown\nMentioned a new job"
+        entries = session.exec(
+            select(NotebookEntry).where(NotebookEntry.person_id == person.id, NotebookEntry.entry_date == "2024-06-01")
+        ).all()
+        assert len(entries) == 1
+
+    def test_journal_entries_share_the_day(self, session: Session, person: Person):
+        manager = PersonManager(session)
+        today = manager.get_or_create_today_entry(person.id, person.user_id)
+        assert today.content == ""
+
+        manager.add_journal_entry(person.id, "Went hiking", today.entry_date)
+        entry = manager.add_journal_entry(person.id, "Has a new puppy", today.entry_date)
+
+        assert entry.id == today.id
+        assert entry.content == "Went hiking\nHas a new puppy"
+        assert manager.get_or_create_today_entry(person.id, person.user_id).id == today.id
+
+    def test_get_or_create_is_one_statement(self, engine, session: Session, person: Person):
+        statements = []
+        capture = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        entry = get_or_create_notebook_entry(session, person.id, person.user_id, "2024-06-01")
+        session.commit()
+        event.remove(engine, "before_cursor_execute", capture)
+
+        assert len(statements) == 1
+        assert statements[0].startswith('INSERT INTO "notebookEntries"')
+        assert get_or_create_notebook_entry(session, person.id, person.user_id, "2024-06-01").id == entry.id
+
+    def test_duplicate_day_rejected(self, session: Session, person: Person):
+        session.add(NotebookEntry(
+            person_id=person.id, user_id=person.user_id, entry_date="2024-01-01", content="Duplicate"
+        ))
+        with pytest.raises(IntegrityError):
+            session.commit()
+
+    def test_concurrent_appends_are_not_lost(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'notebook.db'}", connect_args={"timeout": 30})
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            user = User(firebase_uid="uid", name="User", email="user@example.com")
+            session.add(user)
+            session.commit()
+            person = Person(name="Alice", user_id=user.id)
+            session.add(person)
+            session.commit()
+            person_id, user_id = person.id, user.id
+
+        def append(worker):
+            for i in range(5):
+                with Session(engine) as session:
+                    append_to_notebook(session, person_id, user_id, "2024-06-01", f"note {worker}-{i}")
+                    session.commit()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(append, range(8)))
+
+        with Session(engine) as session:
+            entries = read_entries(session, session.exec(select(NotebookEntry)).all())
+        assert len(entries) == 1
+        assert sorted(entries[0].content.split("\n")) == sorted(f"note {w}-{i}" for w in range(8) for i in range(5))
+
+
+class TestNotebookSegments:
+    """Appends are immutable segment rows, materialized on read and compacted later"""
+
+    def append(self, client: TestClient, person: Person, content: str):
+        return client.post(f"/api/people/{person.id}/notebook", json={"entry_date": "2024-06-01", "content": content})
+
+    def segments(self, session: Session):
+        return session.exec(select(NotebookSegment).order_by(NotebookSegment.seq)).all()
+
+    def test_appends_insert_segments(self, client: TestClient, session: Session, person: Person):
+        for content in ["Coffee", "Talked about moving", "Sister is visiting"]:
+            self.append(client, person, content)
+
+        entry = session.exec(select(NotebookEntry).where(NotebookEntry.entry_date == "2024-06-01")).one()
+        session.refresh(entry)
+        assert entry.content == ""
+        assert [(segment.seq, segment.content) for segment in self.segments(session)] == [
+            (1, "Coffee"), (2, "Talked about moving"), (3, "Sister is visiting")
+        ]
+
+        response = client.get(f"/api/people/{person.id}/notebook/{entry.id}")
+        assert response.json()["content"] == "Coffee\nTalked about moving\nSister is visiting"
+
+        listed = client.get(f"/api/people/{person.id}/notebook?preview=10&limit=30").json()
+        day = next(item for item in listed if item["id"] == str(entry.id))
+        assert day["content"] == "Coffee\nTal"
+        assert day["truncated"] is True
+
+    def test_compaction_folds_quiet_days(self, client: TestClient, engine, session: Session, person: Person):
+        self.append(client, person, "First")
+        self.append(client, person, "Second")
+        factory = lambda: Session(engine)
+
+        # The day is still active
+        assert compact_notebook_segments(factory) == 0
+        assert len(self.segments(session)) == 2
+
+        assert compact_notebook_segments(factory, older_than=timedelta(0)) == 1
+        assert self.segments(session) == []
+        entry = session.exec(select(NotebookEntry).where(NotebookEntry.entry_date == "2024-06-01")).one()
+        session.refresh(entry)
+        assert entry.content == "First\nSecond"
+
+        # Appends after compaction continue as segments on the compacted content
+        body = self.append(client, person, "Third").json()
+        assert body["content"] == "First\nSecond\nThird"
+
+    def test_update_replaces_segments(self, client: TestClient, session: Session, person: Person):
+        entry_id = self.append(client, person, "Typo").json()["id"]
+        self.append(client, person, "More")
+
+        response = client.put(f"/api/people/{person.id}/notebook/{entry_id}", json={"content": "Fixed"})
+        assert response.json()["content"] == "Fixed"
+        assert self.segments(session) == []
+
+    def test_append_only_indexes_the_segment(self, client: TestClient, engine, session: Session, person: Person):
+        entry_id = self.append(client, person, "Coffee").json()["id"]
+        self.append(client, person, "Talked about moving")
+        day = select(NotebookSearchDocument).where(NotebookSearchDocument.entry_id == UUID(entry_id))
+
+        statements = []
+        capture = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        self.append(client, person, "Sister is visiting")
+        event.remove(engine, "before_cursor_execute", capture)
+
+        search_statements = [statement for statement in statements if "Search" in statement]
+        assert len(search_statements) == 1
+        assert search_statements[0].startswith('INSERT INTO "notebookSearch"')
+        documents = session.exec(day.order_by(NotebookSearchDocument.seq)).all()
+        assert [(document.seq, document.content) for document in documents] == [
+            (1, "Coffee"), (2, "Talked about moving"), (3, "Sister is visiting")
+        ]
+
+        # Compaction merges them into the entry's document
+        assert compact_notebook_segments(lambda: Session(engine), older_than=timedelta(0)) == 1
+        session.expire_all()
+        documents = session.exec(day).all()
+        assert [(document.seq, document.content) for document in documents] == [
+            (0, "Coffee\nTalked about moving\nSister is visiting")
+        ]
+
+    def test_segments_are_searchable_and_listed(self, client: TestClient, person: Person):
+        self.append(client, person, "Training for a triathlon")
+
+        results = client.get("/api/people/search?query=triathlon").json()
+        assert [result["person"]["name"] for result in results] == ["Alice"]
+
+        listed = client.get("/api/people/").json()
+        assert listed[0]["latest_notebook_entry_content"] == "Training for a triathlon"
+
+
+class TestNotebookTimeline:
+    """User-wide journal feed across all people, newest day first"""
+
+    @pytest.fixture(name="journal")
+    def journal_fixture(self, session: Session, test_user: User):
+        """Three people with a week of entries each, and another user's entry"""
+        people = [Person(name=name, user_id=test_user.id) for name in ["Alice", "Bob", "Carol"]]
+        other_user = User(firebase_uid="other_uid", name="Other", email="other@example.com")
+        session.add_all(people + [other_user])
+        session.commit()
+
+        for day in range(1, 8):
+            for i, person in enumerate(people):
+                created_at = datetime(2024, 6, day, 9 + i)
+                session.add(NotebookEntry(
+                    person_id=person.id, user_id=test_user.id, entry_date=f"2024-06-0{day}",
+                    content=f"{person.name} on day {day}", created_at=created_at, updated_at=created_at
+                ))
+        stranger = Person(name="Stranger", user_id=other_user.id)
+        session.add(stranger)
+        session.commit()
+        session.add(NotebookEntry(person_id=stranger.id, user_id=other_user.id, entry_date="2024-06-07", content="Not mine"))
+        session.commit()
+        return people
+
+    def test_newest_first_with_names(self, client: TestClient, journal):
+        response = client.get("/api/notebook/timeline?limit=4")
+        assert response.status_code == 200
+        assert [(item["entry_date"], item["person_name"]) for item in response.json()] == [
+            ("2024-06-07", "Carol"), ("2024-06-07", "Bob"), ("2024-06-07", "Alice"), ("2024-06-06", "Carol")
+        ]
+
+    def test_pages_cover_the_users_entries(self, client: TestClient, journal):
+        seen, cursor = [], None
+        while True:
+            url = "/api/notebook/timeline?limit=5"
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            seen.extend(response.json())
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+
+        assert len(seen) == len({item["id"] for item in seen}) == 21
+        assert "Stranger" not in {item["person_name"] for item in seen}
+        keys = [(item["entry_date"], item["created_at"]) for item in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_before_and_preview(self, client: TestClient, journal):
+        items = client.get("/api/notebook/timeline?before=2024-06-03&preview=5").json()
+        assert {item["entry_date"] for item in items} == {"2024-06-01", "2024-06-02"}
+        assert items[0]["content"] == "Carol"
+        assert items[0]["truncated"] is True
+
+    def test_includes_appended_segments(self, client: TestClient, journal):
+        alice = journal[0]
+        client.post(f"/api/people/{alice.id}/notebook", json={"entry_date": "2024-06-08", "content": "Housewarming"})
+        newest = client.get("/api/notebook/timeline?limit=1").json()[0]
+        assert (newest["person_name"], newest["content"]) == ("Alice", "Housewarming")
+
+    def test_uses_index(self, client: TestClient, engine, journal):
+        plans = []
+
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            if 'FROM "notebookEntries"' in statement and not statement.startswith("EXPLAIN"):
+                plans.extend(conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all())
+
+        event.listen(engine, "before_cursor_execute", explain)
+        first = client.get("/api/notebook/timeline?limit=5")
+        client.get(f"/api/notebook/timeline?limit=5&cursor={first.headers[NEXT_CURSOR_HEADER]}")
+        event.remove(engine, "before_cursor_execute", explain)
+
+        assert any("ix_notebookEntries_userId_entry_date" in str(row) for row in plans)
+        assert not any("TEMP B-TREE" in str(row) for row in plans)
@@ -0,0 +1,688 @@
+"""
+Tests for the people list endpoints (enrichment, pagination, filtering)
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, create_engine, SQLModel, select
+from sqlmodel.pool import StaticPool
+from datetime import date, datetime, timedelta
+
+from main import app
+from database import get_db
+from models import User, Person, Tag, PersonTag, NotebookEntry, GeocodeJob, GeocodeBackfill, DecayCurve, HealthSnapshot, PersonHealthSnapshot
+from routers.auth import get_current_user_id, get_current_user
+from services import geocoders
+from services.health_snapshots import snapshot_user, take_daily_snapshots
+from services.health_schedule import score_expression
+from services.health_score import (
+    FAR_FUTURE, calculate_health_score, calculate_health_scores, get_health_status, status_transitions
+)
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    """Create an in-memory SQLite engine"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    """Create a test database session with in-memory SQLite"""
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(name="test_user")
+def test_user_fixture(session: Session):
+    """Create a test user"""
+    user = User(
+        firebase_uid="test_uid_123",
+        name="Test User",
+        email="test@example.com"
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+@pytest.fixture(name="client")
+def client_fixture(session: Session, test_user: User):
+    """Create a test client with overridden dependencies"""
+    def get_db_override():
+        yield session
+
+    def get_current_user_override():
+        return test_user
+
+    def get_current_user_id_override():
+        return test_user.id
+
+    app.dependency_overrides[get_db] = get_db_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    app.dependency_overrides[get_current_user_id] = get_current_user_id_override
+
+    client = TestClient(app)
+    yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="test_people")
+def test_people_fixture(session: Session, test_user: User):
+    """Create people with tags and notebook entries"""
+    climbing = Tag(name="Climbing", user_id=test_user.id)
+    work = Tag(name="Work", user_id=test_user.id)
+    session.add(climbing)
+    session.add(work)
+
+    people = []
+    for i, name in enumerate(["Alice", "Bob", "Charlie", "Dana", "Eve"]):
+        person = Person(
+            name=name,
+            user_id=test_user.id,
+            last_contact_date=datetime.utcnow() - timedelta(days=i * 20)
+        )
+        session.add(person)
+        people.append(person)
+    session.commit()
+
+    for i, person in enumerate(people):
+        session.add(PersonTag(person_id=person.id, tag_id=climbing.id))
+        if i % 2 == 0:
+            session.add(PersonTag(person_id=person.id, tag_id=work.id))
+        session.add(NotebookEntry(
+            person_id=person.id,
+            user_id=test_user.id,
+            entry_date="2024-01-01",
+            content=f"Old note about {person.name}",
+            created_at=datetime(2024, 1, 1)
+        ))
+        session.add(NotebookEntry(
+            person_id=person.id,
+            user_id=test_user.id,
+            entry_date="2024-02-01",
+            content=f"Latest note about {person.name}",
+            created_at=datetime(2024, 2, 1)
+        ))
+    session.commit()
+    for person in people:
+        session.refresh(person)
+    return people
+
+
+def count_selects(engine):
+    """Attach a listener that counts SELECT statements executed on the engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+class TestBatchedEnrichment:
+    """The people list is enriched with a fixed number of queries"""
+
+    def test_list_includes_latest_entry_and_tags(self, client: TestClient, test_people):
+        response = client.get("/api/people/")
+        assert response.status_code == 200
+
+        data = {p["name"]: p for p in response.json()}
+        assert len(data) == 5
+        assert data["Alice"]["latest_notebook_entry_content"] == "Latest note about Alice"
+        assert sorted(t["name"] for t in data["Alice"]["tags"]) == ["Climbing", "Work"]
+        assert [t["name"] for t in data["Bob"]["tags"]] == ["Climbing"]
+        assert data["Alice"]["health_status"] == "healthy"
+        assert data["Eve"]["health_status"] == "dormant"
+
+    def test_query_count_is_constant(self, client: TestClient, engine, session: Session, test_user: User, test_people):
+        client.get("/api/people/")
+        statements = count_selects(engine)
+        client.get("/api/people/")
+        small_page_queries = len(statements)
+
+        for i in range(20):
+            session.add(Person(name=f"Extra {i}", user_id=test_user.id))
+        session.commit()
+        client.get("/api/people/")
+
+        statements.clear()
+        response = client.get("/api/people/")
+        assert response.status_code == 200
+        assert len(response.json()) == 25
+        assert len(statements) == small_page_queries
+
+    def test_people_by_tag(self, client: TestClient, test_people, session: Session):
+        tag = session.exec(select(Tag).where(Tag.name == "Work")).first()
+        response = client.get(f"/api/people/by-tag/{tag.id}")
+        assert response.status_code == 200
+        assert sorted(p["name"] for p in response.json()) == ["Alice", "Charlie", "Eve"]
+        assert all(p["latest_notebook_entry_content"].startswith("Latest") for p in response.json())
+
+
+class TestCursorPagination:
+    """Keyset pagination on (name, id) with the cursor in X-Next-Cursor"""
+
+    def test_walk_pages_with_cursor(self, client: TestClient, test_people):
+        names = []
+        response = client.get("/api/people/?limit=2")
+        while True:
+            assert response.status_code == 200
+            names.extend(p["name"] for p in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            response = client.get(f"/api/people/?limit=2&cursor={cursor}")
+
+        assert names == ["Alice", "Bob", "Charlie", "Dana", "Eve"]
+
+    def test_cursor_is_stable_when_rows_are_inserted(self, client: TestClient, session: Session, test_user: User, test_people):
+        response = client.get("/api/people/?limit=2")
+        cursor = response.headers["X-Next-Cursor"]
+
+        # A new contact sorting before the cursor must not shift the next page
+        session.add(Person(name="Aaron", user_id=test_user.id))
+        session.commit()
+
+        response = client.get(f"/api/people/?limit=2&cursor={cursor}")
+        assert [p["name"] for p in response.json()] == ["Charlie", "Dana"]
+
+    def test_skip_limit_still_supported(self, client: TestClient, test_people):
+        response = client.get("/api/people/?skip=3&limit=10")
+        assert [p["name"] for p in response.json()] == ["Dana", "Eve"]
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_invalid_cursor(self, client: TestClient, test_people):
+        response = client.get("/api/people/?cursor=not-a-cursor")
+        assert response.status_code == 400
+
+    def test_tags_cursor(self, client: TestClient, test_people):
+        response = client.get("/api/tags/?limit=1")
+        assert [t["name"] for t in response.json()] == ["Climbing"]
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = client.get(f"/api/tags/?limit=1&cursor={cursor}")
+        assert [t["name"] for t in response.json()] == ["Work"]
+        assert "X-Next-Cursor" not in response.headers
+
+
+class TestHealthFiltering:
+    """Health filters and ordering run in the database"""
+
+    def test_filter_by_status(self, client: TestClient, test_people):
+        response = client.get("/api/people/?status=healthy")
+        assert [p["name"] for p in response.json()] == ["Alice", "Bob"]
+
+        response = client.get("/api/people/?status=warning")
+        assert [p["name"] for p in response.json()] == ["Charlie"]
+
+        response = client.get("/api/people/?status=dormant")
+        assert [p["name"] for p in response.json()] == ["Dana", "Eve"]
+
+    def test_filter_by_score_range(self, client: TestClient, test_people):
+        response = client.get("/api/people/?min_score=10&max_score=70")
+        data = response.json()
+        assert [p["name"] for p in data] == ["Bob", "Charlie", "Dana"]
+        assert all(10 <= p["health_score"] <= 70 for p in data)
+
+    def test_empty_range(self, client: TestClient, test_people):
+        response = client.get("/api/people/?status=healthy&max_score=50")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_order_by_health(self, client: TestClient, test_people):
+        response = client.get("/api/people/?order_by=health")
+        assert [p["name"] for p in response.json()] == ["Eve", "Dana", "Charlie", "Bob", "Alice"]
+
+        response = client.get("/api/people/?order_by=-health&limit=2")
+        assert [p["name"] for p in response.json()] == ["Alice", "Bob"]
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = client.get(f"/api/people/?order_by=-health&limit=2&cursor={cursor}")
+        assert [p["name"] for p in response.json()] == ["Charlie", "Dana"]
+
+
+class TestBulkWrites:
+    """Bulk create/update in one transaction with per-item results"""
+
+    def test_bulk_create(self, client: TestClient, session: Session):
+        response = client.post("/api/people/bulk", json=[
+            {"name": "Zoe", "phone_number": "555-0100"},
+            {"body": "missing name"},
+            {"name": "Yuri", "zip": "94110"},
+        ])
+        assert response.status_code == 200
+
+        results = response.json()
+        assert [r["status"] for r in results] == ["created", "error", "created"]
+        assert results[0]["person"]["name"] == "Zoe"
+        assert "name" in results[1]["error"]
+        assert results[2]["geocode_queued"] is True
+        assert results[2]["person"]["geocode_status"] == "pending"
+        queued = session.exec(select(GeocodeJob.target_id)).all()
+        assert [str(person_id) for person_id in queued] == [results[2]["person"]["id"]]
+
+        names = [p["name"] for p in client.get("/api/people/").json()]
+        assert names == ["Yuri", "Zoe"]
+
+    def test_bulk_update(self, client: TestClient, session: Session, test_people):
+        alice, bob = test_people[0], test_people[1]
+
+        response = client.patch("/api/people/bulk", json=[
+            {"id": str(alice.id), "mnemonic": "Loves tea"},
+            {"id": str(bob.id), "city": "Oakland"},
+            {"id": "00000000-0000-0000-0000-000000000000", "name": "Ghost"},
+        ])
+        assert response.status_code == 200
+
+        results = response.json()
+        assert [r["status"] for r in results] == ["updated", "updated", "error"]
+        assert results[0]["person"]["mnemonic"] == "Loves tea"
+        assert results[0]["geocode_queued"] is False
+        assert results[1]["person"]["city"] == "Oakland"
+        assert results[1]["geocode_queued"] is True
+        assert results[2]["error"] == "Person not found"
+        assert session.exec(select(GeocodeJob.target_id)).all() == [bob.id]
+
+    def test_updates_survive_geocoder_outage(self, client: TestClient, session: Session, test_people):
+        # Address changes only queue work, so a dead geocoder cannot fail them
+        geocoders.breaker.failures = geocoders.FAILURE_THRESHOLD - 1
+        geocoders.breaker.record_failure()
+        try:
+            response = client.patch(f"/api/people/{test_people[0].id}", json={"city": "Oakland"})
+            assert response.status_code == 200
+            assert response.json()["geocode_status"] == "pending"
+        finally:
+            geocoders.breaker.record_success()
+
+    def test_bulk_query_count_is_constant(self, client: TestClient, engine):
+        client.post("/api/people/bulk", json=[{"name": "Warmup"}])
+        statements = count_selects(engine)
+        client.post("/api/people/bulk", json=[{"name": "One"}])
+        single_create_queries = len(statements)
+
+        statements.clear()
+        response = client.post("/api/people/bulk", json=[{"name": f"Many {i}"} for i in range(20)])
+        assert len(statements) == single_create_queries
+
+        people = response.json()
+        statements.clear()
+        client.patch("/api/people/bulk", json=[{"id": people[0]["person"]["id"], "mnemonic": "m"}])
+        single_update_queries = len(statements)
+
+        statements.clear()
+        client.patch("/api/people/bulk", json=[{"id": p["person"]["id"], "mnemonic": "m"} for p in people])
+        assert len(statements) == single_update_queries
+
+    def test_bulk_limit(self, client: TestClient):
+        response = client.post("/api/people/bulk", json=[{"name": f"P{i}"} for i in range(1001)])
+        assert response.status_code == 400
+
+
+class TestGeocodeBackfill:
+    """Starting a geocoding backfill and polling its progress"""
+
+    def test_start_and_poll(self, client: TestClient, session: Session, test_user: User):
+        session.add(Person(name="Alice", user_id=test_user.id, city="Oakland"))
+        session.commit()
+
+        response = client.post("/api/people/geocode-all")
+        assert response.status_code == 200
+        backfill = response.json()
+        assert backfill["status"] == "pending"
+        assert backfill["total"] == 1
+
+        response = client.get(f"/api/people/geocode-all/{backfill['id']}")
+        assert response.status_code == 200
+        assert response.json()["queued"] == 0
+
+    def test_other_users_backfill_is_hidden(self, client: TestClient, session: Session):
+        other = User(firebase_uid="other_uid", name="Other", email="other@example.com")
+        session.add(other)
+        session.commit()
+        backfill = GeocodeBackfill(user_id=other.id)
+        session.add(backfill)
+        session.commit()
+
+        assert client.get(f"/api/people/geocode-all/{backfill.id}").status_code == 404
+
+
+class TestHealthSummary:
+    """Dashboard aggregates computed without loading people"""
+
+    def test_health_summary(self, client: TestClient, test_people):
+        response = client.get("/api/people/health-summary?overdue_limit=2")
+        assert response.status_code == 200
+
+        summary = response.json()
+        assert summary["total"] == 5
+        assert summary["status_counts"] == {"healthy": 2, "warning": 1, "dormant": 2}
+        # Scores 100, 70, 40, 10, 0
+        assert summary["mean_score"] == 44.0
+        assert sum(bucket["count"] for bucket in summary["histogram"]) == 5
+        assert summary["histogram"][-1] == {"min_score": 90, "max_score": 100, "count": 1}
+        assert [p["name"] for p in summary["most_overdue"]] == ["Eve", "Dana"]
+        assert summary["most_overdue"][0]["health_status"] == "dormant"
+
+    def test_vectorized_scores_match(self):
+        now = datetime(2025, 6, 1, 12)
+        dates = [now - timedelta(days=days, hours=hours) for days in range(0, 80, 3) for hours in (0, 5, 13)]
+        dates.append(now + timedelta(hours=3))
+
+        scores = calculate_health_scores(dates, now)
+        assert scores.tolist() == [calculate_health_score(date, now) for date in dates]
+
+    def test_empty_summary(self, client: TestClient):
+        summary = client.get("/api/people/health-summary").json()
+        assert summary["total"] == 0
+        assert summary["mean_score"] is None
+        assert summary["most_overdue"] == []
+
+
+class TestDuePeople:
+    """Top-k "who to contact next" by score, or from the status transition index"""
+
+    def test_lowest_scores_first(self, client: TestClient, test_people):
+        response = client.get("/api/people/due?k=2")
+        assert response.status_code == 200
+        assert [p["name"] for p in response.json()] == ["Eve", "Dana"]
+
+    def test_crossing_threshold(self, client: TestClient, test_people):
+        # Bob is at 70 now and drops below it within 10 days; Alice does not
+        response = client.get("/api/people/due?within_days=10")
+        assert [p["name"] for p in response.json()] == ["Bob"]
+
+        response = client.get("/api/people/due?within_days=30&threshold=40")
+        assert [p["name"] for p in response.json()] == ["Charlie", "Bob"]
+
+    def test_uses_index(self, client: TestClient, engine, test_people):
+        plans = []
+
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            if "FROM people" in statement and "LIMIT" in statement and not statement.startswith("EXPLAIN"):
+                plans.extend(conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all())
+
+        event.listen(engine, "before_cursor_execute", explain)
+        client.get("/api/people/due?k=3&within_days=30&threshold=40")
+        event.remove(engine, "before_cursor_execute", explain)
+
+        assert any("ix_people_userId_dormantAt" in str(row) for row in plans)
+        # Ties on dormantAt are ordered by id without a full sort
+        assert not any("TEMP B-TREE FOR ORDER BY" in str(row) for row in plans)
+
+
+class TestMixedDecayOrder:
+    """Health ordering follows the score, not transition times, across decay models"""
+
+    @pytest.fixture(name="mixed_people")
+    def mixed_people_fixture(self, session: Session, test_user: User):
+        now = datetime.utcnow()
+        session.add_all([
+            # Scores 60, but on a slow model only turns dormant in 200 days
+            Person(name="SlowA", user_id=test_user.id, decay_rate=0.1, last_contact_date=now - timedelta(days=400)),
+            # Scores 85 and turns dormant in 31 days
+            Person(name="FastB", user_id=test_user.id, last_contact_date=now - timedelta(days=10)),
+        ])
+        session.commit()
+
+    def test_order_by_health(self, client: TestClient, mixed_people):
+        people = client.get("/api/people/?order_by=health").json()
+        assert [(p["name"], p["health_score"]) for p in people] == [("SlowA", 60), ("FastB", 85)]
+
+        response = client.get("/api/people/?order_by=-health&limit=1")
+        assert [p["name"] for p in response.json()] == ["FastB"]
+        cursor = response.headers["X-Next-Cursor"]
+        response = client.get(f"/api/people/?order_by=-health&limit=1&cursor={cursor}")
+        assert [p["name"] for p in response.json()] == ["SlowA"]
+
+    def test_due_and_most_overdue(self, client: TestClient, mixed_people):
+        assert [p["name"] for p in client.get("/api/people/due?k=1").json()] == ["SlowA"]
+        summary = client.get("/api/people/health-summary").json()
+        assert [p["name"] for p in summary["most_overdue"]] == ["SlowA", "FastB"]
+
+    def test_single_model_reads_the_last_contact_index(self, client: TestClient, engine, test_people):
+        plans = []
+
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            if "ORDER BY" in statement and "FROM people" in statement and not statement.startswith("EXPLAIN"):
+                plans.append(" ".join(row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)))
+
+        event.listen(engine, "before_cursor_execute", explain)
+        listed = client.get("/api/people/?order_by=health").json()
+        due = client.get("/api/people/due?k=2").json()
+        summary = client.get("/api/people/health-summary?overdue_limit=2").json()
+        event.remove(engine, "before_cursor_execute", explain)
+
+        assert len(plans) == 3
+        assert all("ix_people_userId_last_contact_date" in plan for plan in plans), plans
+        assert not any("TEMP B-TREE FOR ORDER BY" in plan for plan in plans), plans
+        scores = [p["health_score"] for p in listed]
+        assert scores == sorted(scores)
+        assert [p["name"] for p in due] == [p["name"] for p in listed[:2]]
+        assert [p["name"] for p in summary["most_overdue"]] == [p["name"] for p in listed[:2]]
+
+    def test_crossing_order_uses_each_model(self, client: TestClient, session: Session, test_user: User):
+        now = datetime.utcnow()
+        session.add_all([
+            # Below 80 in 5 days, dormant in 13
+            Person(name="Steep", user_id=test_user.id, decay_rate=5, last_contact_date=now),
+            # Below 80 in 3 days, dormant in 72
+            Person(
+                name="Gentle", user_id=test_user.id, decay_rate=1, decay_curve=DecayCurve.EXPONENTIAL,
+                last_contact_date=now - timedelta(days=20)
+            ),
+        ])
+        session.commit()
+
+        response = client.get("/api/people/due?within_days=10&threshold=80")
+        assert [p["name"] for p in response.json()] == ["Gentle", "Steep"]
+
+    def test_sql_score_matches_python(self, session: Session, test_user: User):
+        now = datetime.utcnow()
+        session.add_all([
+            Person(
+                name=f"P{i}", user_id=test_user.id, decay_rate=rate, decay_curve=curve,
+                last_contact_date=now - timedelta(days=days, hours=hours)
+            )
+            for i, (rate, curve, days, hours) in enumerate([
+                (None, None, 0, 3), (0.1, None, 400, 0), (1.5, None, 20, 23), (3.0, DecayCurve.EXPONENTIAL, 7, 1),
+                (0.7, DecayCurve.EXPONENTIAL, 365, 0), (None, None, 90, 0), (2.0, None, -2, 0),
+            ])
+        ])
+        session.commit()
+
+        rows = session.exec(
+            select(
+                Person.last_contact_date, Person.resolved_decay_rate, Person.resolved_decay_curve,
+                score_expression(session, now)
+            ).where(Person.user_id == test_user.id)
+        ).all()
+        assert len(rows) == 7
+        for last_contact_date, rate, curve, score in rows:
+            assert score == calculate_health_score(last_contact_date, now, rate, curve)
+
+
+class TestDecayModels:
+    """Per-person and per-tag decay with precomputed status transitions"""
+
+    def test_transitions_are_precomputed(self, session: Session, test_people):
+        bob = test_people[1]
+        assert bob.warning_at - bob.last_contact_date == timedelta(days=21)
+        assert bob.dormant_at - bob.last_contact_date == timedelta(days=41)
+
+        bob.last_contact_date = datetime(2025, 1, 1)
+        session.add(bob)
+        session.commit()
+        session.refresh(bob)
+        assert bob.warning_at == datetime(2025, 1, 22)
+
+    def test_person_decay_rate(self, client: TestClient, test_people):
+        # Alice was contacted today; at 40 points a day she is warned about in a day
+        alice = test_people[0]
+        response = client.patch(f"/api/people/{alice.id}", json={"decay_rate": 40})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["resolved_decay_rate"] == 40
+        assert data["health_score"] == 100
+
+        assert data["warning_at"] == (alice.last_contact_date + timedelta(days=1)).isoformat()
+        response = client.get("/api/people/due?within_days=1")
+        assert "Alice" in [p["name"] for p in response.json()]
+
+        assert client.patch(f"/api/people/{alice.id}", json={"decay_rate": 0}).status_code == 422
+
+    def test_tag_decay_is_inherited(self, client: TestClient, session: Session, test_people):
+        # Bob (20 days) is healthy at the default rate; "Work" decays twice as fast
+        work = session.exec(select(Tag).where(Tag.name == "Work")).one()
+        bob = test_people[1]
+        session.add(PersonTag(person_id=bob.id, tag_id=work.id))
+        session.commit()
+
+        response = client.patch(f"/api/tags/{work.id}", json={"decay_rate": 3.0})
+        assert response.status_code == 200
+
+        # Charlie already had the tag and drops from warning to dormant
+        names = [p["name"] for p in client.get("/api/people/?status=warning").json()]
+        assert names == ["Bob"]
+        names = [p["name"] for p in client.get("/api/people/?status=dormant").json()]
+        assert names == ["Charlie", "Dana", "Eve"]
+        bob_read = client.get(f"/api/people/{bob.id}").json()
+        assert bob_read["health_score"] == 40
+        assert bob_read["resolved_decay_rate"] == 3.0
+
+        # The person's own setting wins over the tag
+        client.patch(f"/api/people/{bob.id}", json={"decay_curve": "exponential"})
+        bob_read = client.get(f"/api/people/{bob.id}").json()
+        assert bob_read["resolved_decay_curve"] == "exponential"
+        assert bob_read["health_score"] == 74
+
+    def test_score_filter_with_mixed_models(self, client: TestClient, test_people):
+        charlie = test_people[2]
+        client.patch(f"/api/people/{charlie.id}", json={"decay_rate": 0.5})
+
+        # Charlie (40 days) now scores 80
+        response = client.get("/api/people/?min_score=70")
+        assert [p["name"] for p in response.json()] == ["Alice", "Bob", "Charlie"]
+        response = client.get("/api/people/?min_score=75&max_score=90")
+        assert [p["name"] for p in response.json()] == ["Charlie"]
+
+    def test_exponential_transitions_match_scores(self):
+        last_contact = datetime(2025, 1, 1)
+        for rate in [0.7, 1.5, 4.0]:
+            warning_at, dormant_at = status_transitions(last_contact, rate, DecayCurve.EXPONENTIAL)
+            for at, status in [(warning_at, "warning"), (dormant_at, "dormant")]:
+                before = calculate_health_score(last_contact, at - timedelta(seconds=1), rate, DecayCurve.EXPONENTIAL)
+                after = calculate_health_score(last_contact, at, rate, DecayCurve.EXPONENTIAL)
+                assert get_health_status(after) == status
+                assert get_health_status(before) != status
+
+    def test_extreme_decay_rates(self, client: TestClient, session: Session, test_user: User, test_people):
+        alice = test_people[0]
+        work = session.exec(select(Tag).where(Tag.name == "Work")).one()
+        assert client.patch(f"/api/people/{alice.id}", json={"decay_rate": 1e-6}).status_code == 422
+        assert client.patch(f"/api/tags/{work.id}", json={"decay_rate": 1e-6}).status_code == 422
+        assert client.patch(f"/api/people/{alice.id}", json={"decay_rate": 1000}).status_code == 422
+
+        # Rates stored before the bounds existed still schedule and score
+        last_contact = datetime(2025, 1, 1)
+        assert status_transitions(last_contact, 1e-6) == (FAR_FUTURE, FAR_FUTURE)
+        assert calculate_health_score(last_contact, last_contact - timedelta(days=400), 100, DecayCurve.EXPONENTIAL) == 100
+        assert calculate_health_score(last_contact, last_contact + timedelta(days=4000), 100, DecayCurve.EXPONENTIAL) == 0
+
+        steep = Person(
+            name="Steep", user_id=test_user.id, decay_rate=50, decay_curve=DecayCurve.EXPONENTIAL,
+            last_contact_date=datetime.utcnow() - timedelta(days=1500)
+        )
+        session.add(steep)
+        session.commit()
+        assert session.exec(select(score_expression(session)).where(Person.id == steep.id)).one() == 0
+
+
+class TestHealthSnapshots:
+    """Nightly health rollups and the trend endpoints that read them"""
+
+    def add_people(self, session: Session, user: User, last_contacts):
+        people = [
+            Person(name=f"Person {i}", user_id=user.id, last_contact_date=last_contact, created_at=datetime(2025, 1, 1))
+            for i, last_contact in enumerate(last_contacts)
+        ]
+        session.add_all(people)
+        session.commit()
+        return people
+
+    def test_daily_rollup(self, session: Session, test_user: User):
+        # Scores at the end of June 1st: 100, 70, 40, 10
+        self.add_people(session, test_user, [
+            datetime(2025, 6, 1, 15), datetime(2025, 5, 12, 12), datetime(2025, 4, 23), datetime(2025, 4, 3)
+        ])
+        session.add(Person(name="Later", user_id=test_user.id, last_contact_date=datetime(2025, 6, 3)))
+        session.commit()
+
+        snapshot = snapshot_user(session, test_user.id, date(2025, 6, 1))
+        session.commit()
+
+        assert (snapshot.total, snapshot.healthy, snapshot.warning, snapshot.dormant) == (4, 2, 1, 1)
+        assert snapshot.mean_score == 55.0
+        assert snapshot.contacts_made == 1
+
+    def test_job_skips_days_already_taken(self, engine, session: Session, test_user: User):
+        self.add_people(session, test_user, [datetime(2025, 5, 30)])
+        other = User(firebase_uid="other_uid", name="Other", email="other@example.com")
+        session.add(other)
+        session.commit()
+
+        assert take_daily_snapshots(lambda: Session(engine), date(2025, 6, 1)) == 2
+        assert take_daily_snapshots(lambda: Session(engine), date(2025, 6, 1)) == 0
+        assert take_daily_snapshots(lambda: Session(engine), date(2025, 6, 2)) == 2
+        assert len(session.exec(select(HealthSnapshot)).all()) == 4
+
+    def test_person_snapshots_only_on_status_change(self, engine, session: Session, test_user: User):
+        steady, fading = self.add_people(session, test_user, [datetime(2025, 6, 1), datetime(2025, 5, 13)])
+        factory = lambda: Session(engine)
+
+        # Fading scores 70 at the end of June 1st, then 68 and 67
+        for day in range(1, 4):
+            take_daily_snapshots(factory, date(2025, 6, day))
+
+        rows = session.exec(select(PersonHealthSnapshot)).all()
+        assert {(row.person_id, row.snapshot_date, row.health_status) for row in rows} == {
+            (steady.id, date(2025, 6, 1), "healthy"),
+            (fading.id, date(2025, 6, 1), "healthy"),
+            (fading.id, date(2025, 6, 2), "warning"),
+        }
+
+    def test_trend_endpoint(self, client: TestClient, engine, session: Session, test_user: User):
+        self.add_people(session, test_user, [datetime(2025, 5, 13)])
+        for day in range(1, 6):
+            take_daily_snapshots(lambda: Session(engine), date(2025, 6, day))
+
+        response = client.get("/api/people/health-trend?from=2025-06-02&to=2025-06-04")
+        assert response.status_code == 200
+        trend = response.json()
+        assert [point["snapshot_date"] for point in trend] == ["2025-06-02", "2025-06-03", "2025-06-04"]
+        assert [point["healthy"] for point in trend] == [0, 0, 0]
+        assert [point["warning"] for point in trend] == [1, 1, 1]
+
+        assert client.get("/api/people/health-trend?from=2025-06-04&to=2025-06-02").status_code == 400
+        assert client.get("/api/people/health-trend?from=2020-01-01&to=2025-06-02").status_code == 400
+        assert client.get("/api/people/health-trend").json() == []
+
+    def test_person_history_includes_starting_status(self, client: TestClient, engine, session: Session, test_user: User):
+        person, = self.add_people(session, test_user, [datetime(2025, 5, 13)])
+        for day in range(1, 6):
+            take_daily_snapshots(lambda: Session(engine), date(2025, 6, day))
+
+        response = client.get(f"/api/people/{person.id}/health-history?from=2025-06-04&to=2025-06-05")
+        assert response.status_code == 200
+        assert [(row["snapshot_date"], row["health_status"]) for row in response.json()] == [
+            ("2025-06-02", "warning")
+        ]
@@ -0,0 +1,229 @@
+"""
+Tests for full-text search across people, notebook entries and tag names
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, create_engine, SQLModel, select
+from sqlmodel.pool import StaticPool
+
+from main import app
+from database import get_db
+from models import (
+    User, Person, Tag, PersonTag, NotebookEntry, PersonSearchDocument, NotebookSearchDocument, ProcessingStatus
+)
+from routers.auth import get_current_user_id, get_current_user
+from services.search import matching_person_ids, rebuild_search_index
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    """Create a test database session with in-memory SQLite"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(name="test_user")
+def test_user_fixture(session: Session):
+    """Create a test user"""
+    user = User(
+        firebase_uid="test_uid_123",
+        name="Test User",
+        email="test@example.com"
+    )
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+@pytest.fixture(name="client")
+def client_fixture(session: Session, test_user: User):
+    """Create a test client with overridden dependencies"""
+    def get_db_override():
+        yield session
+
+    def get_current_user_override():
+        return test_user
+
+    def get_current_user_id_override():
+        return test_user.id
+
+    app.dependency_overrides[get_db] = get_db_override
+    app.dependency_overrides[get_current_user] = get_current_user_override
+    app.dependency_overrides[get_current_user_id] = get_current_user_id_override
+
+    client = TestClient(app)
+    yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="test_people")
+def test_people_fixture(session: Session, test_user: User):
+    """Create people with notebook entries and tags"""
+    alice = Person(name="Alice Johnson", body="Met at a conference", user_id=test_user.id)
+    bob = Person(name="Bob Smith", body="Neighbor", user_id=test_user.id)
+    carol = Person(name="Carol White", mnemonic="Red bicycle", user_id=test_user.id)
+    climbing = Tag(name="Climbing Gym", user_id=test_user.id)
+    for obj in [alice, bob, carol, climbing]:
+        session.add(obj)
+    session.commit()
+
+    session.add(PersonTag(person_id=carol.id, tag_id=climbing.id))
+    session.add(NotebookEntry(
+        person_id=bob.id,
+        user_id=test_user.id,
+        entry_date="2024-03-01",
+        content="Bob is training for the Boston marathon in April"
+    ))
+    session.commit()
+    return {"alice": alice, "bob": bob, "carol": carol, "climbing": climbing}
+
+
+class TestSearchEndpoint:
+    """Ranked search with snippets"""
+
+    def test_search_person_name(self, client: TestClient, test_people):
+        response = client.get("/api/people/search?query=alice")
+        assert response.status_code == 200
+
+        results = response.json()
+        assert len(results) == 1
+        assert results[0]["person"]["name"] == "Alice Johnson"
+        assert "<b>Alice</b>" in results[0]["snippet"]
+
+    def test_search_notebook_content(self, client: TestClient, test_people):
+        response = client.get("/api/people/search?query=marathon")
+        results = response.json()
+        assert [r["person"]["name"] for r in results] == ["Bob Smith"]
+        assert "<b>marathon</b>" in results[0]["snippet"]
+
+    def test_search_tag_name_and_prefix(self, client: TestClient, test_people):
+        response = client.get("/api/people/search?query=climb")
+        assert [r["person"]["name"] for r in response.json()] == ["Carol White"]
+
+    def test_search_is_ranked(self, client: TestClient, session: Session, test_user: User, test_people):
+        # A name hit outranks a notebook hit
+        dave = Person(name="Dave Boston", user_id=test_user.id)
+        session.add(dave)
+        session.commit()
+
+        response = client.get("/api/people/search?query=boston")
+        names = [r["person"]["name"] for r in response.json()]
+        assert names == ["Dave Boston", "Bob Smith"]
+
+    def test_words_match_across_documents(self, client: TestClient, test_people):
+        # The name is in the person's document, the word in a notebook entry
+        response = client.get("/api/people/search?query=bob%20marathon")
+        assert [r["person"]["name"] for r in response.json()] == ["Bob Smith"]
+        assert [p["name"] for p in client.get("/api/people/?search=smith%20boston").json()] == ["Bob Smith"]
+        assert client.get("/api/people/search?query=alice%20marathon").json() == []
+
+    def test_search_requires_query(self, client: TestClient):
+        response = client.get("/api/people/search?query=%20")
+        assert response.status_code == 400
+
+
+class TestPostgresQueries:
+    """Postgres-only query building, checked on the compiled SQL"""
+
+    def test_stopwords_are_not_required(self):
+        # "the" parses to an empty tsquery on Postgres, which would match nothing
+        dialect = postgresql.dialect()
+        executed = []
+
+        class PostgresSession:
+            def get_bind(self):
+                return SimpleNamespace(dialect=dialect)
+
+            def execute(self, statement):
+                executed.append(statement.compile(dialect=dialect))
+                return SimpleNamespace(one=lambda: (0, 1))
+
+        matches = matching_person_ids(PostgresSession(), uuid4(), "the marathon")
+
+        assert "numnode(to_tsquery(" in str(executed[0])
+        assert list(executed[0].params.values()) == ["english", "the:*", "english", "marathon:*"]
+        searched = matches.compile(dialect=dialect).params.values()
+        assert "marathon:*" in searched
+        assert "the:*" not in searched
+
+
+class TestIndexMaintenance:
+    """The index follows writes to people, notebook entries and tags"""
+
+    def test_list_search_is_case_insensitive(self, client: TestClient, test_people):
+        response = client.get("/api/people/?search=BICYCLE")
+        assert [p["name"] for p in response.json()] == ["Carol White"]
+
+    def test_notebook_update_reindexes(self, client: TestClient, session: Session, test_people):
+        bob = test_people["bob"]
+        entry = session.exec(select(NotebookEntry).where(NotebookEntry.person_id == bob.id)).first()
+        entry.content = "Now into sailing"
+        session.add(entry)
+        session.commit()
+
+        assert client.get("/api/people/?search=marathon").json() == []
+        assert [p["name"] for p in client.get("/api/people/?search=sailing").json()] == ["Bob Smith"]
+
+    def test_entries_are_indexed_separately(self, session: Session, test_user: User, test_people):
+        bob = test_people["bob"]
+        other_day = NotebookEntry(person_id=bob.id, user_id=test_user.id, entry_date="2024-03-02", content="Sailing")
+        session.add(other_day)
+        session.commit()
+
+        documents = session.exec(select(NotebookSearchDocument).order_by(NotebookSearchDocument.content)).all()
+        assert [(document.content, document.seq) for document in documents] == [
+            ("Bob is training for the Boston marathon in April", 0), ("Sailing", 0)
+        ]
+        assert "marathon" not in session.get(PersonSearchDocument, bob.id).details
+
+    def test_tag_rename_reindexes(self, client: TestClient, session: Session, test_people):
+        tag = test_people["climbing"]
+        tag.name = "Bouldering"
+        session.add(tag)
+        session.commit()
+
+        assert client.get("/api/people/?search=climbing").json() == []
+        assert [p["name"] for p in client.get("/api/people/?search=boulder").json()] == ["Carol White"]
+
+    def test_unsearchable_writes_skip_reindex(self, session: Session, test_people):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if '"personSearch"' in statement:
+                statements.append(statement)
+
+        engine = session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        bob = test_people["bob"]
+        bob.last_contact_date = datetime.utcnow()
+        bob.latitude, bob.longitude = 37.77, -122.42
+        bob.geocode_status = ProcessingStatus.COMPLETED
+        session.add(bob)
+        session.commit()
+        event.remove(engine, "before_cursor_execute", record)
+
+        assert statements == []
+
+    def test_delete_person_removes_document(self, client: TestClient, session: Session, test_people):
+        response = client.delete(f"/api/people/{test_people['alice'].id}")
+        assert response.status_code == 204
+        assert session.get(PersonSearchDocument, test_people["alice"].id) is None
+        assert client.get("/api/people/search?query=alice").json() == []
+
+    def test_rebuild_search_index(self, session: Session, test_user: User, test_people):
+        assert rebuild_search_index(session, test_user.id) == 3
+        document = session.get(PersonSearchDocument, test_people["carol"].id)
+        assert document.tags == "Climbing Gym"